@@ -0,0 +1,19 @@
+# cache_paths.py
+"""Location of the derived caches shared by the email pipeline.
+
+The remote-jobs manifests and parsed reports, the seen-items store and the
+outbox all live under one directory, ``~/.cache/tech-trending-daily`` unless
+``TRENDING_CACHE_DIR`` points elsewhere.
+"""
+import os
+from pathlib import Path
+
+CACHE_DIR_ENV = 'TRENDING_CACHE_DIR'
+
+
+def cache_dir():
+    """Directory for derived caches; ``TRENDING_CACHE_DIR`` overrides the default."""
+    configured = os.getenv(CACHE_DIR_ENV)
+    if configured:
+        return Path(configured)
+    return Path.home() / '.cache' / 'tech-trending-daily'
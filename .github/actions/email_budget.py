@@ -0,0 +1,188 @@
+# email_budget.py
+"""Fit the rendered email under a byte budget (Gmail clips messages above ~102 KB).
+
+Sections are compacted first: whitespace between tags is dropped and, when a
+shared stylesheet is allowed, inline styles used more than once become classes.
+If the message is still too large, sections are trimmed in priority order
+(lowest priority first), first down to ``min_items`` and then dropped entirely.
+Sections are only dropped when that can reach the budget: if the sections that
+cannot be trimmed (e.g. the remote-jobs report) exceed it on their own, the
+others stop at ``min_items`` and the report says the budget is unreachable.
+"""
+import math
+import re
+from collections import Counter
+
+GMAIL_CLIP_BYTES = 102 * 1024
+
+# Lowest priority first; ``github-languages`` stands for every per-language section.
+TRUNCATION_ORDER = ('indie', 'devto', 'papers', 'hackernews', 'huggingface', 'github-languages', 'watchlist', 'github-all')
+
+_STYLE_ATTR_RE = re.compile(r' style="([^"]*)"')
+_NEWLINE_GAP_RE = re.compile(r'(?:(?<=>)|^)\s*\n\s*(?=<|$)')
+_CLASS_ALPHABET = 'abcdefghijklmnopqrstuvwxyz0123456789'
+
+
+def byte_size(text):
+    return len(text.encode('utf-8'))
+
+
+def _class_name(index):
+    name = _CLASS_ALPHABET[index % 26]
+    index //= 26
+    while index:
+        name += _CLASS_ALPHABET[index % len(_CLASS_ALPHABET)]
+        index //= len(_CLASS_ALPHABET)
+    return name
+
+
+def _truncation_rank(name):
+    key = 'github-languages' if name.startswith('github-') and name != 'github-all' else name
+    try:
+        return TRUNCATION_ORDER.index(key)
+    except ValueError:
+        return None
+
+
+def build_stylesheet(sections):
+    """Map inline styles repeated across ``sections`` to short class names.
+
+    A style only becomes a class when the bytes saved outweigh its stylesheet rule.
+    """
+    counts = Counter(style for _, html in sections for style in _STYLE_ATTR_RE.findall(html))
+    classes = {}
+    for style, count in counts.most_common():
+        if count < 2:
+            break
+        name = _class_name(len(classes))
+        saved = (len(style) - len(name)) * count
+        if saved > len(style) + len(name) + 3:
+            classes[style] = name
+    return classes
+
+
+def compact_sections(sections, stylesheet=True):
+    """Return ``(css, sections)`` with whitespace stripped and repeated styles collapsed."""
+    sections = [(name, _NEWLINE_GAP_RE.sub('', html)) for name, html in sections]
+    if not stylesheet:
+        return '', sections
+
+    classes = build_stylesheet(sections)
+    if not classes:
+        return '', sections
+
+    def replace(match):
+        name = classes.get(match.group(1))
+        return match.group(0) if name is None else f' class="{name}"'
+
+    css = ''.join(f'.{name}{{{style}}}' for style, name in classes.items())
+    return css, [(name, _STYLE_ATTR_RE.sub(replace, html)) for name, html in sections]
+
+
+def stylesheet_block(css):
+    return f'<head><style>{css}</style></head>' if css else ''
+
+
+def assemble(css, sections):
+    html = ''.join(chunk for _, chunk in sections)
+    if css:
+        html = html.replace('<html>', f'<html>{stylesheet_block(css)}', 1)
+    return html
+
+
+def render_section(render, items=None):
+    out = []
+    if items is None:
+        render(out)
+    else:
+        render(out, items)
+    return ''.join(out)
+
+
+def fit_sections(plan, budget=GMAIL_CLIP_BYTES, item_limit=10, stylesheet=True, min_items=3):
+    """Render ``plan`` (see ``send_email.plan_email_sections``) within ``budget`` bytes.
+
+    Returns ``(html, report)``; the report lists the byte cost and item count of every
+    section, and ``floor_bytes``, the size of the sections that cannot be trimmed.
+    """
+    limits = {name: min(len(items), item_limit) for name, items, _ in plan if items is not None}
+    full = dict(limits)
+    chunks = {}
+
+    def render_chunk(name, items, render):
+        if items is None:
+            chunks[name] = render_section(render, None)
+        elif limits[name] > 0:
+            chunks[name] = render_section(render, items[:limits[name]])
+        else:
+            chunks.pop(name, None)
+
+    for name, items, render in plan:
+        render_chunk(name, items, render)
+
+    truncatable = sorted(
+        (entry for entry in plan if entry[1] is not None and _truncation_rank(entry[0]) is not None),
+        key=lambda entry: _truncation_rank(entry[0]),
+    )
+
+    def measure(names=None):
+        sections = [(name, chunks[name]) for name, _, _ in plan if name in chunks and (names is None or name in names)]
+        css, compacted = compact_sections(sections, stylesheet)
+        return css, compacted, byte_size(stylesheet_block(css)) + sum(byte_size(html) for _, html in compacted)
+
+    trimmed = {name for name, _, _ in truncatable}
+    floor_bytes = measure({name for name, _, _ in plan if name not in trimmed})[2]
+    reachable = floor_bytes <= budget
+
+    css, compacted, total = measure()
+    # Dropping whole sections cannot help when the untrimmable ones alone are over budget.
+    for floor in (min_items, 0) if reachable else (min_items,):
+        for name, items, render in truncatable:
+            while total > budget and limits[name] > floor:
+                # Drop roughly as many items as the overshoot needs, at least one per pass.
+                per_item = byte_size(chunks[name]) / max(limits[name], 1)
+                drop = max(1, math.ceil((total - budget) / max(per_item, 1)))
+                limits[name] = max(floor, limits[name] - drop)
+                render_chunk(name, items, render)
+                css, compacted, total = measure()
+
+    report = {
+        'budget': budget,
+        'bytes': total,
+        'fits': total <= budget,
+        'floor_bytes': floor_bytes,
+        'reachable': reachable,
+        'min_items': min_items,
+        'stylesheet_bytes': byte_size(stylesheet_block(css)),
+        'sections': [
+            {
+                'name': name,
+                'bytes': byte_size(html),
+                'items': limits.get(name),
+                'dropped': full[name] - limits[name] if name in full else 0,
+            }
+            for name, html in compacted
+        ],
+        'omitted': [name for name in limits if limits[name] == 0 and full[name] > 0],
+    }
+    return assemble(css, compacted), report
+
+
+def format_budget_report(report):
+    lines = [
+        f"Email size: {report['bytes']} bytes of {report['budget']} budget"
+        f" ({'fits' if report['fits'] else 'over budget'})",
+    ]
+    if report['stylesheet_bytes']:
+        lines.append(f"  {'stylesheet':<20} {report['stylesheet_bytes']:>8} bytes")
+    for section in report['sections']:
+        trimmed = f" (-{section['dropped']} items)" if section['dropped'] else ''
+        lines.append(f"  {section['name']:<20} {section['bytes']:>8} bytes{trimmed}")
+    for name in report['omitted']:
+        lines.append(f"  {name:<20} omitted")
+    if not report['reachable']:
+        lines.append(
+            f"  Budget unreachable: {report['floor_bytes']} bytes cannot be trimmed;"
+            f" other sections kept at {report['min_items']} items"
+        )
+    return '\n'.join(lines)
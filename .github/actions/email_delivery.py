@@ -0,0 +1,225 @@
+# email_delivery.py
+"""Batch delivery: pooled SMTP connections, bounded concurrency and retries.
+
+A connection is any object with ``send(to, subject, contents, prettify_html)``
+and ``close()``; ``yagmail.SMTP`` and ``SMTPConnection`` both qualify. Each
+recipient gets an individual message.
+"""
+import queue
+import re
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from email.message import EmailMessage
+
+DEFAULT_WORKERS = 4
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 1.0
+
+_RECIPIENT_SPLIT_RE = re.compile(r'[,;\s]+')
+
+
+def parse_recipients(value):
+    """Split a comma/semicolon/whitespace separated recipient string, keeping order."""
+    if isinstance(value, (list, tuple)):
+        candidates = value
+    else:
+        candidates = _RECIPIENT_SPLIT_RE.split(value or '')
+    return list(dict.fromkeys(item.strip() for item in candidates if item and item.strip()))
+
+
+def is_transient_error(error):
+    """4xx replies, dropped connections and socket errors are worth retrying."""
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPException):
+        return False
+    return isinstance(error, OSError)
+
+
+class SMTPConnection:
+    """Minimal smtplib-backed connection with the same ``send`` signature as yagmail."""
+
+    def __init__(self, host, port, username=None, password=None, use_ssl=False, starttls=False, timeout=30):
+        self.username = username
+        smtp_class = smtplib.SMTP_SSL if use_ssl else smtplib.SMTP
+        self.smtp = smtp_class(host, port, timeout=timeout)
+        if starttls:
+            self.smtp.starttls()
+        if username:
+            self.smtp.login(username, password)
+
+    def send(self, to, subject, contents, prettify_html=False):
+        message = EmailMessage()
+        message['From'] = self.username or 'tech-trending-daily@localhost'
+        message['To'] = to
+        message['Subject'] = subject
+        message.set_content('This email requires an HTML capable client.')
+        message.add_alternative(contents, subtype='html')
+        self.smtp.send_message(message)
+
+    def close(self):
+        try:
+            self.smtp.quit()
+        except smtplib.SMTPException:
+            self.smtp.close()
+        except OSError:
+            pass
+
+
+class SMTPPool:
+    """Hands out at most ``size`` authenticated connections and reuses them across messages.
+
+    A rejected login is remembered and raised again without logging in, so bad
+    credentials cost one failed login per pool rather than one per message.
+    """
+
+    def __init__(self, factory, size=DEFAULT_WORKERS):
+        self._factory = factory
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._login_lock = threading.Lock()
+        self.created = 0
+        self.login_error = None
+
+    @contextmanager
+    def connection(self):
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._open()
+            try:
+                yield conn
+            except BaseException as error:
+                if isinstance(error, smtplib.SMTPAuthenticationError):
+                    self.login_error = error
+                if _is_broken(error):
+                    _close_quietly(conn)
+                else:
+                    # A reply-code error leaves the session usable; keep the login.
+                    self._idle.put(conn)
+                raise
+            self._idle.put(conn)
+
+    def _open(self):
+        # Log in one at a time until a login has succeeded, so concurrent workers
+        # do not all try credentials the server is about to reject.
+        with self._login_lock:
+            if self.login_error is not None:
+                raise self.login_error
+            if not self.created:
+                return self._login()
+        return self._login()
+
+    def _login(self):
+        try:
+            conn = self._factory()
+        except smtplib.SMTPAuthenticationError as error:
+            self.login_error = error
+            raise
+        with self._lock:
+            self.created += 1
+        return conn
+
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            _close_quietly(conn)
+
+
+def _is_broken(error):
+    """Whether a connection that raised ``error`` may be half-open and must not be reused."""
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPAuthenticationError)):
+        return True
+    if isinstance(error, smtplib.SMTPException):
+        return False
+    return isinstance(error, OSError) or not isinstance(error, Exception)
+
+
+def _close_quietly(conn):
+    close = getattr(conn, 'close', None)
+    if close is None:
+        return
+    try:
+        close()
+    except Exception:
+        pass
+
+
+def send_with_retry(pool, recipient, subject, body, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, sleep=time.sleep):
+    """Send one message, retrying transient failures with exponential backoff.
+
+    A rejected login is raised rather than reported, since it fails every recipient.
+    """
+    started = time.perf_counter()
+    attempts = 0
+    while True:
+        attempts += 1
+        try:
+            with pool.connection() as conn:
+                conn.send(to=recipient, subject=subject, contents=body, prettify_html=False)
+        except smtplib.SMTPAuthenticationError:
+            raise
+        except Exception as error:
+            if attempts > retries or not is_transient_error(error):
+                return {
+                    'recipient': recipient,
+                    'status': 'failed',
+                    'attempts': attempts,
+                    'error': f'{type(error).__name__}: {error}',
+                    'seconds': time.perf_counter() - started,
+                }
+            sleep(backoff * 2 ** (attempts - 1))
+            continue
+        return {
+            'recipient': recipient,
+            'status': 'sent',
+            'attempts': attempts,
+            'error': None,
+            'seconds': time.perf_counter() - started,
+        }
+
+
+def deliver_batch(recipients, subject, body, connection_factory, workers=DEFAULT_WORKERS,
+                  retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, sleep=time.sleep):
+    """Send ``body`` to every recipient individually; returns one result dict per recipient.
+
+    ``body`` may be a callable returning the message for a recipient, for personalized digests.
+    Raises ValueError when there is no recipient, and aborts the batch with
+    SMTPAuthenticationError when the server rejects the login.
+    """
+    recipients = parse_recipients(recipients)
+    if not recipients:
+        raise ValueError('No recipients to deliver to')
+    render = body if callable(body) else lambda recipient: body
+
+    workers = max(1, min(workers, len(recipients)))
+    pool = SMTPPool(connection_factory, workers)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(
+                lambda recipient: send_with_retry(pool, recipient, subject, render(recipient), retries, backoff, sleep),
+                recipients,
+            ))
+    finally:
+        pool.close()
+
+
+def summarize_results(results):
+    sent = sum(1 for result in results if result['status'] == 'sent')
+    lines = [f'Delivered {sent}/{len(results)} message(s)']
+    for result in results:
+        if result['status'] != 'sent':
+            lines.append(f"  {result['recipient']}: {result['status']} after {result['attempts']} attempt(s): {result['error']}")
+    return '\n'.join(lines)
@@ -0,0 +1,342 @@
+# outbox.py
+"""Durable outbox: rendered messages are spooled to disk and drained at a bounded rate.
+
+Every message is one JSON file under ``messages/``, written atomically and named
+by a hash of its batch and recipient, so enqueueing the same digest twice is a
+no-op. Every state change (queued, sending, sent, deferred, failed) is appended
+to ``journal.jsonl`` and fsynced before the next step, so a restarted drain
+skips what was already delivered. A message last journaled as ``sending`` may
+or may not have been accepted by the server; it is marked failed as interrupted
+rather than risk a duplicate, and ``retry`` re-queues it on request.
+"""
+import argparse
+import hashlib
+import json
+import os
+import smtplib
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from cache_paths import cache_dir
+from email_delivery import DEFAULT_BACKOFF, DEFAULT_RETRIES, DEFAULT_WORKERS, SMTPConnection, SMTPPool, is_transient_error
+
+OUTBOX_DIR = 'outbox'
+MESSAGES_DIR = 'messages'
+JOURNAL_FILE = 'journal.jsonl'
+QUOTA_WINDOW_SECONDS = 24 * 60 * 60
+
+QUEUED, SENDING, SENT, DEFERRED, FAILED = 'queued', 'sending', 'sent', 'deferred', 'failed'
+PENDING_STATES = (QUEUED, DEFERRED)
+INTERRUPTED_ERROR = 'interrupted while sending; not retried to avoid a duplicate'
+
+
+def default_outbox_dir():
+    return cache_dir() / OUTBOX_DIR
+
+
+def message_id(batch, recipient):
+    return hashlib.blake2b(f'{batch}\x00{recipient}'.encode('utf-8'), digest_size=12).hexdigest()
+
+
+def _write_atomic(path, text):
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class RateLimiter:
+    """Token bucket: ``rate`` messages per second on average, at most ``burst`` at once."""
+
+    def __init__(self, rate, burst=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Reserve the token now; concurrent callers queue up behind a negative balance.
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            self._sleep(wait)
+
+
+class Outbox:
+    def __init__(self, root=None, clock=time.time):
+        self.root = Path(root) if root else default_outbox_dir()
+        self.messages_dir = self.root / MESSAGES_DIR
+        self.journal_path = self.root / JOURNAL_FILE
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._states = {}
+        self._sent_at = []
+        self.messages_dir.mkdir(parents=True, exist_ok=True)
+        self._load_journal()
+
+    def _load_journal(self):
+        if not self.journal_path.exists():
+            return
+        with open(self.journal_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash mid-write; the step it described is redone.
+                    continue
+                self._apply(entry)
+
+    def _apply(self, entry):
+        previous = self._states.get(entry['id'], {})
+        self._states[entry['id']] = dict(previous, **entry)
+        if entry['state'] == SENT:
+            self._sent_at.append(entry['at'])
+
+    def _record(self, message_id, state, **fields):
+        entry = {'id': message_id, 'state': state, 'at': self._clock(), **fields}
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock:
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._apply(entry)
+        return entry
+
+    def __len__(self):
+        return len(self._states)
+
+    def __contains__(self, message_id):
+        return message_id in self._states
+
+    def _message_path(self, message_id):
+        return self.messages_dir / f'{message_id}.json'
+
+    def enqueue(self, recipient, subject, body, batch):
+        """Spool a message unless this batch already has one for ``recipient``; returns its id.
+
+        ``body`` may be a callable taking the recipient, so known messages are not rendered again.
+        """
+        mid = message_id(batch, recipient)
+        if mid in self._states:
+            return mid
+        if callable(body):
+            body = body(recipient)
+        document = {'id': mid, 'batch': batch, 'recipient': recipient, 'subject': subject, 'body': body}
+        _write_atomic(self._message_path(mid), json.dumps(document, ensure_ascii=False))
+        self._record(mid, QUEUED, recipient=recipient, batch=batch, attempts=0)
+        return mid
+
+    def load(self, message_id):
+        return json.loads(self._message_path(message_id).read_text(encoding='utf-8'))
+
+    def state(self, message_id):
+        entry = self._states.get(message_id)
+        return entry['state'] if entry else None
+
+    def entry(self, message_id):
+        return dict(self._states[message_id])
+
+    def ids(self, *states):
+        return [mid for mid, entry in self._states.items() if not states or entry['state'] in states]
+
+    def pending(self):
+        """Ids of the messages still to deliver, oldest first."""
+        return self.ids(*PENDING_STATES)
+
+    def mark(self, message_id, state, **fields):
+        return self._record(message_id, state, **fields)
+
+    def recover(self):
+        """Mark messages a crash left in ``sending`` as failed; returns their ids."""
+        interrupted = self.ids(SENDING)
+        for mid in interrupted:
+            self._record(mid, FAILED, error=INTERRUPTED_ERROR)
+        return interrupted
+
+    def requeue(self, ids=None):
+        """Queue failed messages (or the given ones) again; returns the re-queued ids."""
+        ids = self.ids(FAILED) if ids is None else [mid for mid in ids if mid in self._states and self.state(mid) != SENT]
+        for mid in ids:
+            self._record(mid, QUEUED, attempts=0, error=None)
+        return ids
+
+    def sent_within(self, seconds, now=None):
+        now = self._clock() if now is None else now
+        return sum(1 for at in self._sent_at if now - at < seconds)
+
+    def summary(self):
+        counts = {}
+        for entry in self._states.values():
+            counts[entry['state']] = counts.get(entry['state'], 0) + 1
+        latencies = sorted(entry['seconds'] for entry in self._states.values() if entry['state'] == SENT and entry.get('seconds') is not None)
+        summary = {'messages': len(self._states), 'states': counts}
+        if latencies:
+            summary['latency'] = {
+                'p50': latencies[len(latencies) // 2],
+                'p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                'max': latencies[-1],
+            }
+        return summary
+
+    def compact(self, keep_seconds=7 * QUOTA_WINDOW_SECONDS):
+        """Drop sent messages older than ``keep_seconds`` and rewrite the journal with one entry per message."""
+        now = self._clock()
+        with self._lock:
+            removed = [mid for mid, entry in self._states.items() if entry['state'] == SENT and now - entry['at'] >= keep_seconds]
+            for mid in removed:
+                del self._states[mid]
+            self._sent_at = [at for at in self._sent_at if now - at < keep_seconds]
+            lines = [json.dumps(entry, ensure_ascii=False) + '\n' for entry in self._states.values()]
+            _write_atomic(self.journal_path, ''.join(lines))
+        # Files go after the journal no longer mentions them, so a crash leaves only orphans.
+        for mid in removed:
+            self._message_path(mid).unlink(missing_ok=True)
+        return removed
+
+
+def _deliver(outbox, pool, mid, limiter, retries, backoff, sleep):
+    message = outbox.load(mid)
+    attempts = 0
+    while True:
+        attempts += 1
+        if limiter is not None:
+            limiter.acquire()
+        started = time.perf_counter()
+        try:
+            with pool.connection() as conn:
+                # Journaled once the connection is up, right before the message is handed over.
+                outbox.mark(mid, SENDING, attempts=attempts)
+                started = time.perf_counter()
+                conn.send(to=message['recipient'], subject=message['subject'], contents=message['body'], prettify_html=False)
+        except smtplib.SMTPAuthenticationError:
+            raise
+        except Exception as error:
+            seconds = time.perf_counter() - started
+            error_text = f'{type(error).__name__}: {error}'
+            transient = is_transient_error(error)
+            if transient and attempts <= retries:
+                outbox.mark(mid, DEFERRED, attempts=attempts, seconds=seconds, error=error_text)
+                sleep(backoff * 2 ** (attempts - 1))
+                continue
+            status = DEFERRED if transient else FAILED
+            outbox.mark(mid, status, attempts=attempts, seconds=seconds, error=error_text)
+            return {'id': mid, 'recipient': message['recipient'], 'status': status, 'attempts': attempts, 'error': error_text, 'seconds': seconds}
+        seconds = time.perf_counter() - started
+        outbox.mark(mid, SENT, attempts=attempts, seconds=seconds, error=None)
+        return {'id': mid, 'recipient': message['recipient'], 'status': SENT, 'attempts': attempts, 'error': None, 'seconds': seconds}
+
+
+def is_failure(result):
+    """Whether a drain result is a failed delivery; messages held back by the daily quota are not."""
+    return result['status'] != SENT and result['attempts'] > 0
+
+
+def drain(outbox, connection_factory, workers=DEFAULT_WORKERS, rate=None, burst=1, daily_quota=None,
+          retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, sleep=time.sleep):
+    """Deliver every pending message; returns one result dict per message attempted.
+
+    ``rate`` caps messages per second and ``daily_quota`` the messages sent in any
+    24 hours; messages over the quota stay deferred for the next drain. A rejected
+    login raises SMTPAuthenticationError and leaves the undelivered messages pending.
+    """
+    outbox.recover()
+    pending = outbox.pending()
+    results = []
+    if daily_quota is not None:
+        allowed = max(0, daily_quota - outbox.sent_within(QUOTA_WINDOW_SECONDS))
+        for mid in pending[allowed:]:
+            error = f'daily quota of {daily_quota} reached'
+            outbox.mark(mid, DEFERRED, error=error)
+            results.append({'id': mid, 'recipient': outbox.entry(mid).get('recipient'), 'status': DEFERRED,
+                            'attempts': 0, 'error': error, 'seconds': 0.0})
+        pending = pending[:allowed]
+    if not pending:
+        return results
+
+    limiter = RateLimiter(rate, burst, sleep=sleep) if rate else None
+    workers = max(1, min(workers, len(pending)))
+    pool = SMTPPool(connection_factory, workers)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            delivered = list(executor.map(lambda mid: _deliver(outbox, pool, mid, limiter, retries, backoff, sleep), pending))
+    finally:
+        pool.close()
+    return delivered + results
+
+
+def format_summary(summary):
+    states = ', '.join(f'{state} {count}' for state, count in sorted(summary['states'].items())) or 'empty'
+    line = f"{summary['messages']} message(s): {states}"
+    latency = summary.get('latency')
+    if latency:
+        line += f" | send latency p50 {latency['p50'] * 1000:.0f} ms, p95 {latency['p95'] * 1000:.0f} ms"
+    return line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Inspect and drain the email outbox')
+    parser.add_argument('--outbox', default=None, help=f'outbox directory (default: cache dir / {OUTBOX_DIR})')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    status_parser = subparsers.add_parser('status', help='count messages per state')
+    status_parser.add_argument('--json', action='store_true')
+
+    drain_parser = subparsers.add_parser('drain', help='deliver pending messages (password from SMTP_PASSWORD)')
+    drain_parser.add_argument('--host', default='smtp.gmail.com')
+    drain_parser.add_argument('--port', type=int, default=465)
+    drain_parser.add_argument('--security', choices=('ssl', 'starttls', 'none'), default='ssl')
+    drain_parser.add_argument('--username', default=os.getenv('SMTP_USERNAME'))
+    drain_parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    drain_parser.add_argument('--rate', type=float, default=None, help='messages per second')
+    drain_parser.add_argument('--burst', type=int, default=1)
+    drain_parser.add_argument('--daily-quota', type=int, default=None)
+    drain_parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES)
+
+    retry_parser = subparsers.add_parser('retry', help='re-queue failed messages (or the given ids)')
+    retry_parser.add_argument('ids', nargs='*')
+
+    compact_parser = subparsers.add_parser('compact', help='forget sent messages older than --days')
+    compact_parser.add_argument('--days', type=float, default=7)
+
+    args = parser.parse_args(argv)
+    outbox = Outbox(args.outbox)
+    if args.command == 'status':
+        summary = outbox.summary()
+        print(json.dumps(summary) if args.json else format_summary(summary))
+        return 0
+    if args.command == 'retry':
+        print(f'Re-queued {len(outbox.requeue(args.ids or None))} message(s)')
+        return 0
+    if args.command == 'compact':
+        print(f'Removed {len(outbox.compact(args.days * QUOTA_WINDOW_SECONDS))} sent message(s)')
+        return 0
+
+    password = os.getenv('SMTP_PASSWORD')
+    results = drain(
+        outbox,
+        lambda: SMTPConnection(
+            args.host, args.port, args.username, password,
+            use_ssl=args.security == 'ssl', starttls=args.security == 'starttls',
+        ),
+        workers=args.workers, rate=args.rate, burst=args.burst, daily_quota=args.daily_quota, retries=args.retries,
+    )
+    print(f"Delivered {sum(1 for result in results if result['status'] == SENT)}/{len(results)} message(s)", file=sys.stderr)
+    print(format_summary(outbox.summary()))
+    return 0 if all(result['status'] == SENT for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+# payload_io.py
+"""Read the trending payload from argv, a file or stdin.
+
+A payload argument is one of:
+
+- ``-``: read from stdin;
+- ``@path``: read from a file;
+- anything else: the legacy base64 string passed directly in argv.
+
+File and stdin input may be raw JSON or base64 text, and either may be gzip
+compressed (detected from the magic bytes). Base64 is decoded in chunks while
+``json.load`` reads, so the encoded and decoded payloads are never both held
+in memory.
+"""
+import binascii
+import gzip
+import io
+import json
+import sys
+
+GZIP_MAGIC = b'\x1f\x8b'
+CHUNK_SIZE = 64 * 1024
+
+_URLSAFE_TO_STANDARD = bytes.maketrans(b'-_', b'+/')
+_WHITESPACE = b' \t\r\n'
+
+
+class Base64Reader(io.RawIOBase):
+    """Decode a (urlsafe or standard) base64 byte stream on the fly."""
+
+    def __init__(self, stream, chunk_size=CHUNK_SIZE):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._pending = b''
+        self._decoded = b''
+        self._eof = False
+
+    def readable(self):
+        return True
+
+    def _fill(self):
+        while not self._decoded and not self._eof:
+            chunk = self._stream.read(self._chunk_size)
+            if not chunk:
+                self._eof = True
+                data = self._pending
+                if data:
+                    data += b'=' * (-len(data) % 4)
+            else:
+                data = self._pending + chunk.translate(_URLSAFE_TO_STANDARD, _WHITESPACE)
+                usable = len(data) - len(data) % 4
+                data, self._pending = data[:usable], data[usable:]
+            if data:
+                try:
+                    self._decoded = binascii.a2b_base64(data)
+                except binascii.Error as error:
+                    raise ValueError(f'Invalid base64 payload: {error}') from error
+
+    def readinto(self, buffer):
+        self._fill()
+        size = min(len(buffer), len(self._decoded))
+        buffer[:size] = self._decoded[:size]
+        self._decoded = self._decoded[size:]
+        return size
+
+
+def _peek(stream, size=2):
+    data = stream.peek(size)
+    # BufferedReader.peek may return fewer bytes than asked for right after a refill.
+    return data[:size]
+
+
+def _first_content_byte(stream):
+    data = stream.peek(CHUNK_SIZE).lstrip(_WHITESPACE)
+    return data[:1]
+
+
+def _buffered(stream):
+    return stream if isinstance(stream, io.BufferedReader) else io.BufferedReader(stream, CHUNK_SIZE)
+
+
+def open_payload_stream(stream):
+    """Wrap a binary stream so it yields the decoded JSON bytes."""
+    stream = _buffered(stream)
+    if _peek(stream) == GZIP_MAGIC:
+        stream = _buffered(gzip.GzipFile(fileobj=stream))
+
+    if _first_content_byte(stream) in (b'{', b'['):
+        return stream
+
+    stream = _buffered(Base64Reader(stream))
+    if _peek(stream) == GZIP_MAGIC:
+        stream = _buffered(gzip.GzipFile(fileobj=stream))
+    return stream
+
+
+def load_payload_stream(stream):
+    return json.load(io.TextIOWrapper(open_payload_stream(stream), encoding='utf-8'))
+
+
+def load_payload(source, stdin=None):
+    """Decode the payload given as ``-`` (stdin), ``@path`` (file) or a base64 string."""
+    if source == '-':
+        stdin = stdin if stdin is not None else sys.stdin.buffer
+        return load_payload_stream(stdin)
+    if isinstance(source, str) and source.startswith('@'):
+        with open(source[1:], 'rb') as f:
+            return load_payload_stream(f)
+    if isinstance(source, str):
+        source = source.encode('ascii')
+    return load_payload_stream(io.BytesIO(source))
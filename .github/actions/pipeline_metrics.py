@@ -0,0 +1,102 @@
+# pipeline_metrics.py
+"""Per-stage timing and size metrics for the send pipeline.
+
+Stages are recorded with ``timed(metrics, name)``, which also works when
+``metrics`` is None so instrumented code needs no branches:
+
+    with timed(metrics, 'payload.decode') as stage:
+        data = load_payload(source)
+        stage.bytes = len(source)
+
+``PipelineMetrics.write`` emits the collected stages as JSON (``-`` prints to
+stdout). ``profiled(path)`` wraps a block in cProfile and dumps the stats to
+``path`` for ``python -m pstats`` or snakeviz.
+"""
+import cProfile
+import json
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+class Stage:
+    __slots__ = ('name', 'seconds', 'bytes', 'extra')
+
+    def __init__(self, name, **extra):
+        self.name = name
+        self.seconds = None
+        self.bytes = None
+        self.extra = extra
+
+    def to_dict(self):
+        entry = {'name': self.name, 'seconds': self.seconds}
+        if self.bytes is not None:
+            entry['bytes'] = self.bytes
+        entry.update(self.extra)
+        return entry
+
+
+class PipelineMetrics:
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        self.stages = []
+
+    def add(self, stage):
+        self.stages.append(stage)
+
+    def totals(self, prefix):
+        """Sum seconds and bytes over the stages whose name starts with ``prefix``."""
+        matching = [stage for stage in self.stages if stage.name.startswith(prefix)]
+        return {
+            'seconds': sum(stage.seconds or 0 for stage in matching),
+            'bytes': sum(stage.bytes or 0 for stage in matching),
+        }
+
+    def to_dict(self):
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'total_seconds': time.perf_counter() - self._started,
+            'stages': [stage.to_dict() for stage in self.stages],
+        }
+
+    def write(self, path):
+        document = json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+        if str(path) == '-':
+            print(document)
+            return
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(document + '\n', encoding='utf-8')
+
+
+@contextmanager
+def timed(metrics, name, **extra):
+    """Time the block as stage ``name``; the yielded ``Stage`` takes ``bytes`` and ``extra``."""
+    stage = Stage(name, **extra)
+    started = time.perf_counter()
+    try:
+        yield stage
+    finally:
+        stage.seconds = time.perf_counter() - started
+        if metrics is not None:
+            metrics.add(stage)
+
+
+@contextmanager
+def profiled(path):
+    """Run the block under cProfile and dump the stats to ``path`` (no-op if empty)."""
+    if not path:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(str(path))
+        print(f'Profile written to {path}', file=sys.stderr)
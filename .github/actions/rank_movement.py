@@ -0,0 +1,256 @@
+# rank_movement.py
+"""Day-over-day rank movement between consecutive archived snapshots.
+
+The earlier day is indexed once as ``(bucket, repo key) -> (rank, today's stars)``
+over every language bucket. One pass over the later day then yields, per
+bucket, each repo's rank delta (or "new") and its star-gain acceleration, and
+whatever is left in the index is the list of repos that dropped off. Results
+are stored per date pair under ``<archive>/movements/`` with the revisions they
+were computed from. The email is sent before the writer archives the day, so
+it diffs its own payload against the latest archived day instead.
+"""
+import argparse
+import json
+import os
+from datetime import date as Date
+from datetime import timedelta
+from pathlib import Path
+
+from repo_history import repo_key
+from trending_archive import ARCHIVE_DIR, MISSING_COUNT, TrendingArchive, parse_count, parse_day
+
+MOVEMENTS_DIR = 'movements'
+MOVEMENTS_VERSION = 2
+
+# moves entries: {repo key: [title, rank, previous rank or None, today's stars, acceleration or None]}
+TITLE, RANK, PREVIOUS_RANK, TODAY_STARS, ACCELERATION = range(5)
+
+
+def bucket_name(key):
+    """Bucket key as used in movement documents: the unnamed/"All" bucket is ``all``."""
+    return (key or 'all').lower()
+
+
+def _index(archive, columns_by_bucket):
+    get = archive.strings.get
+    index = {}
+    for key, columns in columns_by_bucket.items():
+        if isinstance(columns, str):
+            continue
+        bucket = bucket_name(key)
+        for i, title_id in enumerate(columns.titles):
+            title = get(title_id)
+            index[(bucket, repo_key(title))] = (i + 1, columns.today_stars[i], title)
+    return index
+
+
+def _diff(remaining, current):
+    """Per-bucket moves of ``current`` (``(bucket, [(title, today's stars)])`` pairs) against ``remaining``."""
+    buckets = {}
+    for bucket, rows in current:
+        moves = {}
+        for rank, (title, today_stars) in enumerate(rows, 1):
+            slug = repo_key(title)
+            before = remaining.pop((bucket, slug), None)
+            previous_rank = acceleration = None
+            if before is not None:
+                previous_rank, previous_today, _ = before
+                if today_stars != MISSING_COUNT and previous_today != MISSING_COUNT:
+                    acceleration = today_stars - previous_today
+            moves[slug] = [title, rank, previous_rank, today_stars, acceleration]
+        buckets[bucket] = {'moves': moves, 'dropped': []}
+
+    # Whatever was not matched above left its bucket (or the bucket disappeared).
+    for (bucket, _), (rank, _, title) in sorted(remaining.items(), key=lambda item: (item[0][0], item[1][0])):
+        buckets.setdefault(bucket, {'moves': {}, 'dropped': []})['dropped'].append([title, rank])
+    return buckets
+
+
+def diff_days(archive, previous, day):
+    """Compare two archived days; returns a movement document (see ``MOVEMENTS_VERSION``)."""
+    get = archive.strings.get
+    current = (
+        (bucket_name(key), [(get(title_id), today_stars) for title_id, today_stars in zip(columns.titles, columns.today_stars)])
+        for key, columns in (archive.columns(day) or {}).items()
+        if not isinstance(columns, str)
+    )
+    return {
+        'version': MOVEMENTS_VERSION,
+        'previous': previous,
+        'day': day,
+        'revisions': [archive.revision(previous), archive.revision(day)],
+        'buckets': _diff(_index(archive, archive.columns(previous) or {}), current),
+    }
+
+
+def diff_payload(archive, github_trending, previous, day):
+    """Compare a payload's ``githubTrending`` for ``day`` with the archived ``previous`` day.
+
+    For the email, which is sent before the writer archives ``day``; the
+    document is not cached (its revision for ``day`` is None).
+    """
+    def today_stars(repo):
+        count = parse_count(repo.get('todayStars'))
+        return MISSING_COUNT if count is None else count
+
+    current = (
+        (bucket_name(key), [(repo.get('title', ''), today_stars(repo)) for repo in repos])
+        for key, repos in github_trending.items()
+        if isinstance(repos, list)
+    )
+    return {
+        'version': MOVEMENTS_VERSION,
+        'previous': previous,
+        'day': day,
+        'revisions': [archive.revision(previous), None],
+        'buckets': _diff(_index(archive, archive.columns(previous) or {}), current),
+    }
+
+
+def previous_day(archive, day):
+    """The latest archived day strictly before ``day``, or None."""
+    earlier = archive.ordinals(end=parse_day(day) - timedelta(days=1))
+    return Date.fromordinal(earlier[-1]).isoformat() if earlier else None
+
+
+def movement(entry):
+    """``{'status', 'delta', 'acceleration'}`` for a moves entry; status is new, up, down or same."""
+    rank, previous_rank = entry[RANK], entry[PREVIOUS_RANK]
+    if previous_rank is None:
+        return {'status': 'new', 'delta': None, 'acceleration': None}
+    delta = previous_rank - rank
+    status = 'up' if delta > 0 else 'down' if delta < 0 else 'same'
+    return {'status': status, 'delta': delta, 'acceleration': entry[ACCELERATION]}
+
+
+class RankMovements:
+    def __init__(self, root=ARCHIVE_DIR):
+        self.root = Path(root)
+        self.directory = self.root / MOVEMENTS_DIR
+        self._documents = {}
+
+    def _path(self, previous, day):
+        return self.directory / f'{previous}_{day}.json'
+
+    def _cached(self, archive, previous, day):
+        key = (previous, day)
+        document = self._documents.get(key)
+        if document is None:
+            path = self._path(previous, day)
+            if not path.exists():
+                return None
+            document = json.loads(path.read_text(encoding='utf-8'))
+        if document.get('version') != MOVEMENTS_VERSION or document['revisions'] != [archive.revision(previous), archive.revision(day)]:
+            return None
+        self._documents[key] = document
+        return document
+
+    def get(self, archive, day, previous=None, store=True):
+        """Movement from ``previous`` (default: the archived day before ``day``) to ``day``, or None.
+
+        Computed on first use and cached on disk until either day is re-archived
+        (in memory only with ``store=False``).
+        """
+        day = parse_day(day).isoformat()
+        if day not in archive:
+            return None
+        previous = previous_day(archive, day) if previous is None else parse_day(previous).isoformat()
+        if previous is None or previous not in archive:
+            return None
+        document = self._cached(archive, previous, day)
+        if document is None:
+            document = diff_days(archive, previous, day)
+            if store:
+                self._write(document)
+            self._documents[(previous, day)] = document
+        return document
+
+    def _write(self, document):
+        path = self._path(document['previous'], document['day'])
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(document, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def update(self, archive, days=2):
+        """Make sure the movements into the last ``days`` archived days are cached; returns the days computed."""
+        computed = []
+        for day in archive.dates()[-days:]:
+            previous = previous_day(archive, day)
+            if previous is not None and self._cached(archive, previous, day) is None:
+                self.get(archive, day, previous)
+                computed.append(day)
+        return computed
+
+
+def annotate_repos(data, document):
+    """Return a copy of ``data`` whose GitHub repos carry ``rankMovement`` and with ``githubDroppedOff``.
+
+    ``githubDroppedOff`` maps every payload bucket key to the titles that left it.
+    """
+    gh = data.get('githubTrending')
+    if not isinstance(gh, dict) or document is None:
+        return data
+    buckets = document['buckets']
+    annotated, dropped = {}, {}
+    for key, repos in gh.items():
+        bucket = buckets.get(bucket_name(key))
+        if not isinstance(repos, list) or bucket is None:
+            annotated[key] = repos
+            continue
+        moves = bucket['moves']
+        annotated[key] = [
+            dict(repo, rankMovement=movement(moves[slug])) if (slug := repo_key(repo.get('title', ''))) in moves else repo
+            for repo in repos
+        ]
+        if bucket['dropped']:
+            dropped[key] = [title for title, _ in bucket['dropped']]
+    return dict(data, githubTrending=annotated, githubDroppedOff=dropped)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Day-over-day GitHub trending rank movement')
+    parser.add_argument('--archive', default=ARCHIVE_DIR)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    update_parser = subparsers.add_parser('update', help='cache the movements into the latest archived days')
+    update_parser.add_argument('--days', type=int, default=2)
+
+    show_parser = subparsers.add_parser('show', help='print the movement into a day (default: the latest)')
+    show_parser.add_argument('day', nargs='?')
+    show_parser.add_argument('--previous', default=None)
+    show_parser.add_argument('--bucket', default=None, help='only this language bucket')
+    show_parser.add_argument('--json', action='store_true')
+
+    args = parser.parse_args(argv)
+    with TrendingArchive(args.archive) as archive:
+        movements = RankMovements(args.archive)
+        if args.command == 'update':
+            print(f'Computed {len(movements.update(archive, args.days))} day pair(s)')
+            return
+        dates = archive.dates()
+        day = args.day or (dates[-1] if dates else None)
+        document = movements.get(archive, day, args.previous) if day else None
+    if document is None:
+        parser.error(f'no movement for {day or "an empty archive"}')
+    if args.json:
+        print(json.dumps(document, ensure_ascii=False))
+        return
+
+    print(f"{document['previous']} → {document['day']}")
+    for bucket, changes in document['buckets'].items():
+        if args.bucket and bucket != args.bucket.lower():
+            continue
+        print(f'[{bucket}]')
+        for entry in changes['moves'].values():
+            move = movement(entry)
+            label = 'new' if move['status'] == 'new' else f"{'↑' if move['delta'] > 0 else '↓' if move['delta'] < 0 else '='}{abs(move['delta']) or ''}"
+            acceleration = '' if move['acceleration'] is None else f" {move['acceleration']:+,}⭐/day"
+            print(f"  #{entry[RANK]:<3} {entry[TITLE]:<40} {label:<5}{acceleration}")
+        if changes['dropped']:
+            print(f"  dropped off: {', '.join(title for title, _ in changes['dropped'])}")
+
+
+if __name__ == '__main__':
+    main()
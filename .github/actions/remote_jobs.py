@@ -0,0 +1,294 @@
+# remote_jobs.py
+"""Discovery and parsing of the daily remote-jobs Markdown reports.
+
+Each report directory gets a manifest of ``(date, filename)`` pairs sorted by
+date. The manifest is cached in memory and on disk and rebuilt only when the
+directory's mtime changes, which happens whenever a report is added, removed
+or renamed.
+
+Reports are parsed once into job records (tier, header parts, ``key：value``
+fields, links) plus the block structure the email renderer needs; the result
+is cached on disk keyed by the hash of the report content.
+"""
+import hashlib
+import json
+import os
+import re
+from bisect import bisect_left, bisect_right
+from datetime import date as Date
+from pathlib import Path
+
+from cache_paths import cache_dir
+
+REPORT_GLOB = 'daily_remote_jobs_*.md'
+
+_REPORT_NAME_RE = re.compile(r'daily_remote_jobs_(\d{4}-\d{2}-\d{2})\.md$')
+
+_manifests = {}
+
+
+def report_date(path):
+    match = _REPORT_NAME_RE.search(Path(path).name)
+    if not match:
+        return None
+    try:
+        return Date.fromisoformat(match.group(1))
+    except ValueError:
+        return None
+
+
+class ReportManifest:
+    def __init__(self, directory, reports):
+        self.directory = Path(directory)
+        self.dates = [day for day, _ in reports]
+        self.names = [name for _, name in reports]
+
+    def __len__(self):
+        return len(self.dates)
+
+    def _path(self, index):
+        return self.directory / self.names[index]
+
+    def latest(self):
+        return self._path(-1) if self.dates else None
+
+    def latest_before(self, day, inclusive=True):
+        """Newest report dated on (or strictly before, if not ``inclusive``) ``day``."""
+        day = str(day)
+        index = (bisect_right if inclusive else bisect_left)(self.dates, day)
+        return self._path(index - 1) if index else None
+
+    def get(self, day):
+        index = bisect_left(self.dates, str(day))
+        if index < len(self.dates) and self.dates[index] == str(day):
+            return self._path(index)
+        return None
+
+    def between(self, start=None, end=None):
+        lo = 0 if start is None else bisect_left(self.dates, str(start))
+        hi = len(self.dates) if end is None else bisect_right(self.dates, str(end))
+        return [(self.dates[i], self._path(i)) for i in range(lo, hi)]
+
+
+def _scan(directory):
+    reports = []
+    for candidate in directory.glob(REPORT_GLOB):
+        day = report_date(candidate)
+        if day is not None:
+            reports.append((day.isoformat(), candidate.name))
+    reports.sort()
+    return reports
+
+
+def _manifest_cache_path(directory):
+    digest = hashlib.sha1(str(directory).encode('utf-8')).hexdigest()[:16]
+    return cache_dir() / f'remote-jobs-manifest-{digest}.json'
+
+
+def _read_cached_reports(directory, mtime_ns):
+    try:
+        cached = json.loads(_manifest_cache_path(directory).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    if cached.get('directory') != str(directory) or cached.get('mtime_ns') != mtime_ns:
+        return None
+    return [tuple(entry) for entry in cached.get('reports', [])]
+
+
+def _write_cached_reports(directory, mtime_ns, reports):
+    cache_path = _manifest_cache_path(directory)
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix('.tmp')
+        tmp_path.write_text(
+            json.dumps({'directory': str(directory), 'mtime_ns': mtime_ns, 'reports': reports}),
+            encoding='utf-8',
+        )
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+
+
+def load_manifest(directory):
+    """Return the ``ReportManifest`` for ``directory`` (None if it does not exist)."""
+    directory = Path(directory).resolve()
+    try:
+        mtime_ns = directory.stat().st_mtime_ns
+    except OSError:
+        return None
+
+    cached = _manifests.get(directory)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+
+    reports = _read_cached_reports(directory, mtime_ns)
+    if reports is None:
+        reports = _scan(directory)
+        _write_cached_reports(directory, mtime_ns, reports)
+
+    manifest = ReportManifest(directory, reports)
+    _manifests[directory] = (mtime_ns, manifest)
+    return manifest
+
+
+# ---- Report parsing -------------------------------------------------------
+
+PARSER_VERSION = 1
+
+_JOB_HEADER_RE = re.compile(r'^(\d+)\.\s+(.*)$')
+_FIELD_RE = re.compile(r'^([^：:]{1,40})[：:]\s*(.*)$')
+_LINK_RE = re.compile(r'https?://[^\s<）)，,]+')
+_TIERS = {'S', 'A', 'B', 'C', 'D'}
+_LINK_FIELDS = ('申请链接', '链接', 'link', 'url')
+
+
+def _parse_job_header(number, header, section):
+    parts = [part.strip() for part in header.split('|')]
+    tier = parts[0].upper() if parts and parts[0].upper() in _TIERS else None
+    if tier:
+        parts = parts[1:]
+    parts += [''] * (4 - len(parts))
+    return {
+        'number': int(number),
+        'tier': tier,
+        'title': parts[0],
+        'company': parts[1],
+        'source': parts[2],
+        'mode': ' | '.join(part for part in parts[3:] if part),
+        'section': section,
+        'fields': {},
+        'links': [],
+    }
+
+
+def parse_report(content):
+    """Parse a report in one pass into ``{'title', 'blocks', 'jobs'}``.
+
+    ``blocks`` keeps the document order for rendering: ``('heading', text)``,
+    ``('job', header_line, job_index)``, ``('list', [bullets])`` and ``('text', line)``.
+    Bullets following a numbered job header become that job's fields and links.
+    """
+    title = None
+    blocks = []
+    jobs = []
+    section = None
+    current_job = None
+    bullets = None
+
+    for raw_line in content.splitlines():
+        line = raw_line.strip()
+        if line.startswith('- '):
+            text = line[2:].strip()
+            if bullets is None:
+                bullets = []
+                blocks.append(('list', bullets))
+            bullets.append(text)
+            if current_job is not None:
+                field = _FIELD_RE.match(text)
+                if field and not field.group(2).startswith('//'):
+                    current_job['fields'][field.group(1).strip()] = field.group(2).strip()
+                current_job['links'].extend(_LINK_RE.findall(text))
+            continue
+
+        bullets = None
+        if not line:
+            continue
+        if line.startswith('主题：'):
+            if title is None:
+                title = line.replace('主题：', '', 1).strip()
+            continue
+        if line.startswith('## '):
+            section = line[3:]
+            current_job = None
+            blocks.append(('heading', section))
+            continue
+
+        header = _JOB_HEADER_RE.match(line)
+        if header:
+            current_job = _parse_job_header(header.group(1), header.group(2), section)
+            blocks.append(('job', line, len(jobs)))
+            jobs.append(current_job)
+            continue
+
+        current_job = None
+        blocks.append(('text', line))
+
+    return {'title': title, 'blocks': blocks, 'jobs': jobs}
+
+
+def _parsed_cache_path(digest):
+    return cache_dir() / 'remote-jobs-parsed' / f'v{PARSER_VERSION}-{digest}.json'
+
+
+def load_parsed_report(path, content=None):
+    """Parse ``path`` (or its already-read ``content``), cached on disk by content hash."""
+    if content is None:
+        content = Path(path).read_text(encoding='utf-8')
+    digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+    cache_path = _parsed_cache_path(digest)
+    try:
+        parsed = json.loads(cache_path.read_text(encoding='utf-8'))
+        parsed['blocks'] = [tuple(block) for block in parsed['blocks']]
+        return parsed
+    except (OSError, ValueError, KeyError):
+        pass
+
+    parsed = parse_report(content)
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(parsed, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+    return parsed
+
+
+def job_link(job):
+    for name in _LINK_FIELDS:
+        value = job['fields'].get(name)
+        if value:
+            links = _LINK_RE.findall(value)
+            if links:
+                return links[0]
+    return job['links'][0] if job['links'] else None
+
+
+def posting_key(job):
+    """Identify a posting across reports: its apply link, else title + company."""
+    link = job_link(job)
+    if link:
+        return link.rstrip('/').lower()
+    return f"{job['title']}|{job['company']}".lower()
+
+
+def iter_report_jobs(directory, start=None, end=None):
+    """Yield ``(date, job)`` for every job in the reports dated within ``[start, end]``."""
+    manifest = load_manifest(directory)
+    if manifest is None:
+        return
+    for day, path in manifest.between(start, end):
+        for job in load_parsed_report(path)['jobs']:
+            yield day, job
+
+
+def dedupe_jobs(dated_jobs):
+    """Collapse postings seen on several days; keeps the newest record and every date."""
+    postings = {}
+    for day, job in dated_jobs:
+        key = posting_key(job)
+        entry = postings.get(key)
+        if entry is None:
+            postings[key] = {'job': job, 'dates': [day]}
+        else:
+            if day >= entry['dates'][-1]:
+                entry['job'] = job
+            entry['dates'].append(day)
+    for entry in postings.values():
+        entry['dates'].sort()
+    return list(postings.values())
+
+
+def filter_by_tier(jobs, tiers):
+    tiers = {tier.upper() for tier in tiers}
+    return [job for job in jobs if job.get('tier') in tiers]
@@ -0,0 +1,122 @@
+# render_cache.py
+"""Render each email section once and assemble many emails from the fragments.
+
+Sections are memoized by the section name, a content hash of its items and
+render options, and its item limit, so subscribers whose configurations
+overlap share fragments and rendering scales with the number of distinct
+sections. Fragments are rendered with a placeholder in place of every
+``uid()`` marker; fresh ids are spliced in when an email is assembled, so no
+two messages carry the same markers.
+"""
+import hashlib
+import json
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from email_budget import render_section
+
+UID_PLACEHOLDER = '\x00uid\x00'
+DEFAULT_MAX_ENTRIES = 1024
+
+_placeholder = ContextVar('uid_placeholder', default=None)
+
+
+def uid_placeholder():
+    """The placeholder ``uid()`` should return while a cached fragment renders, else None."""
+    return _placeholder.get()
+
+
+@contextmanager
+def placeholder_uids():
+    token = _placeholder.set(UID_PLACEHOLDER)
+    try:
+        yield
+    finally:
+        _placeholder.reset(token)
+
+
+def content_digest(value):
+    document = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(document.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class SectionCache:
+    """LRU map from section content hash to the fragment split at its uid placeholders.
+
+    Inputs are treated as immutable for the life of the cache: the digest of a
+    list or report is computed once per object and reused while it is alive.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._fragments = OrderedDict()
+        self._digests = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._fragments)
+
+    def _digest(self, value):
+        if isinstance(value, (str, int, float, type(None))):
+            return value
+        entry = self._digests.get(id(value))
+        if entry is not None and entry[0] is value:
+            return entry[1]
+        if len(self._digests) >= 4 * self.max_entries:
+            self._digests.clear()
+        digest = content_digest(value)
+        # Keep a reference so the id cannot be reused by another object.
+        self._digests[id(value)] = (value, digest)
+        return digest
+
+    def section_key(self, name, items, limit, render):
+        if isinstance(render, partial):
+            options = tuple((key, self._digest(value)) for key, value in sorted(render.keywords.items()))
+            render = render.func
+        else:
+            options = ()
+        return (name, getattr(render, '__qualname__', repr(render)), options,
+                None if items is None else self._digest(items), limit)
+
+    def fragment(self, name, items, render, limit=None):
+        """Return the rendered section split at its uid placeholders (``items[:limit]`` is rendered)."""
+        key = self.section_key(name, items, limit, render)
+        parts = self._fragments.get(key)
+        if parts is not None:
+            self.hits += 1
+            self._fragments.move_to_end(key)
+            return parts
+
+        self.misses += 1
+        if items is not None and limit is not None:
+            items = items[:limit]
+        with placeholder_uids():
+            parts = tuple(render_section(render, items).split(UID_PLACEHOLDER))
+        self._fragments[key] = parts
+        if self.max_entries and len(self._fragments) > self.max_entries:
+            self._fragments.popitem(last=False)
+        return parts
+
+    def assemble(self, plan, uid, item_limit, section_limits=None):
+        """Build one email from ``plan`` (see ``send_email.plan_email_sections``), calling ``uid`` per marker."""
+        section_limits = section_limits or {}
+        out = []
+        append = out.append
+        for name, items, render in plan:
+            limit = None
+            if items is not None:
+                limit = section_limits.get(name, item_limit)
+                if limit <= 0:
+                    continue
+            parts = self.fragment(name, items, render, limit)
+            append(parts[0])
+            for part in parts[1:]:
+                append(uid())
+                append(part)
+        return ''.join(out)
+
+    def stats(self):
+        return {'entries': len(self._fragments), 'hits': self.hits, 'misses': self.misses}
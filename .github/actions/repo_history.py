@@ -0,0 +1,224 @@
+# repo_history.py
+"""Per-repo trending history backed by an inverted index over the archive.
+
+``repo-history.bin`` holds fixed-size postings (date, language, rank, stars,
+today stars, previous posting of the same repo). ``repo-history.json`` maps every
+repo to its newest posting, so a lookup walks only that repo's chain. Both files
+live next to the archive and are extended incrementally as new days are archived.
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+from collections import namedtuple
+from datetime import date as Date
+from pathlib import Path
+
+from trending_archive import ARCHIVE_DIR, MISSING_COUNT, TrendingArchive
+
+POSTINGS_FILE = 'repo-history.bin'
+HEADS_FILE = 'repo-history.json'
+
+NO_POSTING = 0xFFFFFFFF
+
+_POSTING = struct.Struct('<IHHiiI')
+
+Appearance = namedtuple('Appearance', 'date language rank stars today_stars')
+Streak = namedtuple('Streak', 'start end days')
+
+
+def repo_key(title):
+    return ''.join(str(title).split()).lower()
+
+
+def _streak(start, end):
+    return Streak(Date.fromordinal(start).isoformat(), Date.fromordinal(end).isoformat(), end - start + 1)
+
+
+def find_streaks(appearances):
+    """Group appearances into runs of consecutive calendar days."""
+    streaks = []
+    start = previous = None
+    days = sorted({Date.fromisoformat(item.date).toordinal() for item in appearances})
+    for ordinal in days:
+        if previous is not None and ordinal == previous + 1:
+            previous = ordinal
+            continue
+        if start is not None:
+            streaks.append(_streak(start, previous))
+        start = previous = ordinal
+    if start is not None:
+        streaks.append(_streak(start, previous))
+    return streaks
+
+
+class RepoHistory:
+    def __init__(self, root=ARCHIVE_DIR):
+        self.root = Path(root)
+        self._load()
+
+    def _load(self):
+        heads_path = self.root / HEADS_FILE
+        state = {}
+        if heads_path.exists():
+            state = json.loads(heads_path.read_text(encoding='utf-8'))
+        self.languages = state.get('languages', [])
+        self.days = state.get('days', {})
+        self.heads = state.get('repos', {})
+        self.count = state.get('count', 0)
+        self._language_ids = {language: i for i, language in enumerate(self.languages)}
+
+    def _save(self):
+        heads_path = self.root / HEADS_FILE
+        tmp_path = heads_path.with_suffix('.json.tmp')
+        state = {
+            'count': self.count,
+            'languages': self.languages,
+            'days': self.days,
+            'repos': self.heads,
+        }
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, heads_path)
+
+    def _language_id(self, language):
+        language_id = self._language_ids.get(language)
+        if language_id is None:
+            language_id = len(self.languages)
+            self.languages.append(language)
+            self._language_ids[language] = language_id
+        return language_id
+
+    def reset(self):
+        for name in (POSTINGS_FILE, HEADS_FILE):
+            path = self.root / name
+            if path.exists():
+                path.unlink()
+        self._load()
+
+    def update(self, archive):
+        """Index every archived day that is not indexed yet; returns the new days.
+
+        A day that was re-archived after being indexed forces a full rebuild.
+        """
+        archived = {day: archive.revision(day) for day in archive.dates()}
+        if any(archived.get(day) != revision for day, revision in self.days.items()):
+            self.reset()
+        pending = sorted(day for day in archived if day not in self.days)
+        if not pending:
+            return []
+
+        records = []
+        get = archive.strings.get
+        for day in pending:
+            ordinal = Date.fromisoformat(day).toordinal()
+            for language, columns in archive.columns(day).items():
+                if isinstance(columns, str):
+                    continue
+                language_id = self._language_id(language)
+                for rank, title_id in enumerate(columns.titles, start=1):
+                    key = repo_key(get(title_id))
+                    head, total = self.heads.get(key, (NO_POSTING, 0))
+                    records.append(_POSTING.pack(
+                        ordinal, language_id, rank,
+                        columns.stars[rank - 1], columns.today_stars[rank - 1], head,
+                    ))
+                    self.heads[key] = (self.count, total + 1)
+                    self.count += 1
+            self.days[day] = archived[day]
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        postings_path = self.root / POSTINGS_FILE
+        with open(postings_path, 'r+b' if postings_path.exists() else 'wb') as f:
+            f.seek((self.count - len(records)) * _POSTING.size)
+            f.truncate()
+            f.write(b''.join(records))
+            f.flush()
+            os.fsync(f.fileno())
+        self._save()
+        return pending
+
+    def repos(self):
+        return sorted(self.heads)
+
+    def lookup(self, repo):
+        """Return every trending appearance of ``repo`` in date order."""
+        head = self.heads.get(repo_key(repo))
+        if head is None:
+            return []
+
+        appearances = []
+        with open(self.root / POSTINGS_FILE, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as postings:
+                index = head[0]
+                while index != NO_POSTING:
+                    ordinal, language_id, rank, stars, today_stars, index = _POSTING.unpack_from(
+                        postings, index * _POSTING.size,
+                    )
+                    appearances.append(Appearance(
+                        Date.fromordinal(ordinal).isoformat(),
+                        self.languages[language_id],
+                        rank,
+                        stars,
+                        today_stars,
+                    ))
+        appearances.reverse()
+        return appearances
+
+    def streaks(self, repo):
+        return find_streaks(self.lookup(repo))
+
+
+def _format_count(count, prefix=''):
+    """``count`` with thousands separators, or "–" when the archive has no count."""
+    return '–' if count == MISSING_COUNT else f'{prefix}{count:,}'
+
+
+def update_history(archive_dir=ARCHIVE_DIR):
+    with TrendingArchive(archive_dir) as archive:
+        return RepoHistory(archive_dir).update(archive)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Query GitHub trending history per repo')
+    parser.add_argument('--archive', default=ARCHIVE_DIR)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('update', help='index newly archived days')
+
+    show_parser = subparsers.add_parser('show', help='print the history of owner/repo')
+    show_parser.add_argument('repo')
+    show_parser.add_argument('--json', action='store_true')
+
+    args = parser.parse_args(argv)
+    if args.command == 'update':
+        indexed = update_history(args.archive)
+        print(f'Indexed {len(indexed)} new day(s)')
+        return
+
+    history = RepoHistory(args.archive)
+    appearances = history.lookup(args.repo)
+    streaks = find_streaks(appearances)
+    if args.json:
+        print(json.dumps({
+            'repo': args.repo,
+            'appearances': [item._asdict() for item in appearances],
+            'streaks': [item._asdict() for item in streaks],
+        }, ensure_ascii=False))
+        return
+
+    if not appearances:
+        print(f'{args.repo} has not trended in the archive')
+        return
+    for item in appearances:
+        language = item.language or 'all'
+        print(f'{item.date}  {language:<12} #{item.rank:<3} ⭐{_format_count(item.stars)}  {_format_count(item.today_stars, "+")}')
+    longest = max(streaks, key=lambda streak: streak.days)
+    print(f'{len(appearances)} appearance(s), longest streak {longest.days} day(s) ({longest.start} → {longest.end})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,319 @@
+# repo_search.py
+"""Keyword search over archived repos, for watchlist alerts.
+
+An inverted index maps every token of a repo's title, description and
+language to the repos containing it. Latin text is split into casefolded
+words; CJK runs are indexed as single characters plus bigrams and every emoji
+is a token of its own, so "智能体" and "🦀" are searchable. The index lives in
+``repo-search.json`` next to the archive and is extended incrementally as new
+days are archived.
+
+Queries AND their terms together: ``agent*`` matches any token starting with
+``agent`` and ``"vector database"`` must appear as a phrase.
+"""
+import argparse
+import json
+import os
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from pathlib import Path
+
+from repo_history import repo_key
+from trending_archive import ARCHIVE_DIR, TrendingArchive
+
+INDEX_FILE = 'repo-search.json'
+INDEX_VERSION = 2
+
+# Kana, CJK ideographs (incl. extension A and compatibility) and Hangul syllables.
+_CJK = r'぀-ヿ㐀-䶿一-鿿豈-﫿가-힯'
+_TOKEN_RE = re.compile(
+    rf'(?P<cjk>[{_CJK}]+)'
+    r'|(?P<emoji>[☀-➿\U0001F000-\U0001FAFF])'
+    rf'|(?P<word>[^\W_{_CJK}]+)'
+)
+_QUERY_TERM_RE = re.compile(r'"([^"]+)"|(\S+)')
+_SPACE_RE = re.compile(r'\s+')
+
+# docs entries: [key, title, description, language, first_seen, last_seen, link]
+KEY, TITLE, DESCRIPTION, LANGUAGE, FIRST_SEEN, LAST_SEEN, LINK = range(7)
+
+
+def normalize(text):
+    return _SPACE_RE.sub(' ', unicodedata.normalize('NFKC', text or '').casefold()).strip()
+
+
+def tokenize(text, query=False):
+    """Split ``text`` into index tokens.
+
+    CJK runs yield bigrams (and, when indexing, single characters too, so a
+    one-character query still matches); a one-character CJK query is a unigram.
+    """
+    tokens = []
+    for match in _TOKEN_RE.finditer(normalize(text)):
+        run = match.group('cjk')
+        if run is None:
+            tokens.append(match.group(0))
+            continue
+        if len(run) == 1 or not query:
+            tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def document_text(title, description, language):
+    return ' '.join(part for part in (title, description, language) if part)
+
+
+def parse_query(query):
+    """Return ``[(kind, value)]`` terms: ``('token', t)``, ``('prefix', p)`` or ``('phrase', text)``."""
+    terms = []
+    for phrase, word in _QUERY_TERM_RE.findall(query):
+        if phrase:
+            terms.append(('phrase', normalize(phrase)))
+        elif word.endswith('*'):
+            tokens = tokenize(word.rstrip('*'), query=True)
+            terms.extend(('token', token) for token in tokens[:-1])
+            if tokens:
+                terms.append(('prefix', tokens[-1]))
+        else:
+            terms.extend(('token', token) for token in tokenize(word, query=True))
+    return terms
+
+
+class RepoSearchIndex:
+    def __init__(self, root=ARCHIVE_DIR):
+        self.root = Path(root)
+        self._load()
+
+    def _load(self, empty=False):
+        path = self.root / INDEX_FILE
+        state = {}
+        if path.exists() and not empty:
+            state = json.loads(path.read_text(encoding='utf-8'))
+            if state.get('version') != INDEX_VERSION:
+                state = {}
+        self.days = state.get('days', {})
+        self.docs = state.get('docs', [])
+        self.postings = state.get('postings', {})
+        self._doc_ids = {doc[KEY]: i for i, doc in enumerate(self.docs)}
+        self._sorted_tokens = None
+
+    def _save(self):
+        path = self.root / INDEX_FILE
+        tmp_path = path.with_suffix('.json.tmp')
+        state = {'version': INDEX_VERSION, 'days': self.days, 'docs': self.docs, 'postings': self.postings}
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def __len__(self):
+        return len(self.docs)
+
+    def reset(self, store=True):
+        """Forget every indexed day; ``store=False`` leaves the index file in place."""
+        path = self.root / INDEX_FILE
+        if store and path.exists():
+            path.unlink()
+        self._load(empty=True)
+
+    def _index_doc(self, doc_id, tokens):
+        for token in set(tokens):
+            ids = self.postings.get(token)
+            if ids is None:
+                self.postings[token] = [doc_id]
+            elif ids[-1] < doc_id:
+                ids.append(doc_id)
+            else:
+                insort(ids, doc_id)
+
+    def _unindex_doc(self, doc_id, tokens):
+        for token in set(tokens):
+            ids = self.postings.get(token)
+            if not ids:
+                continue
+            index = bisect_left(ids, doc_id)
+            if index < len(ids) and ids[index] == doc_id:
+                del ids[index]
+            if not ids:
+                del self.postings[token]
+
+    def add(self, day, title, description, language, link=None):
+        key = repo_key(title)
+        doc_id = self._doc_ids.get(key)
+        if doc_id is None:
+            doc_id = len(self.docs)
+            self.docs.append([key, title, description, language, day, day, link])
+            self._doc_ids[key] = doc_id
+            self._index_doc(doc_id, tokenize(document_text(title, description, language)))
+            return
+
+        doc = self.docs[doc_id]
+        doc[FIRST_SEEN] = min(doc[FIRST_SEEN], day)
+        if day < doc[LAST_SEEN]:
+            return
+        doc[LAST_SEEN] = day
+        doc[LINK] = link or doc[LINK]
+        if (doc[TITLE], doc[DESCRIPTION], doc[LANGUAGE]) != (title, description, language):
+            # Keep the newest text: re-index only the repos whose text changed.
+            self._unindex_doc(doc_id, tokenize(document_text(doc[TITLE], doc[DESCRIPTION], doc[LANGUAGE])))
+            doc[TITLE], doc[DESCRIPTION], doc[LANGUAGE] = title, description, language
+            self._index_doc(doc_id, tokenize(document_text(title, description, language)))
+
+    def update(self, archive, store=True):
+        """Index every archived day not indexed yet; a re-archived day forces a rebuild.
+
+        With ``store=False`` the new days are indexed in memory only.
+        """
+        archived = {day: archive.revision(day) for day in archive.dates()}
+        if any(archived.get(day) != revision for day, revision in self.days.items()):
+            self.reset(store)
+        pending = sorted(day for day in archived if day not in self.days)
+        if not pending:
+            return []
+
+        get = archive.strings.get
+        for day in pending:
+            for columns in archive.columns(day).values():
+                if isinstance(columns, str):
+                    continue
+                for title_id, description_id, language_id, link_id in zip(
+                        columns.titles, columns.descriptions, columns.languages, columns.links):
+                    self.add(day, get(title_id), get(description_id) or '', get(language_id) or '', get(link_id))
+            self.days[day] = archived[day]
+        self._sorted_tokens = None
+        if store:
+            self._save()
+        return pending
+
+    def add_payload(self, day, github_trending):
+        """Index a payload's ``githubTrending`` for ``day`` in memory.
+
+        For the email, which is sent before the writer archives ``day``; the day is
+        not recorded as indexed, so the next ``update`` still indexes it from the archive.
+        """
+        for repos in github_trending.values():
+            if not isinstance(repos, list):
+                continue
+            for repo in repos:
+                if repo.get('title'):
+                    self.add(day, repo['title'], repo.get('description') or '', repo.get('language') or '', repo.get('link'))
+        self._sorted_tokens = None
+
+    def _prefix_ids(self, prefix):
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self.postings)
+        tokens = self._sorted_tokens
+        ids = set()
+        for i in range(bisect_left(tokens, prefix), len(tokens)):
+            if not tokens[i].startswith(prefix):
+                break
+            ids.update(self.postings[tokens[i]])
+        return ids
+
+    def search(self, query, since=None, limit=None):
+        """Return the docs matching every term of ``query``, most recently trending first.
+
+        ``since`` keeps only repos that trended on or after that day.
+        """
+        terms = parse_query(query)
+        if not terms:
+            return []
+
+        candidates = []
+        phrases = []
+        for kind, value in terms:
+            if kind == 'token':
+                candidates.append(self.postings.get(value, ()))
+            elif kind == 'prefix':
+                candidates.append(self._prefix_ids(value))
+            else:
+                phrases.append(value)
+                candidates.extend(self.postings.get(token, ()) for token in tokenize(value, query=True))
+        if not candidates:
+            return []
+
+        candidates.sort(key=len)
+        ids = set(candidates[0])
+        for other in candidates[1:]:
+            if not ids:
+                break
+            ids.intersection_update(other)
+
+        docs = [self.docs[i] for i in ids]
+        if since is not None:
+            docs = [doc for doc in docs if doc[LAST_SEEN] >= str(since)]
+        if phrases:
+            docs = [
+                doc for doc in docs
+                if all(phrase in normalize(document_text(doc[TITLE], doc[DESCRIPTION], doc[LANGUAGE])) for phrase in phrases)
+            ]
+        docs.sort(key=lambda doc: (doc[LAST_SEEN], doc[TITLE]), reverse=True)
+        return [self.result(doc) for doc in docs[:limit]]
+
+    @staticmethod
+    def result(doc):
+        return {
+            'title': doc[TITLE],
+            'description': doc[DESCRIPTION],
+            'language': doc[LANGUAGE],
+            # Archives without a link column: the title is "owner / name".
+            'link': doc[LINK] or '/' + ''.join(doc[TITLE].split()),
+            'firstSeen': doc[FIRST_SEEN],
+            'lastSeen': doc[LAST_SEEN],
+        }
+
+
+def update_search_index(archive_dir=ARCHIVE_DIR):
+    with TrendingArchive(archive_dir) as archive:
+        return RepoSearchIndex(archive_dir).update(archive)
+
+
+def parse_watchlist(value):
+    """Split a comma/semicolon/newline separated watchlist, keeping order."""
+    return list(dict.fromkeys(item.strip() for item in re.split(r'[,;\n]', value or '') if item.strip()))
+
+
+def watchlist_matches(index, keywords, since=None, per_keyword=5):
+    """Return ``[{'keyword', 'title', ...}]`` for every watchlist keyword, newest first per keyword."""
+    matches = []
+    for keyword in keywords:
+        for result in index.search(keyword, since=since, limit=per_keyword):
+            result['keyword'] = keyword
+            matches.append(result)
+    return matches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Search archived GitHub trending repos')
+    parser.add_argument('--archive', default=ARCHIVE_DIR)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('update', help='index newly archived days')
+
+    search_parser = subparsers.add_parser('search', help='find repos matching every query term')
+    search_parser.add_argument('query')
+    search_parser.add_argument('--since', default=None, help='only repos trending on or after this day')
+    search_parser.add_argument('--limit', type=int, default=20)
+    search_parser.add_argument('--json', action='store_true')
+
+    args = parser.parse_args(argv)
+    if args.command == 'update':
+        indexed = update_search_index(args.archive)
+        print(f'Indexed {len(indexed)} new day(s)')
+        return
+
+    results = RepoSearchIndex(args.archive).search(args.query, since=args.since, limit=args.limit)
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False))
+        return
+    for result in results:
+        print(f"{result['lastSeen']}  {result['title']:<40} {result['language'] or '-':<12} {result['description'][:70]}")
+    print(f'{len(results)} result(s)')
+
+
+if __name__ == '__main__':
+    main()
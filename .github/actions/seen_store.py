@@ -0,0 +1,230 @@
+# seen_store.py
+"""Remember which digest items were already delivered, for "new since last digest".
+
+Every item (repo, model, story, article, paper) is reduced to a 64-bit hash of
+its identity and stored with the day it was last delivered. Membership is a
+dict lookup, and entries older than the retention window are evicted on save,
+so the file stays at 12 bytes per item seen in the window no matter how many
+years of daily runs it has recorded.
+
+A new store is seeded from the ``github-trending-repos/`` snapshots of the
+preceding days, so the first filtered digest does not repeat yesterday's repos.
+"""
+import argparse
+import hashlib
+import os
+import struct
+import sys
+from array import array
+from datetime import date as Date
+from pathlib import Path
+
+from cache_paths import cache_dir
+from repo_history import repo_key
+from trending_archive import DAILY_DIR, daily_files, load_daily_file, parse_day
+
+STORE_FILE = 'seen-items.bin'
+DEFAULT_WINDOW_DAYS = 7
+
+MODES = ('hide', 'flag')
+
+_MAGIC = b'SEEN'
+_VERSION = 1
+_HEADER = struct.Struct('<4sHI')
+
+# payload key -> (email section, kind, identity field); GitHub repos are keyed by title.
+ITEM_SECTIONS = {
+    'huggingFaceModels': ('huggingface', 'hf', 'modelId'),
+    'hackerNewsStories': ('hackernews', 'hn', 'link'),
+    'devToArticles': ('devto', 'devto', 'url'),
+    'aiPapers': ('papers', 'paper', 'url'),
+}
+_SECTION_KINDS = {section: (kind, field) for section, kind, field in ITEM_SECTIONS.values()}
+
+
+def default_store_path():
+    return cache_dir() / STORE_FILE
+
+
+def item_hash(kind, identity):
+    digest = hashlib.blake2b(f'{kind}:{identity}'.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def repo_hash(repo):
+    return item_hash('repo', repo_key(repo.get('title', '')))
+
+
+def _hasher(kind, field):
+    return lambda item: item_hash(kind, item.get(field) or item.get('title'))
+
+
+def section_hasher(section):
+    """Item hash function for an email section name, or None if the section is not tracked."""
+    if section.startswith('github-'):
+        return repo_hash
+    kind_field = _SECTION_KINDS.get(section)
+    return _hasher(*kind_field) if kind_field else None
+
+
+def _little_endian(values):
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class SeenStore:
+    def __init__(self, path=None, window_days=DEFAULT_WINDOW_DAYS):
+        self.path = Path(path) if path else default_store_path()
+        self.window_days = window_days
+        self._last_seen = {}
+        self.exists = self.path.exists()
+        if self.exists:
+            self._load()
+
+    def __len__(self):
+        return len(self._last_seen)
+
+    def _load(self):
+        data = self.path.read_bytes()
+        magic, version, count = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f'{self.path} is not a seen-items store')
+        hashes, days = array('Q'), array('I')
+        offset = _HEADER.size
+        hashes.frombytes(data[offset:offset + 8 * count])
+        days.frombytes(data[offset + 8 * count:offset + 12 * count])
+        if sys.byteorder == 'big':
+            hashes.byteswap()
+            days.byteswap()
+        self._last_seen = dict(zip(hashes, days))
+
+    def save(self, today=None):
+        """Evict entries outside the window and write the store atomically."""
+        self.evict(today)
+        hashes = array('Q', self._last_seen.keys())
+        days = array('I', self._last_seen.values())
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, len(hashes)))
+            f.write(_little_endian(hashes))
+            f.write(_little_endian(days))
+        os.replace(tmp_path, self.path)
+        self.exists = True
+
+    def evict(self, today=None):
+        cutoff = _ordinal(today) - self.window_days
+        self._last_seen = {key: day for key, day in self._last_seen.items() if day >= cutoff}
+
+    def seen(self, key, today=None):
+        """True if ``key`` was delivered within the window and before ``today``."""
+        day = self._last_seen.get(key)
+        if day is None:
+            return False
+        today = _ordinal(today)
+        return today - self.window_days <= day < today
+
+    def mark(self, keys, day=None):
+        day = _ordinal(day)
+        last_seen = self._last_seen
+        for key in keys:
+            if last_seen.get(key, -1) < day:
+                last_seen[key] = day
+
+    def mark_delivered(self, sections, day=None):
+        """Record the ``(section name, items)`` pairs that went out in a digest."""
+        keys = []
+        for name, items in sections:
+            hasher = section_hasher(name)
+            if hasher is not None:
+                keys.extend(hasher(item) for item in items)
+        self.mark(keys, day)
+
+    def seed(self, daily_dir=DAILY_DIR, today=None):
+        """Mark the repos of the daily snapshots in the window before ``today``; returns days used."""
+        today = _ordinal(today)
+        start = Date.fromordinal(today - self.window_days).isoformat()
+        end = Date.fromordinal(today).isoformat()
+        used = 0
+        for day, path in daily_files(daily_dir):
+            if start <= day < end:
+                buckets = load_daily_file(path)
+                self.mark((repo_hash(repo) for repos in buckets.values() if isinstance(repos, list) for repo in repos), day)
+                used += 1
+        return used
+
+
+def _ordinal(day):
+    if day is None:
+        return Date.today().toordinal()
+    if isinstance(day, int):
+        return day
+    return parse_day(day).toordinal()
+
+
+def _filter_items(items, is_seen, mode):
+    if mode == 'hide':
+        return [item for item in items if not is_seen(item)]
+    return [dict(item, seenBefore=True) if is_seen(item) else item for item in items]
+
+
+def apply_seen_filter(data, store, mode, today=None):
+    """Return a copy of ``data`` with already delivered items hidden or flagged.
+
+    ``hide`` drops them so the item limit is filled with fresh items (GitHub
+    language buckets left empty are removed); ``flag`` sets ``seenBefore`` on them.
+    """
+    if mode not in MODES:
+        raise ValueError(f'Unknown seen-items mode: {mode!r} (expected one of {", ".join(MODES)})')
+    today = _ordinal(today)
+    filtered = dict(data)
+
+    gh = data.get('githubTrending')
+    if isinstance(gh, dict):
+        buckets = {}
+        for key, repos in gh.items():
+            if not isinstance(repos, list):
+                buckets[key] = repos
+                continue
+            repos = _filter_items(repos, lambda repo: store.seen(repo_hash(repo), today), mode)
+            if repos or not key or key.lower() == 'all':
+                buckets[key] = repos
+        filtered['githubTrending'] = buckets
+
+    for key, (_, kind, field) in ITEM_SECTIONS.items():
+        items = data.get(key)
+        if not items:
+            continue
+        hasher = _hasher(kind, field)
+        filtered[key] = _filter_items(items, lambda item: store.seen(hasher(item), today), mode)
+    return filtered
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Inspect or seed the delivered-items store')
+    parser.add_argument('--store', default=None, help=f'store path (default: cache dir / {STORE_FILE})')
+    parser.add_argument('--days', type=int, default=DEFAULT_WINDOW_DAYS, help='window in days')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = subparsers.add_parser('seed', help='mark repos from the daily snapshots before --today')
+    seed_parser.add_argument('--source', default=DAILY_DIR)
+    seed_parser.add_argument('--today', default=None)
+
+    subparsers.add_parser('stats', help='print the number of remembered items')
+
+    args = parser.parse_args(argv)
+    store = SeenStore(args.store, args.days)
+    if args.command == 'seed':
+        used = store.seed(args.source, args.today)
+        store.save(args.today)
+        print(f'Seeded {len(store)} item(s) from {used} day(s) into {store.path}')
+        return
+
+    size = store.path.stat().st_size if store.exists else 0
+    print(f'{store.path}: {len(store)} item(s), {size} bytes')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,25 +1,84 @@
 # send_email.py
-import base64
+import argparse
 import html
-import json
 import os
 from pathlib import Path
 import random
 import re
 import string
 import sys
-from datetime import datetime
-
-import yagmail
+import time
+from functools import partial
+
+# yagmail, smtplib (email_delivery) and the seen-items store are imported only
+# on the paths that need them, so `render` and `validate` start quickly.
+from email_budget import GMAIL_CLIP_BYTES, byte_size, fit_sections, format_budget_report, render_section
+from payload_io import load_payload
+from pipeline_metrics import PipelineMetrics, Stage, profiled, timed
+from remote_jobs import load_manifest as load_remote_jobs_manifest
+from remote_jobs import load_parsed_report as load_parsed_remote_jobs_report
+from remote_jobs import parse_report as parse_remote_jobs_report
+from render_cache import SectionCache, uid_placeholder
 
 def send_email(username, password, recipient, subject, body):
+    import yagmail
+
     print("Sending email...")
     yag = yagmail.SMTP(username, password)
     yag.send(to=recipient, subject=subject, contents=body, prettify_html=False)
     print('Email sent successfully')
 
+def send_email_batch(username, password, recipients, subject, body, workers=None, retries=None):
+    """Send one message per recipient over a pool of reused yagmail connections."""
+    import yagmail
+    from email_delivery import DEFAULT_RETRIES, DEFAULT_WORKERS, deliver_batch, parse_recipients, summarize_results
+
+    recipients = parse_recipients(recipients)
+    print(f"Sending email to {len(recipients)} recipient(s)...")
+    results = deliver_batch(
+        recipients, subject, body,
+        lambda: yagmail.SMTP(username, password),
+        workers=DEFAULT_WORKERS if workers is None else workers,
+        retries=DEFAULT_RETRIES if retries is None else retries,
+    )
+    print(summarize_results(results))
+    return results
+
+def send_email_outbox(username, password, recipients, subject, body, outbox_dir, workers=None, retries=None, rate=None, daily_quota=None):
+    """Spool one message per recipient to the outbox in ``outbox_dir`` and drain it.
+
+    Messages are keyed by today's date, the subject and the recipient, so a rerun
+    after a crash or a partial failure only delivers what is still pending. Returns
+    the results of this call's messages; older pending messages are drained too.
+    """
+    from datetime import date
+
+    import yagmail
+    from email_delivery import DEFAULT_RETRIES, DEFAULT_WORKERS, parse_recipients, summarize_results
+    from outbox import Outbox, drain, format_summary
+
+    recipients = parse_recipients(recipients)
+    outbox = Outbox(outbox_dir)
+    batch = f'{date.today().isoformat()}:{subject}'
+    ids = {outbox.enqueue(recipient, subject, body, batch) for recipient in recipients}
+    print(f"Spooled {len(recipients)} message(s) to {outbox.root}; draining...")
+    results = drain(
+        outbox, lambda: yagmail.SMTP(username, password),
+        workers=DEFAULT_WORKERS if workers is None else workers,
+        retries=DEFAULT_RETRIES if retries is None else retries,
+        rate=rate, daily_quota=daily_quota,
+    )
+    results = [result for result in results if result['id'] in ids]
+    print(summarize_results(results))
+    print(format_summary(outbox.summary()))
+    return results
+
 def uid():
     """Generate unique id to prevent Gmail pattern detection"""
+    placeholder = uid_placeholder()
+    if placeholder is not None:
+        # Rendering a cached fragment; SectionCache.assemble fills in a real id per message.
+        return placeholder
     return ''.join(random.choices(string.ascii_lowercase, k=4))
 
 def parse_bool(value):
@@ -29,15 +88,6 @@ def parse_bool(value):
         return False
     return str(value).strip().lower() in {'1', 'true', 'yes', 'on'}
 
-def _extract_remote_jobs_date(path):
-    match = re.search(r'daily_remote_jobs_(\d{4}-\d{2}-\d{2})\.md$', path.name)
-    if not match:
-        return None
-    try:
-        return datetime.strptime(match.group(1), '%Y-%m-%d').date()
-    except ValueError:
-        return None
-
 def _find_latest_remote_jobs_report(report_path):
     requested_path = Path(report_path) if report_path else None
     search_dirs = []
@@ -49,23 +99,16 @@ def _find_latest_remote_jobs_report(report_path):
     search_dirs.append(repo_remote_jobs_dir)
 
     for directory in dict.fromkeys(search_dirs):
-        if not directory.exists():
-            continue
-
-        reports = []
-        for candidate in directory.glob('daily_remote_jobs_*.md'):
-            report_date = _extract_remote_jobs_date(candidate)
-            if report_date is not None:
-                reports.append((report_date, candidate))
-
-        if reports:
-            return max(reports, key=lambda item: item[0])[1]
+        manifest = load_remote_jobs_manifest(directory)
+        if manifest:
+            return manifest.latest()
 
     return None
 
-def load_remote_jobs_report(report_path):
+def load_remote_jobs_report(report_path, metrics=None):
     if not report_path:
-        latest_report = _find_latest_remote_jobs_report(report_path)
+        with timed(metrics, 'remote-jobs.discover'):
+            latest_report = _find_latest_remote_jobs_report(report_path)
         if latest_report is None:
             return {
                 'status': 'missing',
@@ -76,7 +119,8 @@ def load_remote_jobs_report(report_path):
 
     path = Path(report_path)
     if not path.exists():
-        latest_report = _find_latest_remote_jobs_report(report_path)
+        with timed(metrics, 'remote-jobs.discover'):
+            latest_report = _find_latest_remote_jobs_report(report_path)
         if latest_report is not None and latest_report != path:
             path = latest_report
         else:
@@ -86,18 +130,18 @@ def load_remote_jobs_report(report_path):
                 'path': str(path),
             }
 
-    content = path.read_text(encoding='utf-8').strip()
-    title = path.stem.replace('_', ' ')
-    for line in content.splitlines():
-        if line.startswith('主题：'):
-            title = line.replace('主题：', '', 1).strip()
-            break
+    with timed(metrics, 'remote-jobs.load', path=str(path)) as stage:
+        content = path.read_text(encoding='utf-8').strip()
+        parsed = load_parsed_remote_jobs_report(path, content)
+        stage.bytes = byte_size(content)
+        stage.extra['jobs'] = len(parsed['jobs'])
 
     report = {
         'status': 'ready',
-        'title': title,
+        'title': parsed['title'] or path.stem.replace('_', ' '),
         'path': str(path),
         'content': content,
+        'parsed': parsed,
     }
     requested_path = Path(report_path)
     if requested_path != path:
@@ -106,78 +150,48 @@ def load_remote_jobs_report(report_path):
 
     return report
 
+_URL_RE = re.compile(r'(https?://[^\s<]+)')
+_URL_LINK = r'<a href="\1" style="color:#60a5fa;text-decoration:underline;">\1</a>'
+
+_REMOTE_JOBS_INTRO = '<p style="color:#d1d5db;margin:0 0 20px 0;font-size:14px;line-height:1.7;">以下内容来自每日远程开发岗位搜索 automation 同步的当日报告。</p>'
+_REMOTE_JOBS_FALLBACK_OPEN = '<p style="margin:0 0 18px 0;padding:10px 12px;background:#111827;border-left:4px solid #60a5fa;color:#bfdbfe;font-size:13px;line-height:1.6;border-radius:6px;">'
+_REMOTE_JOBS_SECTION_OPEN = '<h3 style="color:#f9fafb;margin:28px 0 18px 0;font-size:24px;line-height:1.35;">'
+_REMOTE_JOBS_JOB_OPEN = '<p style="margin:0 0 12px 0;color:#f3f4f6;font-size:22px;font-weight:800;line-height:1.55;">'
+_REMOTE_JOBS_LIST_OPEN = '<ul style="margin:0 0 18px 28px;padding:0;color:#d1d5db;line-height:1.8;font-size:18px;">'
+_REMOTE_JOBS_ITEM_OPEN = '<li style="margin:0 0 10px 0;">'
+_REMOTE_JOBS_TEXT_OPEN = '<p style="margin:10px 0 16px 0;color:#d1d5db;font-size:18px;line-height:1.8;">'
+
 def render_remote_jobs_report(report):
-    lines = report.get('content', '').splitlines()
     parts = [
         f'<div style="background:#2f2f2f;padding:24px;border-radius:10px;margin:24px 0;color:#f3f4f6;" id="remote-{uid()}">',
         f'<h2 style="color:#f9fafb;margin:0 0 8px 0;font-size:28px;line-height:1.3;">{html.escape(report.get("title", "每日远程岗位推荐"))}</h2>',
-        '<p style="color:#d1d5db;margin:0 0 20px 0;font-size:14px;line-height:1.7;">以下内容来自每日远程开发岗位搜索 automation 同步的当日报告。</p>',
+        _REMOTE_JOBS_INTRO,
     ]
+    append = parts.append
 
     fallback_message = report.get('fallback_message')
     if fallback_message:
-        parts.append(
-            f'<p style="margin:0 0 18px 0;padding:10px 12px;background:#111827;border-left:4px solid #60a5fa;color:#bfdbfe;font-size:13px;line-height:1.6;border-radius:6px;">'
-            f'{html.escape(fallback_message)}'
-            '</p>',
-        )
-
-    in_list = False
-
-    def close_list():
-        nonlocal in_list
-        if in_list:
-            parts.append('</ul>')
-            in_list = False
-
-    for raw_line in lines:
-        line = raw_line.strip()
-        if not line or line.startswith('主题：'):
-            close_list()
-            continue
-
-        if line.startswith('## '):
-            close_list()
-            parts.append(
-                f'<h3 style="color:#f9fafb;margin:28px 0 18px 0;font-size:24px;line-height:1.35;">'
-                f'{html.escape(line[3:])}'
-                '</h3>',
-            )
-            continue
-
-        if re.match(r'^\d+\.\s+', line):
-            close_list()
-            parts.append(
-                f'<p style="margin:0 0 12px 0;color:#f3f4f6;font-size:22px;font-weight:800;line-height:1.55;">'
-                f'{html.escape(line)}'
-                '</p>',
-            )
-            continue
-
-        if line.startswith('- '):
-            if not in_list:
-                parts.append(
-                    '<ul style="margin:0 0 18px 28px;padding:0;color:#d1d5db;line-height:1.8;font-size:18px;">',
-                )
-                in_list = True
-            bullet_text = html.escape(line[2:].strip())
-            bullet_text = re.sub(
-                r'(https?://[^\s<]+)',
-                r'<a href="\1" style="color:#60a5fa;text-decoration:underline;">\1</a>',
-                bullet_text,
-            )
-            parts.append(f'<li style="margin:0 0 10px 0;">{bullet_text}</li>')
-            continue
-
-        close_list()
-        parts.append(
-            f'<p style="margin:10px 0 16px 0;color:#d1d5db;font-size:18px;line-height:1.8;">'
-            f'{html.escape(line)}'
-            '</p>',
-        )
+        append(f'{_REMOTE_JOBS_FALLBACK_OPEN}{html.escape(fallback_message)}</p>')
+
+    parsed = report.get('parsed') or parse_remote_jobs_report(report.get('content', ''))
+    for block in parsed['blocks']:
+        kind = block[0]
+        if kind == 'list':
+            append(_REMOTE_JOBS_LIST_OPEN)
+            for bullet in block[1]:
+                bullet_text = html.escape(bullet)
+                if 'http' in bullet_text:
+                    bullet_text = _URL_RE.sub(_URL_LINK, bullet_text)
+                append(f'{_REMOTE_JOBS_ITEM_OPEN}{bullet_text}</li>')
+            append('</ul>')
+        elif kind == 'heading':
+            append(f'{_REMOTE_JOBS_SECTION_OPEN}{html.escape(block[1])}</h3>')
+        elif kind == 'job':
+            append(f'{_REMOTE_JOBS_JOB_OPEN}{html.escape(block[1])}</p>')
+        else:
+            append(f'{_REMOTE_JOBS_TEXT_OPEN}{html.escape(block[1])}</p>')
 
-    close_list()
-    parts.append('</div>')
+    append('</div>')
     return ''.join(parts)
 
 def render_remote_jobs_warning(report):
@@ -211,147 +225,756 @@ def get_github_all_repos(gh):
 
     return []
 
-def format_email(data, remote_jobs_report=None):
-    html = f'''<html><body style="font-family:Arial,sans-serif;max-width:900px;margin:0 auto;padding:20px;background:#fafafa;">
+def get_github_languages(gh):
+    return sorted([k for k in gh.keys() if k and k.lower() not in ['all', '']])[:3]
+
+ITEM_LIMIT = 10
+
+LANG_COLORS = {'typescript':'#3178c6','python':'#3572A5','go':'#00ADD8','rust':'#dea584','javascript':'#f1e05a'}
+DEFAULT_LANG_COLOR = '#6e7681'
+
+# Row styles alternate on even/odd index, so both variants are built once.
+_GH_ALL_ROW_OPEN = tuple(
+    f'<div style="background:#{bg};padding:12px;margin:5px 0;border-radius:4px;border-left:3px solid #58a6ff;">'
+    for bg in ('2d333b', '22272e')
+)
+_GH_LANG_ROW_OPEN = tuple(
+    f'<div style="padding:10px;margin:5px 0;background:#{bg};border-radius:4px;">'
+    for bg in ('252540', '1e1e35')
+)
+_HF_ROW_OPEN = tuple(f'<tr style="background:{bg};"><td style="padding:8px;">' for bg in ('#fff8e1', '#fff3e0'))
+_HN_ROW_OPEN = tuple(
+    f'<article style="padding:10px;margin:8px 0;background:#{bg};border-radius:4px;">'
+    for bg in ('fffaf5', 'fff0e5')
+)
+_INDIE_ROW_OPEN = tuple(
+    f'<div style="background:{bg};padding:15px;margin:8px 0;border-radius:6px;border-left:4px solid #4caf50;">'
+    for bg in ('#f1f8e9', '#e8f5e9')
+)
+
+# Shown next to items already delivered in a recent digest (EMAIL_NEW_ITEMS=flag).
+_SEEN_BADGE = '<span style="background:#9e9e9e;color:#fff;padding:1px 6px;border-radius:8px;font-size:11px;margin-left:6px;">seen</span>'
+
+def seen_badge(item):
+    return _SEEN_BADGE if item.get('seenBefore') else ''
+
+# Rank change since the previous archived day (EMAIL_RANK_MOVEMENT); unchanged ranks show nothing.
+_MOVE_BADGE_OPEN = '<span title="since yesterday" style="color:{};font-size:11px;font-weight:bold;margin-left:6px;">'
+_NEW_BADGE = '<span title="new since yesterday" style="background:#2da44e;color:#fff;padding:1px 6px;border-radius:8px;font-size:11px;margin-left:6px;">new</span>'
+
+def movement_badge(repo):
+    move = repo.get('rankMovement')
+    if not move or move['status'] == 'same':
+        return ''
+    if move['status'] == 'new':
+        return _NEW_BADGE
+    delta = move['delta']
+    badge = _MOVE_BADGE_OPEN.format('#3fb950' if delta > 0 else '#f85149') + f"{'↑' if delta > 0 else '↓'}{abs(delta)}"
+    if (move.get('acceleration') or 0) > 0:
+        # Gaining stars faster than the day before.
+        badge += f" ⚡+{move['acceleration']:,}"
+    return badge + '</span>'
+
+# 30-day star history (EMAIL_SPARKLINES): block characters by default; with EMAIL_SPARKLINE_FORMAT=svg,
+# an SVG data URI, or block characters when it is over the byte budget.
+_SPARKLINE_IMG = '<img src="{}" width="{}" height="{}" alt="" style="vertical-align:middle;margin-right:6px;">'
+_SPARKLINE_TEXT = '<span style="color:#58a6ff;font-size:10px;margin-right:6px;">{}</span>'
+
+def sparkline_html(repo):
+    image = repo.get('sparkline')
+    if not image:
+        return ''
+    if 'svg' in image:
+        return _SPARKLINE_IMG.format(image['svg'], image.get('width', 80), image.get('height', 16))
+    return _SPARKLINE_TEXT.format(image['text'])
+
+def render_header(out):
+    out.append(f'''<html><body style="font-family:Arial,sans-serif;max-width:900px;margin:0 auto;padding:20px;background:#fafafa;">
 <div style="background:linear-gradient(135deg,#667eea 0%,#764ba2 100%);padding:30px;border-radius:12px;margin-bottom:20px;">
 <h1 style="color:#fff;text-align:center;margin:0;">🔥 Tech Trending Daily</h1>
 <p style="color:#e0e0e0;text-align:center;margin:10px 0 0 0;">{uid()}</p>
-</div>'''
+</div>''')
+
+def render_github_all(out, repos):
+    append = out.append
+    append(f'<div style="background:#24292e;padding:20px;border-radius:8px;margin-bottom:15px;" id="gh-{uid()}">')
+    append('<h2 style="color:#fff;margin:0 0 15px 0;">📦 GitHub Trending - All</h2>')
+    for i, r in enumerate(repos):
+        desc = (r.get("description","") or "")[:70]
+        append(_GH_ALL_ROW_OPEN[i % 2])
+        append(f'<a href="https://github.com{r["link"]}" style="color:#58a6ff;font-weight:bold;text-decoration:none;">{r["title"]}</a>{movement_badge(r)}{seen_badge(r)}')
+        append(f'<span style="color:#8b949e;float:right;">{sparkline_html(r)}⭐{r["stars"]} | +{r["todayStars"]}</span>')
+        append(f'<p style="color:#8b949e;margin:5px 0 0 0;font-size:13px;">{desc}</p></div>')
+    append('</div>')
+
+def render_github_language(out, repos, lang, dropped=None):
+    append = out.append
+    color = LANG_COLORS.get(lang.lower(), DEFAULT_LANG_COLOR)
+    link_style = 'style="color:#e0e0e0;text-decoration:none;font-weight:bold;"'
+    stars_open = f'<span style="color:{color};float:right;">'
+    append(f'<div style="background:#1a1a2e;padding:15px;border-radius:8px;margin-bottom:10px;border-top:3px solid {color};" id="lang-{uid()}">')
+    append(f'<h3 style="color:{color};margin:0 0 10px 0;">📦 {lang.capitalize()}</h3>')
+    for i, r in enumerate(repos):
+        desc = (r.get("description","") or "")[:60]
+        append(_GH_LANG_ROW_OPEN[i % 2])
+        append(f'<a href="https://github.com{r["link"]}" {link_style}>{r["title"]}</a>{movement_badge(r)}{seen_badge(r)}')
+        append(f'{stars_open}{sparkline_html(r)}⭐{r["stars"]} | +{r["todayStars"]}</span>')
+        if desc:
+            append(f'<p style="color:#888;margin:5px 0 0 0;font-size:12px;">{desc}</p>')
+        append('</div>')
+    if dropped:
+        append(f'<p style="color:#888;margin:8px 0 0 0;font-size:12px;">Dropped off: {", ".join(dropped)}</p>')
+    append('</div>')
+
+def render_watchlist(out, matches):
+    append = out.append
+    append(f'<div style="background:#e3f2fd;padding:20px;border-radius:8px;margin:20px 0;border-left:5px solid #1976d2;" id="watch-{uid()}">')
+    append('<h2 style="color:#0d47a1;margin:0 0 15px 0;">🔔 Watchlist Matches</h2>')
+    keyword = None
+    for m in matches:
+        if m['keyword'] != keyword:
+            keyword = m['keyword']
+            append(f'<h4 style="color:#1565c0;margin:12px 0 6px 0;">{html.escape(keyword)}</h4>')
+        desc = (m.get("description","") or "")[:80]
+        append(f'<div style="padding:6px 0;border-bottom:1px solid #bbdefb;"><a href="https://github.com{m["link"]}" style="color:#0d47a1;font-weight:bold;text-decoration:none;">{m["title"]}</a>')
+        append(f' <small style="color:#546e7a;">{m.get("language") or "-"} • trending {m["lastSeen"]}</small>')
+        if desc:
+            append(f'<p style="color:#455a64;margin:4px 0 0 0;font-size:13px;">{desc}</p>')
+        append('</div>')
+    append('</div>')
+
+def render_huggingface(out, models):
+    append = out.append
+    append(f'<div style="background:#fff3e0;padding:20px;border-radius:8px;margin:20px 0;border-left:5px solid #ff9800;" id="hf-{uid()}">')
+    append('<h2 style="color:#e65100;margin:0 0 15px 0;">🤖 HuggingFace Hot Models</h2>')
+    append('<table style="width:100%;border-collapse:collapse;">')
+    append('<tr style="background:#ffe0b2;"><th style="padding:10px;text-align:left;">Model</th><th style="padding:10px;">Downloads</th><th style="padding:10px;">Likes</th></tr>')
+    for i, m in enumerate(models):
+        append(f'{_HF_ROW_OPEN[i % 2]}<a href="{m["link"]}" style="color:#e65100;">{m["modelId"]}</a>{seen_badge(m)}</td><td style="padding:8px;text-align:center;">{m.get("downloads",0):,}</td><td style="padding:8px;text-align:center;">❤️{m.get("likes",0)}</td></tr>')
+    append('</table></div>')
+
+def render_hackernews(out, stories):
+    append = out.append
+    append(f'<div style="background:#fff5f0;padding:20px;border-radius:8px;margin:20px 0;" id="hn-{uid()}">')
+    append('<h2 style="color:#ff6600;margin:0 0 15px 0;border-bottom:2px solid #ff6600;padding-bottom:10px;">📰 Hacker News Top Stories</h2>')
+    for i, s in enumerate(stories):
+        append(_HN_ROW_OPEN[i % 2])
+        append(f'<a href="{s["link"]}" style="color:#ff6600;font-size:15px;text-decoration:none;font-weight:500;">{s["title"]}</a>{seen_badge(s)}')
+        append(f'<footer style="color:#828282;font-size:12px;margin-top:5px;">▲{s["score"]} pts by {s["by"]} | {s.get("descendants",0)} comments</footer></article>')
+    append('</div>')
+
+def render_devto(out, articles):
+    append = out.append
+    append(f'<div style="background:#f3e5f5;padding:20px;border-radius:8px;margin:20px 0;" id="dev-{uid()}">')
+    append('<h2 style="color:#7b1fa2;margin:0 0 15px 0;">📝 Dev.to Popular Articles</h2>')
+    append('<ul style="list-style:none;padding:0;margin:0;">')
+    for a in articles:
+        append(f'<li style="padding:10px;border-bottom:1px dashed #ce93d8;"><a href="{a["url"]}" style="color:#7b1fa2;text-decoration:none;">{a["title"]}</a>{seen_badge(a)} <small style="color:#9c27b0;">by {a["user"]["name"]} • ❤️{a.get("publicReactionsCount",0)}</small></li>')
+    append('</ul></div>')
+
+def render_papers(out, papers):
+    append = out.append
+    append(f'<div style="background:#ede7f6;padding:20px;border-radius:8px;margin:20px 0;" id="paper-{uid()}">')
+    append('<h2 style="color:#512da8;margin:0 0 15px 0;">📄 Latest AI Research Papers</h2>')
+    append('<ol style="padding-left:20px;margin:0;">')
+    for p in papers:
+        authors = ", ".join(p.get("authors",[])[:2])
+        append(f'<li style="padding:8px 0;color:#5e35b1;"><a href="{p["url"]}" style="color:#512da8;text-decoration:none;">{p["title"]}</a>{seen_badge(p)}<br/><small style="color:#7e57c2;">{authors} • ❤️{p.get("likes",0)}</small></li>')
+    append('</ol></div>')
+
+def render_indie_revenue(out, revenues):
+    append = out.append
+    append(f'<div style="background:#e8f5e9;padding:20px;border-radius:8px;margin:20px 0;" id="indie-{uid()}">')
+    append('<h2 style="color:#2e7d32;margin:0 0 15px 0;">💰 Indie Hackers Revenue Report</h2>')
+    for i, r in enumerate(revenues):
+        url = r.get("url", "")
+        desc = r.get("description", "")[:80]
+        founders = ", ".join(r.get("founders", [])[:2]) if r.get("founders") else ""
+        append(_INDIE_ROW_OPEN[i % 2])
+        append('<div style="display:flex;justify-content:space-between;align-items:center;">')
+        append(f'<span style="background:#4caf50;color:#fff;padding:2px 8px;border-radius:10px;font-size:12px;">#{r.get("rank","-")}</span>')
+        append(f'<span style="color:#2e7d32;font-weight:bold;font-size:16px;">${r.get("mrr",0):,.0f}/mo</span>')
+        append('</div>')
+        if url:
+            append(f'<h3 style="margin:10px 0 5px 0;"><a href="{url}" style="color:#1b5e20;text-decoration:none;">{r["name"]} ↗</a></h3>')
+        else:
+            append(f'<h3 style="margin:10px 0 5px 0;color:#1b5e20;">{r["name"]}</h3>')
+        if desc:
+            append(f'<p style="color:#558b2f;margin:5px 0;font-size:13px;">{desc}</p>')
+        append('<div style="display:flex;justify-content:space-between;margin-top:8px;font-size:12px;color:#689f38;">')
+        append(f'<span>ARR: ${r.get("arr",0):,.0f}</span>')
+        if founders:
+            append(f'<span>👤 {founders}</span>')
+        append('</div></div>')
+    append('</div>')
+
+def render_remote_jobs(out, report):
+    if report.get('status') == 'ready':
+        out.append(render_remote_jobs_report(report))
+    else:
+        out.append(render_remote_jobs_warning(report))
+
+def render_footer(out):
+    out.append(f'<p style="text-align:center;color:#999;font-size:12px;margin-top:30px;">Generated by Tech Trending Daily 🚀 [{uid()}]</p>')
+    out.append('</body></html>')
+
+def plan_email_sections(data, remote_jobs_report=None):
+    """Return the email layout as ``(name, items, render)`` triples.
+
+    ``render(out, items)`` appends the section HTML; sections that cannot be
+    truncated have ``items`` set to None and are rendered with ``render(out)``.
+    """
+    plan = [('header', None, render_header)]
 
     # GitHub Trending - All languages with detailed cards
     if 'githubTrending' in data:
         gh = data['githubTrending']
         all_repos = get_github_all_repos(gh)
-        
         if all_repos:
-            html += f'<div style="background:#24292e;padding:20px;border-radius:8px;margin-bottom:15px;" id="gh-{uid()}">'
-            html += '<h2 style="color:#fff;margin:0 0 15px 0;">📦 GitHub Trending - All</h2>'
-            for i, r in enumerate(all_repos[:10]):
-                desc = (r.get("description","") or "")[:70]
-                html += f'<div style="background:#{"2d333b" if i%2==0 else "22272e"};padding:12px;margin:5px 0;border-radius:4px;border-left:3px solid #58a6ff;">'
-                html += f'<a href="https://github.com{r["link"]}" style="color:#58a6ff;font-weight:bold;text-decoration:none;">{r["title"]}</a>'
-                html += f'<span style="color:#8b949e;float:right;">⭐{r["stars"]} | +{r["todayStars"]}</span>'
-                html += f'<p style="color:#8b949e;margin:5px 0 0 0;font-size:13px;">{desc}</p></div>'
-            html += '</div>'
-        
-        # Other languages - also detailed
-        lang_colors = {'typescript':'#3178c6','python':'#3572A5','go':'#00ADD8','rust':'#dea584','javascript':'#f1e05a'}
-        for lang in sorted([k for k in gh.keys() if k and k.lower() not in ['all', '']])[:3]:
-            repos = gh[lang][:10]
-            color = lang_colors.get(lang.lower(),'#6e7681')
-            html += f'<div style="background:#1a1a2e;padding:15px;border-radius:8px;margin-bottom:10px;border-top:3px solid {color};" id="lang-{uid()}">'
-            html += f'<h3 style="color:{color};margin:0 0 10px 0;">📦 {lang.capitalize()}</h3>'
-            for i, r in enumerate(repos):
-                desc = (r.get("description","") or "")[:60]
-                html += f'<div style="padding:10px;margin:5px 0;background:#{"252540" if i%2==0 else "1e1e35"};border-radius:4px;">'
-                html += f'<a href="https://github.com{r["link"]}" style="color:#e0e0e0;text-decoration:none;font-weight:bold;">{r["title"]}</a>'
-                html += f'<span style="color:{color};float:right;">⭐{r["stars"]} | +{r["todayStars"]}</span>'
-                if desc:
-                    html += f'<p style="color:#888;margin:5px 0 0 0;font-size:12px;">{desc}</p>'
-                html += '</div>'
-            html += '</div>'
+            plan.append(('github-all', all_repos, render_github_all))
+
+        # Other languages - also detailed (subscriber rules pick them via githubLanguages)
+        languages = data.get('githubLanguages')
+        dropped_off = data.get('githubDroppedOff', {})
+        for lang in get_github_languages(gh) if languages is None else languages:
+            options = {'lang': lang, 'dropped': dropped_off[lang]} if dropped_off.get(lang) else {'lang': lang}
+            plan.append((f'github-{lang}', gh[lang], partial(render_github_language, **options)))
+
+    # Watchlist - archived repos matching the reader's keywords (see attach_watchlist)
+    matches = data.get('watchlistMatches', [])
+    if matches:
+        plan.append(('watchlist', matches, render_watchlist))
 
     # HuggingFace - orange theme
     models = data.get('huggingFaceModels', [])
     if models:
-        html += f'<div style="background:#fff3e0;padding:20px;border-radius:8px;margin:20px 0;border-left:5px solid #ff9800;" id="hf-{uid()}">'
-        html += '<h2 style="color:#e65100;margin:0 0 15px 0;">🤖 HuggingFace Hot Models</h2>'
-        html += '<table style="width:100%;border-collapse:collapse;">'
-        html += '<tr style="background:#ffe0b2;"><th style="padding:10px;text-align:left;">Model</th><th style="padding:10px;">Downloads</th><th style="padding:10px;">Likes</th></tr>'
-        for i, m in enumerate(models[:10]):
-            bg = '#fff8e1' if i%2==0 else '#fff3e0'
-            html += f'<tr style="background:{bg};"><td style="padding:8px;"><a href="{m["link"]}" style="color:#e65100;">{m["modelId"]}</a></td><td style="padding:8px;text-align:center;">{m.get("downloads",0):,}</td><td style="padding:8px;text-align:center;">❤️{m.get("likes",0)}</td></tr>'
-        html += '</table></div>'
+        plan.append(('huggingface', models, render_huggingface))
 
     # Hacker News - distinct orange cards
     stories = data.get('hackerNewsStories', [])
     if stories:
-        html += f'<div style="background:#fff5f0;padding:20px;border-radius:8px;margin:20px 0;" id="hn-{uid()}">'
-        html += '<h2 style="color:#ff6600;margin:0 0 15px 0;border-bottom:2px solid #ff6600;padding-bottom:10px;">📰 Hacker News Top Stories</h2>'
-        for i, s in enumerate(stories[:10]):
-            html += f'<article style="padding:10px;margin:8px 0;background:#{"fffaf5" if i%2==0 else "fff0e5"};border-radius:4px;">'
-            html += f'<a href="{s["link"]}" style="color:#ff6600;font-size:15px;text-decoration:none;font-weight:500;">{s["title"]}</a>'
-            html += f'<footer style="color:#828282;font-size:12px;margin-top:5px;">▲{s["score"]} pts by {s["by"]} | {s.get("descendants",0)} comments</footer></article>'
-        html += '</div>'
+        plan.append(('hackernews', stories, render_hackernews))
 
     # Dev.to - purple theme
     articles = data.get('devToArticles', [])
     if articles:
-        html += f'<div style="background:#f3e5f5;padding:20px;border-radius:8px;margin:20px 0;" id="dev-{uid()}">'
-        html += '<h2 style="color:#7b1fa2;margin:0 0 15px 0;">📝 Dev.to Popular Articles</h2>'
-        html += '<ul style="list-style:none;padding:0;margin:0;">'
-        for a in articles[:10]:
-            html += f'<li style="padding:10px;border-bottom:1px dashed #ce93d8;"><a href="{a["url"]}" style="color:#7b1fa2;text-decoration:none;">{a["title"]}</a> <small style="color:#9c27b0;">by {a["user"]["name"]} • ❤️{a.get("publicReactionsCount",0)}</small></li>'
-        html += '</ul></div>'
+        plan.append(('devto', articles, render_devto))
 
     # AI Papers - deep purple
     papers = data.get('aiPapers', [])
     if papers:
-        html += f'<div style="background:#ede7f6;padding:20px;border-radius:8px;margin:20px 0;" id="paper-{uid()}">'
-        html += '<h2 style="color:#512da8;margin:0 0 15px 0;">📄 Latest AI Research Papers</h2>'
-        html += '<ol style="padding-left:20px;margin:0;">'
-        for p in papers[:10]:
-            authors = ", ".join(p.get("authors",[])[:2])
-            html += f'<li style="padding:8px 0;color:#5e35b1;"><a href="{p["url"]}" style="color:#512da8;text-decoration:none;">{p["title"]}</a><br/><small style="color:#7e57c2;">{authors} • ❤️{p.get("likes",0)}</small></li>'
-        html += '</ol></div>'
+        plan.append(('papers', papers, render_papers))
 
     # Indie Revenue - green theme with detailed cards including links and descriptions
     revenues = data.get('indieRevenue', [])
     if revenues:
-        html += f'<div style="background:#e8f5e9;padding:20px;border-radius:8px;margin:20px 0;" id="indie-{uid()}">'
-        html += '<h2 style="color:#2e7d32;margin:0 0 15px 0;">💰 Indie Hackers Revenue Report</h2>'
-        for i, r in enumerate(revenues[:10]):
-            url = r.get("url", "")
-            desc = r.get("description", "")[:80]
-            founders = ", ".join(r.get("founders", [])[:2]) if r.get("founders") else ""
-            bg = '#f1f8e9' if i%2==0 else '#e8f5e9'
-            html += f'<div style="background:{bg};padding:15px;margin:8px 0;border-radius:6px;border-left:4px solid #4caf50;">'
-            html += f'<div style="display:flex;justify-content:space-between;align-items:center;">'
-            html += f'<span style="background:#4caf50;color:#fff;padding:2px 8px;border-radius:10px;font-size:12px;">#{r.get("rank","-")}</span>'
-            html += f'<span style="color:#2e7d32;font-weight:bold;font-size:16px;">${r.get("mrr",0):,.0f}/mo</span>'
-            html += '</div>'
-            if url:
-                html += f'<h3 style="margin:10px 0 5px 0;"><a href="{url}" style="color:#1b5e20;text-decoration:none;">{r["name"]} ↗</a></h3>'
-            else:
-                html += f'<h3 style="margin:10px 0 5px 0;color:#1b5e20;">{r["name"]}</h3>'
-            if desc:
-                html += f'<p style="color:#558b2f;margin:5px 0;font-size:13px;">{desc}</p>'
-            html += f'<div style="display:flex;justify-content:space-between;margin-top:8px;font-size:12px;color:#689f38;">'
-            html += f'<span>ARR: ${r.get("arr",0):,.0f}</span>'
-            if founders:
-                html += f'<span>👤 {founders}</span>'
-            html += '</div></div>'
-        html += '</div>'
+        plan.append(('indie', revenues, render_indie_revenue))
 
     if remote_jobs_report:
-        if remote_jobs_report.get('status') == 'ready':
-            html += render_remote_jobs_report(remote_jobs_report)
+        plan.append(('remote-jobs', None, partial(render_remote_jobs, report=remote_jobs_report)))
+
+    plan.append(('footer', None, render_footer))
+    return plan
+
+def instrument_plan(plan, metrics):
+    """Wrap every render in ``plan`` so it records a ``section.<name>`` stage in ``metrics``.
+
+    A section rendered several times (e.g. while fitting a byte budget) accumulates
+    its time and keeps the size of the last render.
+    """
+    if metrics is None:
+        return plan
+
+    def wrap(name, render):
+        stage = None
+
+        def timed_render(out, *args):
+            nonlocal stage
+            if stage is None:
+                stage = Stage(f'section.{name}', renders=0)
+                stage.seconds = 0.0
+                metrics.add(stage)
+            start = len(out)
+            started = time.perf_counter()
+            render(out, *args)
+            stage.seconds += time.perf_counter() - started
+            stage.bytes = sum(byte_size(chunk) for chunk in out[start:])
+            stage.extra['renders'] += 1
+
+        return timed_render
+
+    return [(name, items, wrap(name, render)) for name, items, render in plan]
+
+def iter_email_sections(data, remote_jobs_report=None, item_limit=ITEM_LIMIT, section_limits=None, metrics=None):
+    """Yield ``(name, html)`` for every section of the email, rendering lazily in order.
+
+    ``section_limits`` overrides ``item_limit`` per section name; a limit of 0 drops the section.
+    """
+    section_limits = section_limits or {}
+    for name, items, render in instrument_plan(plan_email_sections(data, remote_jobs_report), metrics):
+        if items is not None:
+            limit = section_limits.get(name, item_limit)
+            if limit <= 0:
+                continue
+            items = items[:limit]
+        yield name, render_section(render, items)
+
+def write_email(data, remote_jobs_report, write, item_limit=ITEM_LIMIT, metrics=None):
+    """Stream the email to ``write`` (e.g. ``file.write``) one section at a time."""
+    for _, chunk in iter_email_sections(data, remote_jobs_report, item_limit, metrics=metrics):
+        write(chunk)
+
+def delivered_sections(data, item_limit=ITEM_LIMIT, section_limits=None):
+    """Yield ``(name, items)`` for the item sections exactly as they appear in the email."""
+    section_limits = section_limits or {}
+    for name, items, _ in plan_email_sections(data):
+        if items is not None:
+            yield name, items[:max(section_limits.get(name, item_limit), 0)]
+
+def budget_section_limits(budget_report):
+    """Per-section item counts that survived ``format_email_within_budget``."""
+    limits = {section['name']: section['items'] for section in budget_report['sections'] if section['items'] is not None}
+    limits.update((name, 0) for name in budget_report['omitted'])
+    return limits
+
+def format_email(data, remote_jobs_report=None, item_limit=ITEM_LIMIT, metrics=None):
+    return ''.join(chunk for _, chunk in iter_email_sections(data, remote_jobs_report, item_limit, metrics=metrics))
+
+def format_email_cached(data, remote_jobs_report=None, item_limit=ITEM_LIMIT, cache=None, section_limits=None):
+    """Like ``format_email`` but reuses section fragments from ``cache`` (a ``SectionCache``).
+
+    Use one cache across the emails of a run; only sections whose content or
+    options differ from an earlier email are rendered again.
+    """
+    if cache is None:
+        return format_email(data, remote_jobs_report, item_limit)
+    return cache.assemble(plan_email_sections(data, remote_jobs_report), uid, item_limit, section_limits)
+
+def format_email_within_budget(data, remote_jobs_report=None, budget=GMAIL_CLIP_BYTES, item_limit=ITEM_LIMIT, stylesheet=True, metrics=None):
+    """Render the email compacted and trimmed to ``budget`` bytes; returns ``(html, report)``."""
+    plan = instrument_plan(plan_email_sections(data, remote_jobs_report), metrics)
+    return fit_sections(plan, budget, item_limit=item_limit, stylesheet=stylesheet)
+
+def payload_source_bytes(source):
+    """Size of the payload argument as given: argv length, file size, or None for stdin."""
+    if source == '-':
+        return None
+    if source.startswith('@'):
+        try:
+            return os.path.getsize(source[1:])
+        except OSError:
+            return None
+    return len(source)
+
+# Fields the section renderers read from every item of a payload list.
+PAYLOAD_REQUIRED_FIELDS = {
+    'huggingFaceModels': ('modelId', 'link'),
+    'hackerNewsStories': ('title', 'link', 'score', 'by'),
+    'devToArticles': ('title', 'url', 'user'),
+    'aiPapers': ('title', 'url'),
+    'indieRevenue': ('name',),
+}
+REPO_REQUIRED_FIELDS = ('title', 'link', 'stars', 'todayStars')
+
+def _missing_fields(item, fields):
+    if not isinstance(item, dict):
+        return ['<not an object>']
+    return [field for field in fields if field not in item]
+
+def validate_payload(data):
+    """Return a list of problems that would break rendering (empty if the payload is usable)."""
+    if not isinstance(data, dict):
+        return ['payload is not a JSON object']
+
+    problems = []
+    gh = data.get('githubTrending')
+    if gh is not None:
+        if not isinstance(gh, dict):
+            problems.append('githubTrending is not an object')
         else:
-            html += render_remote_jobs_warning(remote_jobs_report)
-
-    html += f'<p style="text-align:center;color:#999;font-size:12px;margin-top:30px;">Generated by Tech Trending Daily 🚀 [{uid()}]</p>'
-    html += '</body></html>'
-    return html
-
-if __name__ == '__main__':
-    username = sys.argv[1]
-    password = sys.argv[2]
-    recipient = sys.argv[3]
-    subject = sys.argv[4]
-    data_base64 = sys.argv[5]
-    enable_remote_jobs = parse_bool(sys.argv[6]) if len(sys.argv) > 6 else parse_bool(os.getenv('ENABLE_REMOTE_JOBS'))
-    remote_jobs_path = sys.argv[7] if len(sys.argv) > 7 else os.getenv('REMOTE_JOBS_REPORT_PATH', '')
-    
-    decoded_bytes = base64.urlsafe_b64decode(data_base64)
-    data = json.loads(decoded_bytes.decode('utf-8'))
+            for language, repos in gh.items():
+                if not isinstance(repos, list):
+                    continue
+                for i, repo in enumerate(repos):
+                    missing = _missing_fields(repo, REPO_REQUIRED_FIELDS)
+                    if missing:
+                        problems.append(f"githubTrending[{language!r}][{i}]: missing {', '.join(missing)}")
+
+    for section, fields in PAYLOAD_REQUIRED_FIELDS.items():
+        items = data.get(section)
+        if items is None:
+            continue
+        if not isinstance(items, list):
+            problems.append(f'{section} is not a list')
+            continue
+        for i, item in enumerate(items):
+            missing = _missing_fields(item, fields)
+            if missing:
+                problems.append(f"{section}[{i}]: missing {', '.join(missing)}")
+    return problems
+
+def summarize_payload(data):
+    gh = data.get('githubTrending') or {}
+    counts = [f"githubTrending: {sum(len(repos) for repos in gh.values() if isinstance(repos, list))} repos in {len(gh)} bucket(s)"]
+    counts.extend(f'{section}: {len(data[section])}' for section in PAYLOAD_REQUIRED_FIELDS if isinstance(data.get(section), list))
+    return '\n'.join(counts)
+
+def load_inputs(payload_arg, enable_remote_jobs, remote_jobs_path, metrics=None):
+    """Decode the payload and, if enabled, load the remote-jobs report."""
+    # base64 string (legacy), "-" for stdin or "@path" for a file; gzip is detected automatically
+    with timed(metrics, 'payload.decode') as stage:
+        data = load_payload(payload_arg)
+        stage.bytes = payload_source_bytes(payload_arg)
     remote_jobs_report = None
     if enable_remote_jobs:
-        remote_jobs_report = load_remote_jobs_report(remote_jobs_path)
-        print(f"Remote jobs report status: {remote_jobs_report['status']}")
+        remote_jobs_report = load_remote_jobs_report(remote_jobs_path, metrics)
+        print(f"Remote jobs report status: {remote_jobs_report['status']}", file=sys.stderr)
+    return data, remote_jobs_report
+
+def filter_new_items(data, metrics=None):
+    """Apply EMAIL_NEW_ITEMS=hide|flag; returns ``(data, seen_store)`` (store is None when off)."""
+    # EMAIL_NEW_ITEMS=hide|flag: hide or flag items delivered in the last EMAIL_SEEN_DAYS days
+    new_items_mode = os.getenv('EMAIL_NEW_ITEMS', '').strip().lower()
+    if not new_items_mode:
+        return data, None
+
+    from seen_store import DEFAULT_WINDOW_DAYS, SeenStore, apply_seen_filter
+
+    with timed(metrics, 'seen.filter', mode=new_items_mode) as stage:
+        seen_store = SeenStore(
+            os.getenv('EMAIL_SEEN_STORE') or None,
+            int(os.getenv('EMAIL_SEEN_DAYS', DEFAULT_WINDOW_DAYS)),
+        )
+        if not seen_store.exists:
+            print(f"Seeded seen-items store from {seen_store.seed()} day(s) of trending history", file=sys.stderr)
+        data = apply_seen_filter(data, seen_store, new_items_mode)
+        stage.extra['remembered'] = len(seen_store)
+    return data, seen_store
+
+def attach_watchlist(data, metrics=None, today=None):
+    """Add ``watchlistMatches`` for the EMAIL_WATCHLIST keywords, searched in the trending archive.
+
+    Only repos that trended in the last EMAIL_WATCHLIST_DAYS days (default 7) match. The payload's
+    repos count as trending on EMAIL_TRENDING_DATE (default: today), since the writer archives them
+    only after sending. The archive and its index are only read; write_github_trending.py keeps
+    them up to date.
+    """
+    watchlist = os.getenv('EMAIL_WATCHLIST', '').strip()
+    if not watchlist:
+        return data
+
+    from datetime import date, timedelta
+
+    from repo_search import RepoSearchIndex, parse_watchlist, watchlist_matches
+    from trending_archive import ARCHIVE_DIR, TrendingArchive
+
+    keywords = parse_watchlist(watchlist)
+    today = today or date.today()
+    day = os.getenv('EMAIL_TRENDING_DATE', '').strip() or today.isoformat()
+
+    with timed(metrics, 'watchlist.search', keywords=len(keywords)) as stage:
+        with TrendingArchive(ARCHIVE_DIR, read_only=True) as archive:
+            index = RepoSearchIndex(ARCHIVE_DIR)
+            index.update(archive, store=False)
+        gh = data.get('githubTrending')
+        if isinstance(gh, dict):
+            index.add_payload(day, gh)
+        since = today - timedelta(days=int(os.getenv('EMAIL_WATCHLIST_DAYS', '7')))
+        matches = watchlist_matches(index, keywords, since=since.isoformat())
+        stage.extra['matches'] = len(matches)
+    return dict(data, watchlistMatches=matches)
+
+def load_subscriber_rules(path=None):
+    """Compile the ``recipient: rule`` lines of EMAIL_SUBSCRIBERS (empty when unset)."""
+    path = path or os.getenv('EMAIL_SUBSCRIBERS', '').strip()
+    if not path:
+        return {}
+
+    from subscriber_rules import compile_subscribers, load_subscribers
+
+    return compile_subscribers(load_subscribers(path))
+
+def personalize_digest(data, remote_jobs_report, recipients, rules, metrics=None):
+    """Select and render every recipient's digest from their rule (no rule: the default digest).
+
+    Returns ``(body, delivered, content_size)``: ``body(recipient)`` is that recipient's
+    email, ``delivered`` lists the ``(name, items)`` of every distinct selection as
+    rendered, for the seen-items store, and ``content_size`` is the largest email in
+    bytes. Each distinct selection is rendered once: within EMAIL_BYTE_BUDGET when it
+    is set, otherwise from a shared ``SectionCache``.
+    """
+    from subscriber_rules import EMPTY_RULE, DayIndex
+
+    with timed(metrics, 'subscribers.select', recipients=len(recipients)) as stage:
+        index = DayIndex(data, ITEM_LIMIT)
+        keys, distinct = {}, {}
+        for recipient in recipients:
+            rule = rules.get(recipient, EMPTY_RULE)
+            item_limit = rule.limit if rule.limit is not None else ITEM_LIMIT
+            key = keys[recipient] = (index.signature(rule), item_limit)
+            if key not in distinct:
+                distinct[key] = index.select(rule)
+        stage.extra['distinct'] = len(distinct)
+
+    byte_budget = int(os.getenv('EMAIL_BYTE_BUDGET', '0') or 0)
+    shared_stylesheet = parse_bool(os.getenv('EMAIL_SHARED_STYLESHEET', 'true'))
+    cache = SectionCache()
+    budgeted, delivered, sizes = {}, [], []
+    with timed(metrics, 'render', selections=len(distinct)) as stage:
+        for key, selection in distinct.items():
+            item_limit = key[1]
+            section_limits = None
+            if byte_budget > 0:
+                content, budget_report = format_email_within_budget(
+                    selection, remote_jobs_report, byte_budget, item_limit, stylesheet=shared_stylesheet,
+                )
+                section_limits = budget_section_limits(budget_report)
+                budgeted[key] = content
+            else:
+                content = format_email_cached(selection, remote_jobs_report, item_limit, cache=cache)
+            delivered.extend(delivered_sections(selection, item_limit, section_limits))
+            sizes.append(byte_size(content))
+        content_size = max(sizes, default=0)
+        stage.bytes = content_size
+    print(f"Email HTML size: up to {content_size} bytes across {len(distinct)} digest(s)", file=sys.stderr)
+
+    def body(recipient):
+        key = keys[recipient]
+        if key in budgeted:
+            return budgeted[key]
+        return format_email_cached(distinct[key], remote_jobs_report, key[1], cache=cache)
+
+    return body, delivered, content_size
+
+def attach_rank_movement(data, metrics=None, day=None):
+    """With EMAIL_RANK_MOVEMENT on, mark repos with their rank change and list the repos that dropped off.
+
+    The payload is the trending list of EMAIL_TRENDING_DATE (default: today), which
+    the writer archives only after sending, so it is compared with the latest day
+    archived before it. Nothing is written.
+    """
+    if not parse_bool(os.getenv('EMAIL_RANK_MOVEMENT')):
+        return data
+    gh = data.get('githubTrending')
+    if not isinstance(gh, dict):
+        return data
+
+    from datetime import date
+
+    from rank_movement import annotate_repos, diff_payload, previous_day
+    from trending_archive import ARCHIVE_DIR, TrendingArchive
+
+    day = day or os.getenv('EMAIL_TRENDING_DATE', '').strip() or date.today().isoformat()
+    with timed(metrics, 'rank-movement.lookup') as stage:
+        with TrendingArchive(ARCHIVE_DIR, read_only=True) as archive:
+            previous = previous_day(archive, day)
+            document = diff_payload(archive, gh, previous, day) if previous else None
+        stage.extra['day'] = day
+        stage.extra['previous'] = previous
+    if document is None:
+        print(f"No rank movement for {day}: nothing archived before it", file=sys.stderr)
+        return data
+    return annotate_repos(data, document)
+
+def attach_sparklines(data, metrics=None, day=None):
+    """With EMAIL_SPARKLINES on, give repos their 30-day star sparkline from the trending archive.
+
+    Sparklines end at EMAIL_TRENDING_DATE (default: the latest archived day) and are
+    normally built by the archive writer (a missing document is built in memory only).
+    EMAIL_SPARKLINE_FORMAT picks text (default) or svg, and EMAIL_SPARKLINE_BYTES caps each svg.
+    """
+    if not parse_bool(os.getenv('EMAIL_SPARKLINES')):
+        return data
+
+    from sparklines import SparklineCache, annotate_repos
+    from trending_archive import ARCHIVE_DIR, TrendingArchive
+
+    cache = SparklineCache.from_env(ARCHIVE_DIR)
+    with timed(metrics, 'sparklines.lookup', format=cache.options['format']) as stage:
+        with TrendingArchive(ARCHIVE_DIR, read_only=True) as archive:
+            dates = archive.dates()
+            day = day or os.getenv('EMAIL_TRENDING_DATE', '').strip() or (dates[-1] if dates else None)
+            document = cache.get(archive, day, store=False) if day else None
+        stage.extra['day'] = day
+        stage.extra['repos'] = len(document['repos']) if document else 0
+    if document is None:
+        print('No sparklines for an empty archive', file=sys.stderr)
+        return data
+    return annotate_repos(data, document)
+
+def render_digest(data, remote_jobs_report, metrics=None):
+    """Render the email as configured by EMAIL_BYTE_BUDGET; returns ``(html, section_limits)``."""
+    byte_budget = int(os.getenv('EMAIL_BYTE_BUDGET', '0') or 0)
+    section_limits = None
+    with timed(metrics, 'render') as stage:
+        if byte_budget > 0:
+            shared_stylesheet = parse_bool(os.getenv('EMAIL_SHARED_STYLESHEET', 'true'))
+            content, budget_report = format_email_within_budget(
+                data, remote_jobs_report, byte_budget, stylesheet=shared_stylesheet, metrics=metrics,
+            )
+            print(format_budget_report(budget_report), file=sys.stderr)
+            section_limits = budget_section_limits(budget_report)
+        else:
+            content = format_email(data, remote_jobs_report, metrics=metrics)
+        stage.bytes = byte_size(content)
 
-    content = format_email(data, remote_jobs_report)
-    
     # Print size for debugging
-    print(f"Email HTML size: {len(content)} bytes ({len(content)/1024:.1f} KB)")
-    
-    send_email(username, password, recipient, subject, content)
+    content_size = byte_size(content)
+    print(f"Email HTML size: {content_size} bytes ({content_size/1024:.1f} KB)", file=sys.stderr)
+    return content, section_limits
+
+def command_render(args, metrics=None):
+    data, remote_jobs_report = load_inputs(args.payload, args.remote_jobs, args.remote_jobs_path, metrics)
+    data, _ = filter_new_items(data, metrics)
+    data = attach_watchlist(data, metrics)
+    data = attach_rank_movement(data, metrics)
+    data = attach_sparklines(data, metrics)
+    if args.rule is not None:
+        from subscriber_rules import compile_rule
+
+        body, _, _ = personalize_digest(data, remote_jobs_report, ['-'], {'-': compile_rule(args.rule)}, metrics)
+        content = body('-')
+    else:
+        content, _ = render_digest(data, remote_jobs_report, metrics)
+    if args.output == '-':
+        sys.stdout.write(content)
+    else:
+        Path(args.output).write_text(content, encoding='utf-8')
+    return 0
+
+def command_validate(args, metrics=None):
+    with timed(metrics, 'payload.decode') as stage:
+        try:
+            data = load_payload(args.payload)
+        except ValueError as error:
+            print(f'Invalid payload: {error}', file=sys.stderr)
+            return 1
+        stage.bytes = payload_source_bytes(args.payload)
+    problems = validate_payload(data)
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    if problems:
+        print(f'{len(problems)} problem(s) found', file=sys.stderr)
+        return 1
+    print(summarize_payload(data))
+    return 0
+
+def _env_int(name):
+    value = os.getenv(name, '').strip()
+    return int(value) if value else None
+
+def _env_float(name):
+    value = os.getenv(name, '').strip()
+    return float(value) if value else None
+
+def command_send(args, metrics=None):
+    from email_delivery import parse_recipients
+
+    # EMAIL_SUBSCRIBERS: file of "recipient: rule" lines, e.g. "me@example.com: lang:rust stars>=1000"
+    rules = load_subscriber_rules()
+    recipients = parse_recipients(args.recipient)
+    if rules:
+        recipients = list(dict.fromkeys(recipients + list(rules)))
+    if not recipients:
+        print('No recipients: pass at least one address or set EMAIL_SUBSCRIBERS', file=sys.stderr)
+        return 1
+
+    data, remote_jobs_report = load_inputs(args.payload, args.remote_jobs, args.remote_jobs_path, metrics)
+    data, seen_store = filter_new_items(data, metrics)
+    data = attach_watchlist(data, metrics)
+    data = attach_rank_movement(data, metrics)
+    data = attach_sparklines(data, metrics)
+
+    if rules:
+        body, delivered, content_size = personalize_digest(data, remote_jobs_report, recipients, rules, metrics)
+    else:
+        body, section_limits = render_digest(data, remote_jobs_report, metrics)
+        delivered = delivered_sections(data, section_limits=section_limits)
+        content_size = byte_size(body)
+
+    # EMAIL_OUTBOX: spool messages to this directory and deliver them from there (resumable)
+    outbox_dir = os.getenv('EMAIL_OUTBOX', '').strip()
+    with timed(metrics, 'smtp.send', recipients=len(recipients)) as stage:
+        stage.bytes = content_size
+        if outbox_dir:
+            from outbox import is_failure
+
+            results = send_email_outbox(
+                args.username, args.password, recipients, args.subject, body, outbox_dir,
+                workers=_env_int('EMAIL_SEND_WORKERS'),
+                retries=_env_int('EMAIL_SEND_RETRIES'),
+                rate=_env_float('EMAIL_SEND_RATE'),
+                daily_quota=_env_int('EMAIL_DAILY_QUOTA'),
+            )
+            # Messages over the daily quota stay queued for the next run; they have not failed.
+            failed = sum(1 for result in results if is_failure(result))
+        elif len(recipients) == 1:
+            send_email(args.username, args.password, recipients[0], args.subject, body(recipients[0]) if callable(body) else body)
+            failed = 0
+        else:
+            results = send_email_batch(
+                args.username, args.password, recipients, args.subject, body,
+                workers=_env_int('EMAIL_SEND_WORKERS'),
+                retries=_env_int('EMAIL_SEND_RETRIES'),
+            )
+            failed = sum(1 for result in results if result['status'] != 'sent')
+        stage.extra['failed'] = failed
+
+    if seen_store is not None and failed < len(recipients):
+        seen_store.mark_delivered(delivered)
+        seen_store.save()
+    return 1 if failed else 0
+
+COMMANDS = {'render': command_render, 'send': command_send, 'validate': command_validate}
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='send_email.py', description='Render, validate or send the Tech Trending Daily email')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_payload(subparser):
+        subparser.add_argument('payload', help='base64 payload, "-" for stdin or "@path" (gzip is detected)')
+
+    def add_remote_jobs(subparser, positional):
+        if positional:
+            subparser.add_argument('remote_jobs', nargs='?', type=parse_bool, default=parse_bool(os.getenv('ENABLE_REMOTE_JOBS')))
+            subparser.add_argument('remote_jobs_path', nargs='?', default=os.getenv('REMOTE_JOBS_REPORT_PATH', ''))
+        else:
+            subparser.add_argument('--remote-jobs', action='store_true', default=parse_bool(os.getenv('ENABLE_REMOTE_JOBS')))
+            subparser.add_argument('--remote-jobs-path', default=os.getenv('REMOTE_JOBS_REPORT_PATH', ''))
+
+    render_parser = subparsers.add_parser('render', help='write the email HTML without sending it')
+    add_payload(render_parser)
+    render_parser.add_argument('-o', '--output', default='-', help='output file (default: stdout)')
+    render_parser.add_argument('--rule', default=None, help='render the digest a subscriber rule selects, e.g. "lang:rust stars>=1000"')
+    add_remote_jobs(render_parser, positional=False)
+
+    validate_parser = subparsers.add_parser('validate', help='check that a payload can be rendered')
+    add_payload(validate_parser)
+
+    send_parser = subparsers.add_parser('send', help='render and send the email')
+    for name in ('username', 'password', 'recipient', 'subject'):
+        send_parser.add_argument(name)
+    add_payload(send_parser)
+    add_remote_jobs(send_parser, positional=True)
+    return parser
+
+def main(argv=None, metrics=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # Legacy form: send_email.py <username> <password> <recipient> <subject> <payload> [remote jobs] [path]
+    if argv and argv[0] not in COMMANDS and not argv[0].startswith('-'):
+        argv = ['send'] + argv
+    args = build_parser().parse_args(argv)
+    return COMMANDS[args.command](args, metrics)
+
+if __name__ == '__main__':
+    # EMAIL_METRICS_PATH: write per-stage timings/sizes as JSON ("-" prints them)
+    # EMAIL_PROFILE_PATH: dump a cProfile of the whole run for pstats/snakeviz
+    metrics_path = os.getenv('EMAIL_METRICS_PATH', '')
+    metrics = PipelineMetrics() if metrics_path else None
+    try:
+        with profiled(os.getenv('EMAIL_PROFILE_PATH', '')):
+            exit_code = main(metrics=metrics)
+    finally:
+        if metrics is not None:
+            metrics.write(metrics_path)
+    sys.exit(exit_code)
@@ -0,0 +1,269 @@
+# sparklines.py
+"""Star-history sparklines for repo cards, generated in batch from the archive.
+
+One pass over the archived days of the window (default 30 days) collects the
+star count of every repo per day, keyed by interned title id. Every series is
+drawn as a text sparkline (``▁▃▅█``) by default, since Gmail strips ``data:``
+images. In the ``svg`` format it is a tiny SVG polyline in a ``data:`` URI
+instead; an image over the byte budget is redrawn with fewer points, and if it
+still does not fit it falls back to text. Images are stored by content hash
+under ``<archive>/sparklines/<end date>.<options>.json`` with a map from repo to
+image, so repos with the same curve share one entry, the email only looks them
+up, and documents built with other options never overwrite each other.
+"""
+import argparse
+import hashlib
+import json
+import os
+from datetime import date as Date
+from datetime import timedelta
+from pathlib import Path
+from urllib.parse import quote
+
+from repo_history import repo_key
+from trending_archive import ARCHIVE_DIR, MISSING_COUNT, TrendingArchive, parse_day
+
+SPARKLINES_DIR = 'sparklines'
+SPARKLINES_VERSION = 2
+FORMATS = ('text', 'svg')
+DEFAULT_FORMAT = 'text'
+DEFAULT_DAYS = 30
+DEFAULT_WIDTH = 80
+DEFAULT_HEIGHT = 16
+DEFAULT_MAX_BYTES = 512
+STROKE = '#58a6ff'
+
+_BLOCKS = '▁▂▃▄▅▆▇█'
+
+
+def collect_series(archive, end, days=DEFAULT_DAYS):
+    """Return ``{repo key: [stars or None per day]}`` for the ``days`` days ending at ``end``."""
+    end_ordinal = parse_day(end).toordinal()
+    start_ordinal = end_ordinal - days + 1
+    by_title = {}
+    for ordinal in archive.ordinals(Date.fromordinal(start_ordinal), Date.fromordinal(end_ordinal)):
+        slot = ordinal - start_ordinal
+        for columns in archive.columns(Date.fromordinal(ordinal)).values():
+            if isinstance(columns, str):
+                continue
+            for title_id, stars in zip(columns.titles, columns.stars):
+                if stars == MISSING_COUNT:
+                    continue
+                series = by_title.get(title_id)
+                if series is None:
+                    series = by_title[title_id] = [None] * days
+                series[slot] = stars
+
+    get = archive.strings.get
+    series_by_repo = {}
+    for title_id, series in by_title.items():
+        key = repo_key(get(title_id))
+        existing = series_by_repo.get(key)
+        if existing is None:
+            series_by_repo[key] = series
+        else:
+            # The same repo under a differently spaced title: merge the days.
+            series_by_repo[key] = [b if a is None else a for a, b in zip(existing, series)]
+    return series_by_repo
+
+
+def _points(series, width, height, step=1):
+    known = [(i, value) for i, value in enumerate(series) if value is not None]
+    if step > 1:
+        known = [point for n, point in enumerate(known) if n % step == 0 or n == len(known) - 1]
+    low = min(value for _, value in known)
+    high = max(value for _, value in known)
+    span = (high - low) or 1
+    x_scale = (width - 1) / max(1, len(series) - 1)
+    middle = (height - 1) / 2
+    points = []
+    for i, value in known:
+        y = middle if high == low else (height - 1) - (value - low) / span * (height - 2) - 0.5
+        points.append(f'{round(i * x_scale)},{round(y)}')
+    return ' '.join(points)
+
+
+def svg_data_uri(series, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, step=1):
+    svg = (
+        f"<svg xmlns='http://www.w3.org/2000/svg' width='{width}' height='{height}'>"
+        f"<polyline fill='none' stroke='{STROKE}' stroke-width='1.5' points='{_points(series, width, height, step)}'/></svg>"
+    )
+    return 'data:image/svg+xml,' + quote(svg, safe=" ,/:='.-")
+
+
+def text_sparkline(series):
+    values = [value for value in series if value is not None]
+    low, high = min(values), max(values)
+    span = (high - low) or 1
+    return ''.join(_BLOCKS[0 if high == low else round((value - low) / span * (len(_BLOCKS) - 1))] for value in values)
+
+
+def render_sparkline(series, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, max_bytes=DEFAULT_MAX_BYTES, sparkline_format=DEFAULT_FORMAT):
+    """``{'text': blocks}``, or for the svg format ``{'svg': data URI}`` within ``max_bytes`` when it fits.
+
+    None for fewer than two points.
+    """
+    known = sum(1 for value in series if value is not None)
+    if known < 2:
+        return None
+    if sparkline_format == 'text':
+        return {'text': text_sparkline(series)}
+    step = 1
+    while True:
+        uri = svg_data_uri(series, width, height, step)
+        if len(uri) <= max_bytes:
+            return {'svg': uri}
+        if known // step <= 2:
+            return {'text': text_sparkline(series)}
+        step *= 2
+
+
+def image_digest(image):
+    return hashlib.blake2b(json.dumps(image, sort_keys=True).encode('utf-8'), digest_size=12).hexdigest()
+
+
+class SparklineCache:
+    def __init__(self, root=ARCHIVE_DIR, days=DEFAULT_DAYS, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, max_bytes=DEFAULT_MAX_BYTES,
+                 sparkline_format=DEFAULT_FORMAT):
+        if sparkline_format not in FORMATS:
+            raise ValueError(f'Unknown sparkline format {sparkline_format!r}; expected one of {", ".join(FORMATS)}')
+        self.root = Path(root)
+        self.directory = self.root / SPARKLINES_DIR
+        self.options = {'format': sparkline_format, 'days': days, 'width': width, 'height': height, 'max_bytes': max_bytes}
+
+    @classmethod
+    def from_env(cls, root=ARCHIVE_DIR, sparkline_format=None):
+        """The cache for the email's options: EMAIL_SPARKLINE_FORMAT (text|svg) and EMAIL_SPARKLINE_BYTES."""
+        max_bytes = os.getenv('EMAIL_SPARKLINE_BYTES', '').strip()
+        return cls(
+            root, max_bytes=int(max_bytes) if max_bytes else DEFAULT_MAX_BYTES,
+            sparkline_format=sparkline_format or os.getenv('EMAIL_SPARKLINE_FORMAT', '').strip().lower() or DEFAULT_FORMAT,
+        )
+
+    def _path(self, end):
+        options = self.options
+        name = f"{end}.{options['format']}-{options['days']}d-{options['width']}x{options['height']}-{options['max_bytes']}b.json"
+        return self.directory / name
+
+    def _window_revisions(self, archive, end):
+        start = parse_day(end) - timedelta(days=self.options['days'] - 1)
+        return {
+            Date.fromordinal(ordinal).isoformat(): archive.revision(Date.fromordinal(ordinal))
+            for ordinal in archive.ordinals(start, end)
+        }
+
+    def build(self, archive, end):
+        """Render the sparklines of every repo archived in the window ending at ``end``."""
+        images, repos = {}, {}
+        options = self.options
+        for key, series in collect_series(archive, end, options['days']).items():
+            image = render_sparkline(series, options['width'], options['height'], options['max_bytes'], options['format'])
+            if image is None:
+                continue
+            digest = image_digest(image)
+            images.setdefault(digest, image)
+            repos[key] = digest
+        return {
+            'version': SPARKLINES_VERSION,
+            'end': end,
+            'options': options,
+            'days': self._window_revisions(archive, end),
+            'images': images,
+            'repos': repos,
+        }
+
+    def _load(self, archive, end):
+        path = self._path(end)
+        if not path.exists():
+            return None
+        document = json.loads(path.read_text(encoding='utf-8'))
+        if (document.get('version') != SPARKLINES_VERSION or document['options'] != self.options
+                or document['days'] != self._window_revisions(archive, end)):
+            return None
+        return document
+
+    def _write(self, document):
+        path = self._path(document['end'])
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(document, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def get(self, archive, end, store=True):
+        """The sparkline document for ``end``, built on first use and stored unless ``store`` is False."""
+        end = parse_day(end).isoformat()
+        document = self._load(archive, end)
+        if document is None:
+            document = self.build(archive, end)
+            if store:
+                self._write(document)
+        return document
+
+    def update(self, archive):
+        """Build the sparklines for the latest archived day if missing or outdated; returns the day or None."""
+        dates = archive.dates()
+        if not dates or self._load(archive, dates[-1]) is not None:
+            return None
+        self._write(self.build(archive, dates[-1]))
+        return dates[-1]
+
+
+def lookup(document, title):
+    digest = document['repos'].get(repo_key(title))
+    return None if digest is None else document['images'][digest]
+
+
+def annotate_repos(data, document):
+    """Return a copy of ``data`` whose GitHub repos carry their ``sparkline`` image, if any."""
+    gh = data.get('githubTrending')
+    if not isinstance(gh, dict):
+        return data
+    size = {'width': document['options']['width'], 'height': document['options']['height']}
+    annotated = {}
+    for key, repos in gh.items():
+        if not isinstance(repos, list):
+            annotated[key] = repos
+            continue
+        annotated[key] = [
+            dict(repo, sparkline=dict(image, **size)) if (image := lookup(document, repo.get('title', ''))) else repo
+            for repo in repos
+        ]
+    return dict(data, githubTrending=annotated)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Star-history sparklines from the trending archive')
+    parser.add_argument('--archive', default=ARCHIVE_DIR)
+    parser.add_argument('--format', choices=FORMATS, default=None, help='default: EMAIL_SPARKLINE_FORMAT or text')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('update', help='build the sparklines for the latest archived day')
+
+    show_parser = subparsers.add_parser('show', help='print the sparkline of a repo')
+    show_parser.add_argument('repo')
+    show_parser.add_argument('--end', default=None, help='last day of the window (default: latest)')
+
+    args = parser.parse_args(argv)
+    cache = SparklineCache.from_env(args.archive, args.format)
+    with TrendingArchive(args.archive) as archive:
+        if args.command == 'update':
+            built = cache.update(archive)
+            print(f'Built sparklines for {built}' if built else 'Sparklines are up to date')
+            return
+        dates = archive.dates()
+        end = args.end or (dates[-1] if dates else None)
+        if end is None:
+            parser.error('the archive is empty')
+        series = collect_series(archive, end, cache.options['days']).get(repo_key(args.repo))
+        document = cache.get(archive, end)
+    image = lookup(document, args.repo)
+    if image is None:
+        parser.error(f'no sparkline for {args.repo} in the {cache.options["days"]} days ending {end}')
+    print(f"{args.repo} ({len(document['repos'])} repos, {len(document['images'])} distinct images)")
+    print(text_sparkline(series))
+    print(image.get('svg') or image['text'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,361 @@
+# subscriber_rules.py
+"""Per-subscriber selection rules, compiled once and evaluated as bitmasks.
+
+A rule is a line of whitespace separated clauses::
+
+    lang:python,rust stars>=1000 today>=50 +llm +agent* -crypto hf.downloads>=10000 limit:5
+
+Every section of the day's payload is indexed once: each numeric field is
+sorted with running bitmasks, so a threshold is a bisect and an XOR, and each
+token of the item text maps to the bitmask of items containing it. A rule is
+then a handful of integer AND/OR operations per section, memoized per distinct
+rule, and subscribers whose selections coincide share the very same item lists
+(which ``SectionCache`` renders once).
+"""
+import argparse
+import json
+import re
+import shlex
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+from repo_search import parse_query, tokenize
+from trending_models import load_trending_data
+
+DEFAULT_ITEM_LIMIT = 10
+DEFAULT_LANGUAGE_COUNT = 3
+
+# rule alias -> (payload key, text fields for keywords, {numeric field alias: record attribute})
+# Numbers are read from the trending_models records, which parse them once.
+SECTIONS = {
+    'github': ('githubTrending', ('title', 'description'), {'stars': 'stars', 'today': 'today_stars'}),
+    'watchlist': ('watchlistMatches', (), {}),
+    'hf': ('huggingFaceModels', ('modelId', 'pipeline_tag', 'tags'), {'downloads': 'downloads', 'likes': 'likes'}),
+    'hn': ('hackerNewsStories', ('title',), {'score': 'score', 'comments': 'descendants'}),
+    'devto': ('devToArticles', ('title', 'tags'), {'reactions': 'reactions', 'comments': 'comments'}),
+    'papers': ('aiPapers', ('title',), {'likes': 'likes'}),
+    'indie': ('indieRevenue', ('name', 'description'), {'mrr': 'mrr', 'arr': 'arr'}),
+}
+# rule alias -> TrendingDay attribute holding the section's records (GitHub is per bucket).
+RECORD_LISTS = {'hf': 'hf_models', 'hn': 'hn_stories', 'devto': 'devto_articles', 'papers': 'papers', 'indie': 'indie_revenue'}
+# Bare field names refer to GitHub repos.
+FIELD_SHORTHANDS = {'stars': 'github.stars', 'today': 'github.today'}
+
+_COMPARISON_RE = re.compile(r'^([a-z]+(?:\.[a-z]+)?)(>=|<=|>|<|=)(\d[\d,]*)$')
+
+# languages: tuple of bucket names or None (default buckets); sections: frozenset of aliases or None (all);
+# conditions: ((section, field, op, value), ...); include/exclude: keyword terms; limit: items per section or None.
+Rule = namedtuple('Rule', ('languages', 'sections', 'conditions', 'include', 'exclude', 'limit'))
+EMPTY_RULE = Rule(None, None, (), (), (), None)
+
+
+def _keyword_term(text):
+    """A keyword as ``((kind, token), ...)``: every token must match, ``*`` makes the last a prefix."""
+    term = []
+    for kind, value in parse_query(text):
+        if kind == 'phrase':
+            term.extend(('token', token) for token in tokenize(value, query=True))
+        else:
+            term.append((kind, value))
+    if not term:
+        raise ValueError(f'Empty keyword in rule: {text!r}')
+    return tuple(term)
+
+
+def compile_rule(text):
+    """Parse a rule line into a ``Rule``; raises ValueError on unknown or malformed clauses."""
+    languages = sections = limit = None
+    conditions, include, exclude = [], [], []
+    for clause in shlex.split(text or '', comments=True):
+        name, sep, value = clause.partition(':')
+        if sep and name in ('lang', 'only', 'limit'):
+            values = tuple(item.strip().lower() for item in value.split(',') if item.strip())
+            if name == 'lang':
+                languages = values
+            elif name == 'only':
+                unknown = [item for item in values if item not in SECTIONS]
+                if unknown:
+                    raise ValueError(f"Unknown section(s) in rule: {', '.join(unknown)} (expected {', '.join(SECTIONS)})")
+                sections = frozenset(values)
+            elif value.strip().isdigit():
+                limit = int(value)
+            else:
+                raise ValueError(f'Invalid limit in rule: {clause!r} (expected a whole number of items)')
+            continue
+        if clause[0] in '+-' and len(clause) > 1:
+            (include if clause[0] == '+' else exclude).append(_keyword_term(clause[1:]))
+            continue
+        match = _COMPARISON_RE.match(clause.lower())
+        if not match:
+            raise ValueError(f'Unknown rule clause: {clause!r}')
+        field, op, value = match.groups()
+        section, _, field = FIELD_SHORTHANDS.get(field, field).rpartition('.')
+        if field not in SECTIONS.get(section, (None, None, {}))[2]:
+            raise ValueError(f'Unknown rule field: {match.group(1)!r}')
+        conditions.append((section, field, op, int(value.replace(',', ''))))
+    return Rule(languages, sections, tuple(conditions), tuple(include), tuple(exclude), limit)
+
+
+def _text(item, fields):
+    parts = []
+    for field in fields:
+        value = item.get(field)
+        if isinstance(value, (list, tuple)):
+            parts.extend(str(part) for part in value)
+        elif value:
+            parts.append(str(value))
+    return ' '.join(parts)
+
+
+class _Table:
+    """One list of items with lazily built numeric columns and token bitmasks.
+
+    ``records`` are the items' ``trending_models`` records, in the same order.
+    """
+
+    def __init__(self, section, items, records=()):
+        self.section = section
+        self.items = items
+        self.records = records
+        self.all = (1 << len(items)) - 1
+        _, self._text_fields, self._fields = SECTIONS[section]
+        self._columns = {}
+        self._tokens = None
+        self._sorted_tokens = None
+        self._terms = {}
+        self._selections = {}
+
+    def _column(self, field):
+        column = self._columns.get(field)
+        if column is None:
+            attribute = self._fields[field]
+            pairs = sorted((getattr(record, attribute), i) for i, record in enumerate(self.records))
+            prefix = [0]
+            for _, i in pairs:
+                prefix.append(prefix[-1] | 1 << i)
+            column = self._columns[field] = ([value for value, _ in pairs], prefix)
+        return column
+
+    def compare(self, field, op, value):
+        """Bitmask of the items whose ``field`` satisfies ``op value`` (missing counts are 0)."""
+        values, prefix = self._column(field)
+        lo, hi = 0, len(values)
+        if op in ('>=', '='):
+            lo = bisect_left(values, value)
+        elif op == '>':
+            lo = bisect_right(values, value)
+        if op in ('<=', '='):
+            hi = bisect_right(values, value)
+        elif op == '<':
+            hi = bisect_left(values, value)
+        return prefix[hi] ^ prefix[lo] if lo < hi else 0
+
+    def _token_masks(self):
+        if self._tokens is None:
+            self._tokens = {}
+            for i, item in enumerate(self.items):
+                bit = 1 << i
+                for token in set(tokenize(_text(item, self._text_fields))):
+                    self._tokens[token] = self._tokens.get(token, 0) | bit
+            self._sorted_tokens = sorted(self._tokens)
+        return self._tokens
+
+    def term(self, term):
+        """Bitmask of the items matching every token of a keyword term."""
+        mask = self._terms.get(term)
+        if mask is None:
+            tokens = self._token_masks()
+            mask = self.all
+            for kind, token in term:
+                if kind == 'prefix':
+                    matched = 0
+                    for i in range(bisect_left(self._sorted_tokens, token), len(self._sorted_tokens)):
+                        if not self._sorted_tokens[i].startswith(token):
+                            break
+                        matched |= tokens[self._sorted_tokens[i]]
+                    mask &= matched
+                else:
+                    mask &= tokens.get(token, 0)
+            self._terms[term] = mask
+        return mask
+
+    def mask(self, rule):
+        mask = self.all
+        for section, field, op, value in rule.conditions:
+            if section == self.section:
+                mask &= self.compare(field, op, value)
+        if self._text_fields:
+            if rule.include:
+                included = 0
+                for term in rule.include:
+                    included |= self.term(term)
+                mask &= included
+            for term in rule.exclude:
+                mask &= ~self.term(term)
+        return mask
+
+    def select(self, mask, limit):
+        """The first ``limit`` items of ``mask``; equal selections return the same list object."""
+        key = (mask, limit)
+        picked = self._selections.get(key)
+        if picked is None:
+            if mask == self.all and limit >= len(self.items):
+                picked = self.items
+            else:
+                picked = []
+                while mask and len(picked) < limit:
+                    low = mask & -mask
+                    picked.append(self.items[low.bit_length() - 1])
+                    mask ^= low
+            self._selections[key] = picked
+        return picked
+
+
+class DayIndex:
+    """The day's payload indexed for evaluating many subscriber rules."""
+
+    def __init__(self, data, item_limit=DEFAULT_ITEM_LIMIT):
+        self.data = data
+        self.item_limit = item_limit
+        self._tables = {}
+        self._selections = {}
+        self._day = None
+        gh = data.get('githubTrending')
+        self.buckets = [key for key, repos in gh.items() if isinstance(repos, list)] if isinstance(gh, dict) else []
+        # Rule languages are case-insensitive; map them to the payload's bucket names.
+        self._bucket_names = {key.lower(): key for key in self.buckets if key}
+
+    def _table(self, section, bucket=None):
+        key = (section, bucket)
+        table = self._tables.get(key)
+        if table is None:
+            if self._day is None:
+                self._day = load_trending_data(self.data)
+            payload_key = SECTIONS[section][0]
+            if section == 'github':
+                items, records = self.data[payload_key][bucket], self._day.github[bucket]
+            else:
+                items = self.data[payload_key]
+                records = getattr(self._day, RECORD_LISTS[section]) if section in RECORD_LISTS else ()
+            table = self._tables[key] = _Table(section, items, records)
+        return table
+
+    def _languages(self, rule):
+        if rule.languages is None:
+            names = sorted(key for key in self.buckets if key and key.lower() != 'all')
+            return names[:DEFAULT_LANGUAGE_COUNT]
+        return [self._bucket_names[name] for name in rule.languages if name in self._bucket_names and name != 'all']
+
+    def select(self, rule):
+        """Return the payload restricted to ``rule``; the result is shared by equal rules."""
+        if isinstance(rule, str):
+            rule = compile_rule(rule)
+        selection = self._selections.get(rule)
+        if selection is not None:
+            return selection
+
+        limit = rule.limit if rule.limit is not None else self.item_limit
+        selection = {key: value for key, value in self.data.items() if key not in _PAYLOAD_KEYS}
+        for section, (payload_key, _, _) in SECTIONS.items():
+            if payload_key not in self.data or (rule.sections is not None and section not in rule.sections):
+                continue
+            if section != 'github':
+                if isinstance(self.data[payload_key], list):
+                    table = self._table(section)
+                    selection[payload_key] = table.select(table.mask(rule), limit)
+                continue
+
+            buckets = {}
+            for bucket in self.buckets:
+                if bucket and bucket.lower() != 'all':
+                    continue
+                table = self._table(section, bucket)
+                buckets[bucket] = table.select(table.mask(rule), limit)
+            languages = []
+            for bucket in self._languages(rule):
+                table = self._table(section, bucket)
+                repos = table.select(table.mask(rule), limit)
+                if repos:
+                    buckets[bucket] = repos
+                    languages.append(bucket)
+            selection[payload_key] = buckets
+            selection['githubLanguages'] = languages
+        self._selections[rule] = selection
+        return selection
+
+    def signature(self, rule):
+        """Identity of the item lists ``rule`` selects; equal signatures mean equal emails."""
+        signature = []
+        for key, value in self.select(rule).items():
+            if key == 'githubTrending':
+                signature.append((key, tuple((bucket, id(repos)) for bucket, repos in value.items())))
+            elif key in _PAYLOAD_KEYS:
+                signature.append((key, id(value)))
+        return tuple(signature)
+
+
+_PAYLOAD_KEYS = frozenset(payload_key for payload_key, _, _ in SECTIONS.values())
+
+
+def parse_subscribers(text):
+    """Parse ``recipient: rule`` lines (``#`` starts a comment); later lines win."""
+    subscribers = {}
+    for number, line in enumerate((text or '').splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        recipient, sep, rule = line.partition(':')
+        if not sep or not recipient.strip():
+            raise ValueError(f'Line {number}: expected "recipient: rule", got {line!r}')
+        subscribers[recipient.strip()] = rule.strip()
+    return subscribers
+
+
+def load_subscribers(path):
+    with open(path, encoding='utf-8') as f:
+        return parse_subscribers(f.read())
+
+
+def compile_subscribers(subscribers):
+    """Map every recipient to its compiled ``Rule``, compiling each distinct rule once."""
+    compiled = {}
+    rules = {}
+    for recipient, text in subscribers.items():
+        rule = compiled.get(text)
+        if rule is None:
+            try:
+                rule = compiled[text] = compile_rule(text)
+            except ValueError as error:
+                raise ValueError(f'{recipient}: {error}') from error
+        rules[recipient] = rule
+    return rules
+
+
+def main(argv=None):
+    from payload_io import load_payload
+
+    parser = argparse.ArgumentParser(description='Check subscriber rules against a payload')
+    parser.add_argument('subscribers', help='file of "recipient: rule" lines')
+    parser.add_argument('payload', help='base64 payload, "-" for stdin or "@path"')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args(argv)
+
+    rules = compile_subscribers(load_subscribers(args.subscribers))
+    index = DayIndex(load_payload(args.payload))
+    summary = {}
+    for recipient, rule in rules.items():
+        selection = index.select(rule)
+        counts = {key: len(value) for key, value in selection.items() if key in _PAYLOAD_KEYS and key != 'githubTrending'}
+        counts.update((f'github:{bucket or "all"}', len(repos)) for bucket, repos in selection.get('githubTrending', {}).items())
+        summary[recipient] = counts
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False))
+        return
+    distinct = len({index.signature(rule) for rule in rules.values()})
+    for recipient, counts in summary.items():
+        print(f"{recipient}: {', '.join(f'{key} {count}' for key, count in counts.items()) or 'nothing'}")
+    print(f'{len(rules)} subscriber(s), {distinct} distinct selection(s)')
+
+
+if __name__ == '__main__':
+    main()
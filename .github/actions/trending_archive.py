@@ -0,0 +1,683 @@
+# trending_archive.py
+"""Append-only archive of the daily GitHub trending snapshots.
+
+Layout of an archive directory:
+
+- ``strings.bin``: interned strings, each stored as a uint32 length + UTF-8 bytes.
+  A string's id is its position in the file.
+- ``strings.idx``: the uint64 offset of every string in ``strings.bin``, so
+  opening the archive does not walk the whole string table.
+- ``days.bin``: one block per day. Every language bucket is stored column by
+  column (title/description/language/link/stars text/today text ids, then the
+  parsed stars and today-stars counts).
+- ``index.bin``: fixed-size (date ordinal, offset, length) entries pointing into
+  ``days.bin``. The index is written last, so it is the commit point of an append;
+  a later entry for the same date replaces an earlier one.
+
+All integers are little-endian and all files are read through ``mmap``. Reading
+a day decodes its columns only; repo strings are decoded when a field is read.
+
+The daily snapshots in ``github-trending-repos/`` are plain or gzip compressed
+JSON (``.json`` / ``.json.gz``); ``load_daily_file`` reads either.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from collections.abc import Mapping, Sequence
+from datetime import date as Date
+from pathlib import Path
+
+from payload_io import GZIP_MAGIC, load_payload_stream
+
+ARCHIVE_DIR = 'github-trending-archive'
+DAILY_DIR = 'github-trending-repos'
+
+STRINGS_FILE = 'strings.bin'
+DAYS_FILE = 'days.bin'
+INDEX_FILE = 'index.bin'
+
+NULL_ID = 0xFFFFFFFF
+MISSING_COUNT = -1
+
+BUCKET_LIST = 0
+BUCKET_SCALAR = 1
+
+_DAILY_FILE_RE = re.compile(r'github-trending-repos-(\d{4}-\d{2}-\d{2})\.json(?:\.gz)?$')
+_COUNT_RE = re.compile(r'\d[\d,]*')
+
+_U32 = struct.Struct('<I')
+_U64 = struct.Struct('<Q')
+_BUCKET_HEADER = struct.Struct('<IIB')
+_INDEX_ENTRY = struct.Struct('<IQI')
+
+_ID_COLUMNS = ('titles', 'descriptions', 'languages', 'links', 'stars_text', 'today_text')
+_COUNT_COLUMNS = ('stars', 'today_stars')
+
+DayColumns = namedtuple('DayColumns', _ID_COLUMNS + _COUNT_COLUMNS)
+
+assert array('I').itemsize == 4 and array('i').itemsize == 4
+
+
+def parse_count(value):
+    """Parse GitHub's human formatted counts ("68,788", "140 stars today")."""
+    if isinstance(value, int):
+        return value
+    if not value:
+        return None
+    match = _COUNT_RE.search(str(value))
+    if not match:
+        return None
+    return int(match.group(0).replace(',', ''))
+
+
+def format_stars(count):
+    return f'{count:,}'
+
+
+def format_today_stars(count):
+    return f'{count:,} star{"" if count == 1 else "s"} today'
+
+
+def _count_text(count, text, format_count):
+    # No stored text: the value was rebuilt from its count, or was missing altogether.
+    if text is not None or count == MISSING_COUNT:
+        return text
+    return format_count(count)
+
+
+def parse_day(value):
+    return Date.fromisoformat(str(value))
+
+
+def daily_file_path(source_dir, day, compress=False):
+    return Path(source_dir) / f'github-trending-repos-{day}.json{".gz" if compress else ""}'
+
+
+def daily_files(source_dir=DAILY_DIR):
+    """Return sorted (date, path) pairs for the daily snapshots in ``source_dir``.
+
+    A day stored both as ``.json`` and ``.json.gz`` is listed once, with the newer file.
+    """
+    source = Path(source_dir)
+    if not source.exists():
+        return []
+
+    files = {}
+    for candidate in source.iterdir():
+        match = _DAILY_FILE_RE.search(candidate.name)
+        if not match:
+            continue
+        current = files.get(match.group(1))
+        if current is None or candidate.stat().st_mtime_ns > current.stat().st_mtime_ns:
+            files[match.group(1)] = candidate
+    return sorted(files.items())
+
+
+def load_daily_file(path):
+    with open(path, 'rb') as f:
+        return load_payload_stream(f)
+
+
+def write_atomic(path, data):
+    """Write ``data`` to a temp file next to ``path``, fsync it and rename it over ``path``."""
+    path = Path(path)
+    tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    if hasattr(os, 'O_DIRECTORY'):
+        # Persist the rename itself.
+        fd = os.open(path.parent, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _snapshot_digest(data):
+    if data[:2] == GZIP_MAGIC:
+        data = gzip.decompress(data)
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def write_daily_file(source_dir, day, repo_tables, compress=False):
+    """Write the snapshot for ``day`` atomically, gzip compressed if ``compress``.
+
+    Returns the path written, or None when the day's existing file already holds
+    the same content in the requested format. Writing one format removes the
+    day's file in the other format.
+    """
+    data = json.dumps(repo_tables).encode('utf-8')
+    path = daily_file_path(source_dir, day, compress)
+    other = daily_file_path(source_dir, day, not compress)
+    if path.exists() and _snapshot_digest(path.read_bytes()) == _snapshot_digest(data):
+        other.unlink(missing_ok=True)
+        return None
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # mtime=0 keeps the compressed bytes identical for identical content.
+    write_atomic(path, gzip.compress(data, mtime=0) if compress else data)
+    other.unlink(missing_ok=True)
+    return path
+
+
+def _to_le(values):
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_le(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def _map_file(path):
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return None
+    with f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class StringTable:
+    """Interned strings in ``strings.bin`` with their offsets persisted in ``strings.idx``.
+
+    Opening the table maps both files and reads nothing else; an offset is read
+    from the index and its string decoded the first time that id is looked up.
+    Strings appended after the last indexed one (an archive written before the
+    offsets file existed, or a crash between the two writes) are found by
+    scanning only that tail, and the next flush indexes them.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.index_path = self.path.with_suffix('.idx')
+        self._map = None
+        self._index_map = None
+        self._indexed = 0
+        self._tail = array('Q')
+        self._size = 0
+        self._decoded = {}
+        self._ids = None
+        self._pending = []
+        self._load()
+
+    def _close_maps(self):
+        for name in ('_map', '_index_map'):
+            mapped = getattr(self, name)
+            if mapped is not None:
+                mapped.close()
+                setattr(self, name, None)
+
+    def _load(self):
+        self._close_maps()
+        self._map = _map_file(self.path)
+        self._indexed = 0
+        self._tail = array('Q')
+        self._size = 0
+        self._decoded = {}
+        if self._map is None:
+            return
+
+        end = len(self._map)
+        self._index_map = _map_file(self.index_path)
+        if self._index_map is not None:
+            self._indexed = len(self._index_map) // _U64.size
+        # Ignore indexed entries that do not fit (e.g. strings.bin was truncated).
+        while self._indexed and not self._fits(self._offset(self._indexed - 1), end):
+            self._indexed -= 1
+
+        offset = 0
+        if self._indexed:
+            last = self._offset(self._indexed - 1)
+            (length,) = _U32.unpack_from(self._map, last)
+            offset = last + _U32.size + length
+        while self._fits(offset, end):
+            self._tail.append(offset)
+            (length,) = _U32.unpack_from(self._map, offset)
+            offset += _U32.size + length
+        # A torn tail from an interrupted append is dropped on the next flush.
+        self._size = offset
+
+    def _offset(self, string_id):
+        if string_id < self._indexed:
+            return _U64.unpack_from(self._index_map, string_id * _U64.size)[0]
+        return self._tail[string_id - self._indexed]
+
+    def _fits(self, offset, end):
+        if offset + _U32.size > end:
+            return False
+        (length,) = _U32.unpack_from(self._map, offset)
+        return offset + _U32.size + length <= end
+
+    def _stored(self):
+        return self._indexed + len(self._tail)
+
+    def __len__(self):
+        return self._stored() + len(self._pending)
+
+    def get(self, string_id):
+        if string_id == NULL_ID:
+            return None
+        value = self._decoded.get(string_id)
+        if value is not None:
+            return value
+        if string_id >= self._stored():
+            return self._pending[string_id - self._stored()]
+        if self._map is None:
+            raise ValueError(f'{self.path} is closed')
+        offset = self._offset(string_id)
+        (length,) = _U32.unpack_from(self._map, offset)
+        start = offset + _U32.size
+        value = self._decoded[string_id] = self._map[start:start + length].decode('utf-8')
+        return value
+
+    def intern(self, value):
+        if value is None:
+            return NULL_ID
+        if self._ids is None:
+            self._ids = {self.get(i): i for i in range(len(self))}
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self)
+            self._pending.append(value)
+            self._ids[value] = string_id
+        return string_id
+
+    def flush(self):
+        ids = self._ids
+        if self._pending:
+            chunks = []
+            for value in self._pending:
+                encoded = value.encode('utf-8')
+                chunks.append(_U32.pack(len(encoded)))
+                chunks.append(encoded)
+
+            mode = 'r+b' if self.path.exists() else 'wb'
+            with open(self.path, mode) as f:
+                f.seek(self._size)
+                f.truncate()
+                f.write(b''.join(chunks))
+                f.flush()
+                os.fsync(f.fileno())
+
+            self._pending = []
+            self._load()
+        if self._tail:
+            # The offsets file is written after the strings, so it never points past them.
+            tail, indexed = self._tail, self._indexed
+            self._close_maps()
+            mode = 'r+b' if self.index_path.exists() else 'wb'
+            with open(self.index_path, mode) as f:
+                f.seek(indexed * _U64.size)
+                f.truncate()
+                f.write(_to_le(tail))
+                f.flush()
+                os.fsync(f.fileno())
+            self._load()
+        self._ids = ids
+
+    def close(self):
+        self._close_maps()
+
+
+REPO_FIELDS = ('title', 'description', 'language', 'stars', 'todayStars', 'link')
+
+
+class RepoRow(Mapping):
+    """One archived repo in the daily-file shape; a field is decoded when it is read."""
+
+    __slots__ = ('_columns', '_strings', '_index')
+
+    def __init__(self, columns, strings, index):
+        self._columns = columns
+        self._strings = strings
+        self._index = index
+
+    def __getitem__(self, key):
+        columns, get, i = self._columns, self._strings.get, self._index
+        if key == 'title':
+            return get(columns.titles[i])
+        if key == 'description':
+            return get(columns.descriptions[i])
+        if key == 'language':
+            return get(columns.languages[i])
+        if key == 'stars':
+            return _count_text(columns.stars[i], get(columns.stars_text[i]), format_stars)
+        if key == 'todayStars':
+            return _count_text(columns.today_stars[i], get(columns.today_text[i]), format_today_stars)
+        if key == 'link':
+            return get(columns.links[i])
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(REPO_FIELDS)
+
+    def __len__(self):
+        return len(REPO_FIELDS)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class RepoRows(Sequence):
+    """The repos of one language bucket, as a view over its columns; valid while the archive is open."""
+
+    __slots__ = ('columns', '_strings')
+
+    def __init__(self, columns, strings):
+        self.columns = columns
+        self._strings = strings
+
+    def __len__(self):
+        return len(self.columns.titles)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [RepoRow(self.columns, self._strings, i) for i in range(len(self))[index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('repo index out of range')
+        return RepoRow(self.columns, self._strings, index)
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, tuple, RepoRows)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+def to_plain(value):
+    """Copy a snapshot (or rows, or a row) read from the archive into plain dicts and lists."""
+    if isinstance(value, Mapping):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, (list, RepoRows)):
+        return [to_plain(item) for item in value]
+    return value
+
+
+class TrendingArchive:
+    """The archive under ``root``; with ``read_only`` set, appending raises instead of writing."""
+
+    def __init__(self, root=ARCHIVE_DIR, read_only=False):
+        self.root = Path(root)
+        self.read_only = read_only
+        self.strings = StringTable(self.root / STRINGS_FILE)
+        self._days_map = None
+        self._ordinals = array('I')
+        self._entries = {}
+        self._index_words = array('I')
+        self._index_count = 0
+        self._dates = None
+        self._load()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.strings.close()
+        if self._days_map is not None:
+            self._days_map.close()
+            self._days_map = None
+
+    def _load(self):
+        if self._days_map is not None:
+            self._days_map.close()
+        self._days_map = _map_file(self.root / DAYS_FILE)
+
+        self._index_words = array('I')
+        self._index_count = 0
+        self._dates = None
+        index_map = _map_file(self.root / INDEX_FILE)
+        if index_map is not None:
+            with index_map:
+                self._index_count = len(index_map) // _INDEX_ENTRY.size
+                # Each entry is four uint32 words: ordinal, offset low, offset high, length.
+                self._index_words = _from_le('I', index_map[:self._index_count * _INDEX_ENTRY.size])
+        # Ordinal -> entry number; a later entry for the same date replaces an earlier one.
+        self._entries = dict(zip(self._index_words[0::4], range(self._index_count)))
+        self._ordinals = array('I', sorted(self._entries))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, day):
+        return parse_day(day).toordinal() in self._entries
+
+    def dates(self):
+        if self._dates is None:
+            self._dates = [Date.fromordinal(ordinal).isoformat() for ordinal in self._ordinals]
+        return list(self._dates)
+
+    def _entry(self, entry):
+        words = self._index_words
+        base = entry * 4
+        return words[base + 1] | words[base + 2] << 32, words[base + 3]
+
+    def revision(self, day):
+        """Return an opaque token that changes whenever ``day`` is re-archived."""
+        entry = self._entries.get(parse_day(day).toordinal())
+        return None if entry is None else self._entry(entry)[0]
+
+    def _block(self, ordinal):
+        offset, length = self._entry(self._entries[ordinal])
+        return self._days_map[offset:offset + length]
+
+    def _decode_columns(self, block):
+        buckets = {}
+        (bucket_count,) = _U32.unpack_from(block, 0)
+        offset = _U32.size
+        for _ in range(bucket_count):
+            key_id, size, kind = _BUCKET_HEADER.unpack_from(block, offset)
+            offset += _BUCKET_HEADER.size
+            key = self.strings.get(key_id)
+            if kind == BUCKET_SCALAR:
+                buckets[key] = self.strings.get(size)
+                continue
+
+            columns = []
+            width = size * 4
+            for name in _ID_COLUMNS + _COUNT_COLUMNS:
+                typecode = 'i' if name in _COUNT_COLUMNS else 'I'
+                columns.append(_from_le(typecode, block[offset:offset + width]))
+                offset += width
+            buckets[key] = DayColumns(*columns)
+        return buckets
+
+    def columns(self, day):
+        """Return ``{language: DayColumns | str}`` for ``day`` without decoding repo strings.
+
+        Non-list buckets (the legacy ``"": "All"`` entry) are returned as their string value.
+        """
+        ordinal = parse_day(day).toordinal()
+        if ordinal not in self._entries:
+            return None
+        return self._decode_columns(self._block(ordinal))
+
+    def rows(self, columns):
+        """The repos of a bucket's ``DayColumns`` as lazily decoded rows."""
+        return RepoRows(columns, self.strings)
+
+    def day(self, day):
+        """Return the snapshot for ``day`` in the same shape as the daily JSON files.
+
+        Repo lists are ``RepoRows`` views: only the fields a caller reads are
+        decoded, and only while the archive is open (``to_plain`` copies them).
+        """
+        buckets = self.columns(day)
+        if buckets is None:
+            return None
+        return {
+            key: value if isinstance(value, str) else self.rows(value)
+            for key, value in buckets.items()
+        }
+
+    def range(self, start=None, end=None):
+        """Yield ``(date, snapshot)`` for every archived day in ``[start, end]``."""
+        for ordinal in self.ordinals(start, end):
+            day = Date.fromordinal(ordinal).isoformat()
+            yield day, self.day(day)
+
+    def ordinals(self, start=None, end=None):
+        lo = 0 if start is None else bisect_left(self._ordinals, parse_day(start).toordinal())
+        hi = len(self._ordinals) if end is None else bisect_right(self._ordinals, parse_day(end).toordinal())
+        return self._ordinals[lo:hi]
+
+    def _encode_bucket(self, key, repos):
+        intern = self.strings.intern
+        key_id = intern(key)
+        if not isinstance(repos, list):
+            return _BUCKET_HEADER.pack(key_id, intern(str(repos)), BUCKET_SCALAR)
+
+        ids = {name: array('I') for name in _ID_COLUMNS}
+        counts = {name: array('i') for name in _COUNT_COLUMNS}
+        for repo in repos:
+            stars_raw = repo.get('stars')
+            today_raw = repo.get('todayStars')
+            stars = parse_count(stars_raw)
+            today_stars = parse_count(today_raw)
+            stars = MISSING_COUNT if stars is None else stars
+            today_stars = MISSING_COUNT if today_stars is None else today_stars
+
+            ids['titles'].append(intern(repo.get('title')))
+            ids['descriptions'].append(intern(repo.get('description')))
+            ids['languages'].append(intern(repo.get('language')))
+            ids['links'].append(intern(repo.get('link')))
+            # Only keep the raw text when it cannot be rebuilt from the parsed count.
+            ids['stars_text'].append(NULL_ID if stars_raw == format_stars(stars) else intern(stars_raw))
+            ids['today_text'].append(NULL_ID if today_raw == format_today_stars(today_stars) else intern(today_raw))
+            counts['stars'].append(stars)
+            counts['today_stars'].append(today_stars)
+
+        parts = [_BUCKET_HEADER.pack(key_id, len(repos), BUCKET_LIST)]
+        parts.extend(_to_le(ids[name]) for name in _ID_COLUMNS)
+        parts.extend(_to_le(counts[name]) for name in _COUNT_COLUMNS)
+        return b''.join(parts)
+
+    def append_day(self, day, repo_tables, replace=True):
+        """Append ``repo_tables`` (a decoded daily snapshot) for ``day``.
+
+        Returns False when the day is already archived and ``replace`` is False.
+        """
+        return bool(self.append_days([(day, repo_tables)], replace=replace))
+
+    def append_days(self, snapshots, replace=True):
+        """Append ``(day, repo_tables)`` pairs with a single write per file.
+
+        Returns the list of days that were written.
+        """
+        ordinals = []
+        blocks = []
+        written = []
+        for day, repo_tables in snapshots:
+            ordinal = parse_day(day).toordinal()
+            if not replace and (ordinal in self._entries or ordinal in ordinals):
+                continue
+            buckets = [self._encode_bucket(key, repos) for key, repos in repo_tables.items()]
+            ordinals.append(ordinal)
+            blocks.append(_U32.pack(len(buckets)) + b''.join(buckets))
+            written.append(parse_day(day).isoformat())
+        if not blocks:
+            return written
+        if self.read_only:
+            raise PermissionError(f'{self.root} was opened read-only')
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.strings.flush()
+
+        entries = []
+        with open(self.root / DAYS_FILE, 'ab') as f:
+            offset = f.tell()
+            for ordinal, block in zip(ordinals, blocks):
+                entries.append(_INDEX_ENTRY.pack(ordinal, offset, len(block)))
+                offset += len(block)
+            f.write(b''.join(blocks))
+            f.flush()
+            os.fsync(f.fileno())
+
+        index_path = self.root / INDEX_FILE
+        with open(index_path, 'r+b' if index_path.exists() else 'wb') as f:
+            f.seek(self._index_count * _INDEX_ENTRY.size)
+            f.truncate()
+            f.write(b''.join(entries))
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._load()
+        return written
+
+    def sync_daily_files(self, source_dir=DAILY_DIR):
+        """Append every daily JSON snapshot in ``source_dir`` that is not archived yet."""
+        missing = (
+            (day, load_daily_file(path))
+            for day, path in daily_files(source_dir)
+            if day not in self
+        )
+        return self.append_days(missing, replace=False)
+
+
+def migrate(source_dir=DAILY_DIR, archive_dir=ARCHIVE_DIR):
+    with TrendingArchive(archive_dir) as archive:
+        return archive.sync_daily_files(source_dir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='GitHub trending archive')
+    parser.add_argument('--archive', default=ARCHIVE_DIR)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate_parser = subparsers.add_parser('migrate', help='import daily JSON snapshots')
+    migrate_parser.add_argument('--source', default=DAILY_DIR)
+
+    show_parser = subparsers.add_parser('show', help='print archived days as JSON')
+    show_parser.add_argument('start')
+    show_parser.add_argument('end', nargs='?')
+
+    subparsers.add_parser('dates', help='list archived days')
+
+    args = parser.parse_args(argv)
+    if args.command == 'migrate':
+        appended = migrate(args.source, args.archive)
+        print(f'Archived {len(appended)} new day(s) into {args.archive}')
+        return
+
+    with TrendingArchive(args.archive) as archive:
+        if args.command == 'dates':
+            print('\n'.join(archive.dates()))
+        elif args.end is None:
+            print(json.dumps(to_plain(archive.day(args.start)), ensure_ascii=False))
+        else:
+            print(json.dumps(to_plain(dict(archive.range(args.start, args.end))), ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
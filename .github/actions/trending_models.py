@@ -0,0 +1,280 @@
+# trending_models.py
+"""Slotted records for the trending payload with numeric fields parsed once.
+
+``load_trending_data`` turns the decoded ``trendingData`` payload into a
+``TrendingDay``.
+"""
+from trending_archive import parse_count
+
+
+def _to_int(value):
+    count = parse_count(value)
+    return 0 if count is None else count
+
+
+def _to_float(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class Record:
+    __slots__ = ()
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __hash__(self):
+        return hash(tuple(getattr(self, name) for name in self.__slots__))
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'{type(self).__name__}({fields})'
+
+
+class Repo(Record):
+    __slots__ = ('title', 'link', 'description', 'language', 'stars_text', 'today_stars_text', 'stars', 'today_stars')
+
+    def __init__(self, title, link, description, language, stars_text, today_stars_text, stars=None, today_stars=None):
+        self.title = title
+        self.link = link
+        self.description = description
+        self.language = language
+        self.stars_text = stars_text
+        self.today_stars_text = today_stars_text
+        self.stars = _to_int(stars_text) if stars is None else stars
+        self.today_stars = _to_int(today_stars_text) if today_stars is None else today_stars
+
+    @classmethod
+    def from_dict(cls, raw):
+        return cls(
+            raw.get('title', ''),
+            raw.get('link', ''),
+            raw.get('description') or '',
+            raw.get('language') or '',
+            raw.get('stars', ''),
+            raw.get('todayStars', ''),
+        )
+
+    def to_dict(self):
+        return {
+            'title': self.title,
+            'description': self.description,
+            'language': self.language,
+            'stars': self.stars_text,
+            'todayStars': self.today_stars_text,
+            'link': self.link,
+        }
+
+
+class HFModel(Record):
+    __slots__ = ('model_id', 'link', 'author', 'downloads', 'likes', 'pipeline_tag', 'tags')
+
+    def __init__(self, model_id, link, author='', downloads=0, likes=0, pipeline_tag=None, tags=()):
+        self.model_id = model_id
+        self.link = link
+        self.author = author
+        self.downloads = downloads
+        self.likes = likes
+        self.pipeline_tag = pipeline_tag
+        self.tags = tags
+
+    @classmethod
+    def from_dict(cls, raw):
+        return cls(
+            raw.get('modelId', ''),
+            raw.get('link', ''),
+            raw.get('author', ''),
+            _to_int(raw.get('downloads')),
+            _to_int(raw.get('likes')),
+            raw.get('pipeline_tag'),
+            tuple(raw.get('tags') or ()),
+        )
+
+    def to_dict(self):
+        return {
+            'modelId': self.model_id,
+            'link': self.link,
+            'author': self.author,
+            'downloads': self.downloads,
+            'likes': self.likes,
+            'pipeline_tag': self.pipeline_tag,
+            'tags': list(self.tags),
+        }
+
+
+class HNStory(Record):
+    __slots__ = ('title', 'link', 'score', 'by', 'descendants', 'time')
+
+    def __init__(self, title, link, score=0, by='', descendants=0, time=0):
+        self.title = title
+        self.link = link
+        self.score = score
+        self.by = by
+        self.descendants = descendants
+        self.time = time
+
+    @classmethod
+    def from_dict(cls, raw):
+        return cls(
+            raw.get('title', ''),
+            raw.get('link', ''),
+            _to_int(raw.get('score')),
+            raw.get('by', ''),
+            _to_int(raw.get('descendants')),
+            _to_int(raw.get('time')),
+        )
+
+    def to_dict(self):
+        return {
+            'title': self.title,
+            'link': self.link,
+            'score': self.score,
+            'by': self.by,
+            'descendants': self.descendants,
+            'time': self.time,
+        }
+
+
+class DevToArticle(Record):
+    __slots__ = ('title', 'url', 'user_name', 'reactions', 'comments', 'tags')
+
+    def __init__(self, title, url, user_name='', reactions=0, comments=0, tags=()):
+        self.title = title
+        self.url = url
+        self.user_name = user_name
+        self.reactions = reactions
+        self.comments = comments
+        self.tags = tags
+
+    @classmethod
+    def from_dict(cls, raw):
+        return cls(
+            raw.get('title', ''),
+            raw.get('url', ''),
+            (raw.get('user') or {}).get('name', ''),
+            _to_int(raw.get('publicReactionsCount')),
+            _to_int(raw.get('commentsCount')),
+            tuple(raw.get('tags') or ()),
+        )
+
+    def to_dict(self):
+        return {
+            'title': self.title,
+            'url': self.url,
+            'user': {'name': self.user_name},
+            'publicReactionsCount': self.reactions,
+            'commentsCount': self.comments,
+            'tags': list(self.tags),
+        }
+
+
+class Paper(Record):
+    __slots__ = ('title', 'url', 'authors', 'likes')
+
+    def __init__(self, title, url, authors=(), likes=0):
+        self.title = title
+        self.url = url
+        self.authors = authors
+        self.likes = likes
+
+    @classmethod
+    def from_dict(cls, raw):
+        return cls(
+            raw.get('title', ''),
+            raw.get('url', ''),
+            tuple(raw.get('authors') or ()),
+            _to_int(raw.get('likes')),
+        )
+
+    def to_dict(self):
+        return {
+            'title': self.title,
+            'url': self.url,
+            'authors': list(self.authors),
+            'likes': self.likes,
+        }
+
+
+class IndieRevenue(Record):
+    __slots__ = ('rank', 'name', 'url', 'description', 'mrr', 'arr', 'founders')
+
+    def __init__(self, rank, name, url='', description='', mrr=0.0, arr=0.0, founders=()):
+        self.rank = rank
+        self.name = name
+        self.url = url
+        self.description = description
+        self.mrr = mrr
+        self.arr = arr
+        self.founders = founders
+
+    @classmethod
+    def from_dict(cls, raw):
+        return cls(
+            raw.get('rank', '-'),
+            raw.get('name', ''),
+            raw.get('url', ''),
+            raw.get('description') or '',
+            _to_float(raw.get('mrr')),
+            _to_float(raw.get('arr')),
+            tuple(raw.get('founders') or ()),
+        )
+
+    def to_dict(self):
+        return {
+            'rank': self.rank,
+            'name': self.name,
+            'url': self.url,
+            'description': self.description,
+            'mrr': self.mrr,
+            'arr': self.arr,
+            'founders': list(self.founders),
+        }
+
+
+class TrendingDay(Record):
+    __slots__ = ('github', 'hf_models', 'hn_stories', 'devto_articles', 'papers', 'indie_revenue')
+
+    def __init__(self, github=None, hf_models=(), hn_stories=(), devto_articles=(), papers=(), indie_revenue=()):
+        self.github = github or {}
+        self.hf_models = hf_models
+        self.hn_stories = hn_stories
+        self.devto_articles = devto_articles
+        self.papers = papers
+        self.indie_revenue = indie_revenue
+
+    @property
+    def all_repos(self):
+        for key in ('all', 'All', ''):
+            if key in self.github:
+                return self.github[key]
+        return next(iter(self.github.values()), [])
+
+    @property
+    def languages(self):
+        return sorted(key for key in self.github if key and key.lower() != 'all')
+
+
+def load_repos(raw_tables):
+    """Build ``{language: [Repo]}``; non-list buckets (the legacy ``"All"`` label) are skipped."""
+    return {
+        key: [Repo.from_dict(raw) for raw in repos]
+        for key, repos in (raw_tables or {}).items()
+        if isinstance(repos, list)
+    }
+
+
+def load_trending_data(data):
+    """Build a ``TrendingDay`` from the decoded ``trendingData`` payload."""
+    return TrendingDay(
+        load_repos(data.get('githubTrending')),
+        [HFModel.from_dict(raw) for raw in data.get('huggingFaceModels') or ()],
+        [HNStory.from_dict(raw) for raw in data.get('hackerNewsStories') or ()],
+        [DevToArticle.from_dict(raw) for raw in data.get('devToArticles') or ()],
+        [Paper.from_dict(raw) for raw in data.get('aiPapers') or ()],
+        [IndieRevenue.from_dict(raw) for raw in data.get('indieRevenue') or ()],
+    )
+
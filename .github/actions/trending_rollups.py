@@ -0,0 +1,257 @@
+# trending_rollups.py
+"""Weekly and monthly summaries of the trending archive.
+
+Every ISO week (``2026-W20``) and calendar month (``2026-05``) gets a rollup
+with, per repo, the days it spent on the list, its best rank, its star gain
+over the period and the buckets it appeared in, plus the leaders of every
+language. Rollups are stored as JSON under ``<archive>/rollups/`` next to a
+manifest of the day revisions each one was built from, so an update rebuilds
+only the periods whose days changed (normally the current week and month).
+Stale periods are rebuilt in parallel on a process pool.
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date as Date
+from datetime import timedelta
+from pathlib import Path
+
+from repo_history import repo_key
+from trending_archive import ARCHIVE_DIR, MISSING_COUNT, TrendingArchive, parse_day
+
+ROLLUPS_DIR = 'rollups'
+MANIFEST_FILE = 'manifest.json'
+PERIODS = ('week', 'month')
+LEADERS_PER_LANGUAGE = 5
+
+
+def period_key(period, day):
+    day = parse_day(day)
+    if period == 'week':
+        year, week, _ = day.isocalendar()
+        return f'{year}-W{week:02d}'
+    if period == 'month':
+        return f'{day.year:04d}-{day.month:02d}'
+    raise ValueError(f'Unknown rollup period: {period!r}')
+
+
+def period_bounds(period, key):
+    """Return the first and last calendar day of a period key."""
+    if period == 'week':
+        year, week = key.split('-W')
+        start = Date.fromisocalendar(int(year), int(week), 1)
+        return start, start + timedelta(days=6)
+    year, month = (int(part) for part in key.split('-'))
+    start = Date(year, month, 1)
+    following = Date(year + month // 12, month % 12 + 1, 1)
+    return start, following - timedelta(days=1)
+
+
+def _rank_key(entry):
+    return (-entry['days'], -entry['star_gain'], entry['best_rank'], entry['repo'])
+
+
+def build_rollup(archive, period, key, days):
+    """Aggregate the archived ``days`` of one period into a rollup document."""
+    get = archive.strings.get
+    repos = {}
+    for day in sorted(days):
+        for bucket, columns in archive.columns(day).items():
+            if isinstance(columns, str):
+                continue
+            for i, title_id in enumerate(columns.titles):
+                title = get(title_id)
+                stars = columns.stars[i]
+                today_stars = max(columns.today_stars[i], 0)
+                slug = repo_key(title)
+                entry = repos.get(slug)
+                if entry is None:
+                    entry = repos[slug] = {
+                        'repo': title,
+                        'language': get(columns.languages[i]) or '',
+                        'link': get(columns.links[i]),
+                        'days': 0,
+                        'best_rank': i + 1,
+                        'first_seen': day,
+                        'last_seen': None,
+                        'first_stars': stars,
+                        'first_today_stars': today_stars,
+                        'stars': stars,
+                        'today_stars_total': 0,
+                        'buckets': [],
+                    }
+                if entry['last_seen'] != day:
+                    entry['days'] += 1
+                    entry['last_seen'] = day
+                    entry['today_stars_total'] += today_stars
+                    if stars != MISSING_COUNT:
+                        entry['stars'] = stars
+                entry['best_rank'] = min(entry['best_rank'], i + 1)
+                bucket_name = bucket or 'all'
+                if bucket_name not in entry['buckets']:
+                    entry['buckets'].append(bucket_name)
+
+    for entry in repos.values():
+        first_stars = entry.pop('first_stars')
+        first_today = entry.pop('first_today_stars')
+        if first_stars != MISSING_COUNT and entry['stars'] != MISSING_COUNT:
+            # Stars at the first sighting already include that day's gain.
+            entry['star_gain'] = entry['stars'] - first_stars + first_today
+        else:
+            entry['star_gain'] = entry['today_stars_total']
+
+    ranked = sorted(repos.values(), key=_rank_key)
+    leaders = {}
+    for entry in ranked:
+        language = entry['language'].lower() or 'other'
+        names = leaders.setdefault(language, [])
+        if len(names) < LEADERS_PER_LANGUAGE:
+            names.append(entry['repo'])
+
+    start, end = period_bounds(period, key)
+    return {
+        'period': period,
+        'key': key,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'days': sorted(days),
+        'repos': ranked,
+        'leaders': dict(sorted(leaders.items(), key=lambda item: (-len(item[1]), item[0]))),
+    }
+
+
+_worker_archive = None
+
+
+def _open_worker_archive(archive_dir):
+    global _worker_archive
+    _worker_archive = TrendingArchive(archive_dir)
+
+
+def _build_in_worker(task):
+    return build_rollup(_worker_archive, *task)
+
+
+class TrendingRollups:
+    def __init__(self, root=ARCHIVE_DIR):
+        self.root = Path(root)
+        self.directory = self.root / ROLLUPS_DIR
+        manifest_path = self.directory / MANIFEST_FILE
+        self.manifest = {period: {} for period in PERIODS}
+        if manifest_path.exists():
+            self.manifest.update(json.loads(manifest_path.read_text(encoding='utf-8')))
+
+    def _path(self, period, key):
+        return self.directory / period / f'{key}.json'
+
+    def _write_json(self, path, document):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(document, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def stale_periods(self, archive):
+        """Return ``[(period, key, {day: revision})]`` for rollups missing or out of date."""
+        grouped = {period: {} for period in PERIODS}
+        for day in archive.dates():
+            revision = archive.revision(day)
+            for period in PERIODS:
+                grouped[period].setdefault(period_key(period, day), {})[day] = revision
+        return [
+            (period, key, days)
+            for period in PERIODS
+            for key, days in grouped[period].items()
+            if self.manifest[period].get(key) != days
+        ]
+
+    def update(self, archive, workers=None):
+        """Rebuild every stale rollup; returns the ``(period, key)`` pairs written.
+
+        A new day only touches its week and month, which are rebuilt in-process; a
+        backfill is spread across ``workers`` processes (default: CPU count).
+        """
+        stale = self.stale_periods(archive)
+        if not stale:
+            return []
+
+        workers = workers or os.cpu_count() or 1
+        if len(stale) <= len(PERIODS) or workers == 1:
+            rollups = [build_rollup(archive, period, key, list(days)) for period, key, days in stale]
+        else:
+            tasks = [(period, key, list(days)) for period, key, days in stale]
+            with ProcessPoolExecutor(workers, initializer=_open_worker_archive, initargs=(str(archive.root),)) as executor:
+                rollups = list(executor.map(_build_in_worker, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
+
+        for (period, key, days), rollup in zip(stale, rollups):
+            self._write_json(self._path(period, key), rollup)
+            self.manifest[period][key] = days
+        # The manifest is written last, so an interrupted update is redone next time.
+        self._write_json(self.directory / MANIFEST_FILE, self.manifest)
+        return [(period, key) for period, key, _ in stale]
+
+    def keys(self, period):
+        return sorted(self.manifest[period])
+
+    def get(self, period, key):
+        path = self._path(period, key)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding='utf-8'))
+
+    def latest(self, period):
+        keys = self.keys(period)
+        return self.get(period, keys[-1]) if keys else None
+
+
+def update_rollups(archive_dir=ARCHIVE_DIR, workers=None):
+    with TrendingArchive(archive_dir) as archive:
+        return TrendingRollups(archive_dir).update(archive, workers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Weekly and monthly GitHub trending rollups')
+    parser.add_argument('--archive', default=ARCHIVE_DIR)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    update_parser = subparsers.add_parser('update', help='build missing or outdated rollups')
+    update_parser.add_argument('--workers', type=int, default=None)
+
+    show_parser = subparsers.add_parser('show', help='print a rollup (default: the latest)')
+    show_parser.add_argument('period', choices=PERIODS)
+    show_parser.add_argument('key', nargs='?')
+    show_parser.add_argument('--limit', type=int, default=10)
+    show_parser.add_argument('--json', action='store_true')
+
+    subparsers.add_parser('list', help='list stored rollups')
+
+    args = parser.parse_args(argv)
+    if args.command == 'update':
+        built = update_rollups(args.archive, args.workers)
+        print(f'Built {len(built)} rollup(s)')
+        return
+
+    rollups = TrendingRollups(args.archive)
+    if args.command == 'list':
+        for period in PERIODS:
+            print(f"{period}: {' '.join(rollups.keys(period))}")
+        return
+
+    rollup = rollups.get(args.period, args.key) if args.key else rollups.latest(args.period)
+    if rollup is None:
+        parser.error(f'no {args.period} rollup {args.key or ""}'.strip())
+    if args.json:
+        print(json.dumps(rollup, ensure_ascii=False))
+        return
+
+    print(f"{rollup['key']} ({rollup['start']} → {rollup['end']}, {len(rollup['days'])} day(s) archived)")
+    for entry in rollup['repos'][:args.limit]:
+        language = entry['language'] or '-'
+        print(f"  {entry['repo']:<40} {language:<12} {entry['days']:>2}d  best #{entry['best_rank']:<3} +{entry['star_gain']:,}⭐")
+    for language, leaders in rollup['leaders'].items():
+        print(f"  {language}: {', '.join(leaders)}")
+
+
+if __name__ == '__main__':
+    main()
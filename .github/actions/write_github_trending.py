@@ -1,25 +1,43 @@
+import argparse
 import os
-import json
-import base64
-import sys
 
-def main():
+from payload_io import load_payload
+from rank_movement import RankMovements
+from repo_history import RepoHistory
+from repo_search import RepoSearchIndex
+from sparklines import SparklineCache
+from trending_archive import ARCHIVE_DIR, DAILY_DIR, TrendingArchive, write_daily_file
+from trending_rollups import TrendingRollups
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Store the GitHub trending snapshot of a day')
+    parser.add_argument('date')
+    # base64 字符串（兼容旧用法）、"-" 表示 stdin、"@path" 表示文件，自动识别 gzip
+    parser.add_argument('payload')
+    # TRENDING_SNAPSHOT_GZIP=true：每日快照写为 .json.gz
+    parser.add_argument('--gzip', action='store_true', default=os.getenv('TRENDING_SNAPSHOT_GZIP', '').strip().lower() in {'1', 'true', 'yes', 'on'})
+    return parser.parse_args(argv)
+
+def main(argv=None):
     try:
-        date = sys.argv[1]
-        repo_data_str = sys.argv[2]
-        repo_data_decoded_bytes = base64.urlsafe_b64decode(repo_data_str)
-        repo_data = json.loads(repo_data_decoded_bytes.decode('utf-8'))
-        repo_tables_map = {key: repos if key else 'All' for key, repos in repo_data.items()}
+        args = parse_args(argv)
+        # 原样保存所有语言的列表（包括全部语言 "all"/"" 对应的仓库列表）
+        repo_tables_map = load_payload(args.payload)
 
-        # 创建目录
-        target_dir = 'github-trending-repos'
-        os.makedirs(target_dir, exist_ok=True)
+        # 原子写入（临时文件 + fsync + rename）；内容未变化时跳过
+        written = write_daily_file(DAILY_DIR, args.date, repo_tables_map, compress=args.gzip)
+        print(f"Wrote {written}" if written else f"Snapshot for {args.date} unchanged, skipped write")
 
-        # 写入文件
-        file_path = os.path.join(target_dir, f'github-trending-repos-{date}.json')
-        # 直接覆盖写入
-        with open(file_path, 'w') as f:
-            json.dump(repo_tables_map, f)
+        # 追加到压缩归档（首次运行时会导入已有的每日文件）
+        with TrendingArchive(ARCHIVE_DIR) as archive:
+            if written or args.date not in archive:
+                archive.append_day(args.date, repo_tables_map)
+            archive.sync_daily_files(DAILY_DIR)
+            RepoHistory(ARCHIVE_DIR).update(archive)
+            RepoSearchIndex(ARCHIVE_DIR).update(archive)
+            TrendingRollups(ARCHIVE_DIR).update(archive)
+            RankMovements(ARCHIVE_DIR).update(archive)
+            SparklineCache.from_env(ARCHIVE_DIR).update(archive)
 
     except Exception as e:
         print(f"An error occurred: {str(e)}")
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""Benchmark the archive, render and send pipeline on the checked-in history.
+
+Usage:
+  python scripts/benchmark.py [--output bench.json] [--compare previous.json] [--quick]
+
+Every benchmark is repeated and reported as min/median/mean seconds in a JSON
+document. With ``--compare`` the run is checked against a previous result and
+exits non-zero when a benchmark's median regressed by more than ``--threshold``.
+"""
+import argparse
+import base64
+import gzip
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parents[1]
+ACTIONS_DIR = PROJECT_DIR / '.github' / 'actions'
+TESTS_DIR = PROJECT_DIR / 'tests'
+sys.path[:0] = [str(ACTIONS_DIR), str(TESTS_DIR)]
+
+try:
+    import yagmail  # noqa: F401
+except ImportError:
+    # Rendering and the local SMTP sink do not need yagmail; mirror the unit tests.
+    import types
+    sys.modules['yagmail'] = types.SimpleNamespace(SMTP=object)
+
+import cache_paths  # noqa: E402
+import email_delivery  # noqa: E402
+import payload_io  # noqa: E402
+import remote_jobs  # noqa: E402
+import render_cache  # noqa: E402
+import send_email  # noqa: E402
+import trending_archive  # noqa: E402
+from smtp_sink import SMTPSink  # noqa: E402
+
+DAILY_DIR = PROJECT_DIR / trending_archive.DAILY_DIR
+REMOTE_JOBS_DIR = PROJECT_DIR / 'remote-jobs'
+ITEM_LIMITS = (10, 100, 1000)
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return {
+        'repeat': repeat,
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.fmean(timings),
+    }
+
+
+def synthetic_payload(history, items):
+    """A trendingData payload with ``items`` entries per section, built from archived repos."""
+    repos = [repo for day in history for bucket in day.values() if isinstance(bucket, list) for repo in bucket]
+    repos = (repos * (items // max(len(repos), 1) + 1))[:items]
+    by_language = {}
+    for repo in repos:
+        by_language.setdefault((repo.get('language') or 'other').lower(), []).append(repo)
+    github = {'all': repos}
+    github.update(sorted(by_language.items(), key=lambda item: -len(item[1]))[:3])
+    return {
+        'githubTrending': github,
+        'huggingFaceModels': [
+            {'modelId': f'org/model-{i}', 'link': f'https://huggingface.co/org/model-{i}', 'downloads': i * 1000, 'likes': i}
+            for i in range(items)
+        ],
+        'hackerNewsStories': [
+            {'title': f'Story {i}', 'link': f'https://news.ycombinator.com/item?id={i}', 'score': i, 'by': 'pg', 'descendants': i}
+            for i in range(items)
+        ],
+        'devToArticles': [
+            {'title': f'Article {i}', 'url': f'https://dev.to/a/{i}', 'user': {'name': 'dev'}, 'publicReactionsCount': i}
+            for i in range(items)
+        ],
+        'aiPapers': [
+            {'title': f'Paper {i}', 'url': f'https://huggingface.co/papers/{i}', 'authors': ['A', 'B', 'C'], 'likes': i}
+            for i in range(items)
+        ],
+        'indieRevenue': [
+            {'rank': i + 1, 'name': f'Product {i}', 'url': f'https://example.com/{i}', 'description': 'An indie product',
+             'mrr': 1000.0 * i, 'arr': 12000.0 * i, 'founders': ['Founder']}
+            for i in range(items)
+        ],
+    }
+
+
+def repo_titles(snapshot):
+    return [repo['title'] for bucket in snapshot.values() if not isinstance(bucket, str) for repo in bucket]
+
+
+def bench_archive(results, workdir, repeat):
+    """Time the archive against loading the daily JSON files it replaces, for the same reads."""
+    files = trending_archive.daily_files(DAILY_DIR)
+    results['archive.json_load_all_days'] = measure(
+        lambda: [trending_archive.load_daily_file(path) for _, path in files], repeat,
+    )
+    results['archive.json_load_one_day'] = measure(
+        lambda: trending_archive.load_daily_file(files[-1][1]), repeat,
+    )
+    results['archive.json_titles_all_days'] = measure(
+        lambda: [repo_titles(trending_archive.load_daily_file(path)) for _, path in files], repeat,
+    )
+
+    archive_dir = Path(workdir) / 'archive'
+    results['archive.migrate'] = measure(
+        lambda: trending_archive.migrate(DAILY_DIR, archive_dir), 1,
+    )
+
+    def read_all():
+        with trending_archive.TrendingArchive(archive_dir) as archive:
+            list(archive.range())
+
+    def read_last_day():
+        with trending_archive.TrendingArchive(archive_dir) as archive:
+            archive.day(files[-1][0])
+
+    def read_all_titles():
+        with trending_archive.TrendingArchive(archive_dir) as archive:
+            [repo_titles(snapshot) for _, snapshot in archive.range()]
+
+    results['archive.read_all_days'] = measure(read_all, repeat)
+    results['archive.open_and_read_one_day'] = measure(read_last_day, repeat)
+    results['archive.titles_all_days'] = measure(read_all_titles, repeat)
+    return archive_dir
+
+
+def bench_payload(results, workdir, history, repeat):
+    raw = json.dumps(synthetic_payload(history, 1000)).encode('utf-8')
+    encoded = base64.urlsafe_b64encode(raw).decode('ascii')
+    gz_path = Path(workdir) / 'payload.json.gz'
+    gz_path.write_bytes(gzip.compress(raw))
+
+    results['payload.decode_base64_argv'] = measure(lambda: payload_io.load_payload(encoded), repeat)
+    results['payload.decode_gzip_file'] = measure(lambda: payload_io.load_payload(f'@{gz_path}'), repeat)
+    results['payload.bytes'] = {'raw': len(raw), 'base64': len(encoded), 'gzip': gz_path.stat().st_size}
+
+
+def bench_render(results, history, repeat):
+    report = send_email.load_remote_jobs_report(str(remote_jobs.load_manifest(REMOTE_JOBS_DIR).latest()))
+    for limit in ITEM_LIMITS:
+        data = synthetic_payload(history, limit)
+        results[f'render.format_email.items_{limit}'] = measure(
+            lambda: send_email.format_email(data, report, item_limit=limit), repeat,
+        )
+        results[f'render.email_bytes.items_{limit}'] = {
+            'bytes': len(send_email.format_email(data, report, item_limit=limit).encode('utf-8')),
+        }
+
+    # Fan-out: one email per subscriber over four audience variants, with and without the section cache.
+    data = synthetic_payload(history, 10)
+    variants = [(data, report), (data, None), (dict(data, aiPapers=[]), report), (dict(data, githubTrending={}), None)]
+    audience = [variants[i % len(variants)] for i in range(100)]
+    results['render.fanout_100_emails.uncached'] = measure(
+        lambda: [send_email.format_email(data, report) for data, report in audience], repeat,
+    )
+    results['render.fanout_100_emails.section_cache'] = measure(
+        lambda: [send_email.format_email_cached(data, report, cache=cache) for cache in [render_cache.SectionCache()]
+                 for data, report in audience],
+        repeat,
+    )
+
+    reports = [path.read_text(encoding='utf-8') for _, path in remote_jobs.load_manifest(REMOTE_JOBS_DIR).between()]
+    results['render.remote_jobs_parse_and_render'] = measure(
+        lambda: [send_email.render_remote_jobs_report({'content': content}) for content in reports], repeat,
+    )
+    parsed = [{'content': content, 'parsed': remote_jobs.parse_report(content)} for content in reports]
+    results['render.remote_jobs_render_parsed'] = measure(
+        lambda: [send_email.render_remote_jobs_report(report) for report in parsed], repeat,
+    )
+
+
+def bench_delivery(results, history, recipients, repeat):
+    body = send_email.format_email(synthetic_payload(history, 10))
+    addresses = [f'reader{i}@example.com' for i in range(recipients)]
+    for workers in (1, 4):
+        with SMTPSink() as sink:
+            results[f'delivery.smtp_sink.{recipients}_recipients.{workers}_workers'] = measure(
+                lambda: email_delivery.deliver_batch(
+                    addresses, 'Benchmark', body,
+                    lambda: email_delivery.SMTPConnection(sink.host, sink.port),
+                    workers=workers,
+                ),
+                repeat,
+            )
+
+
+def compare(current, previous, threshold):
+    regressions = []
+    for name, stats in current.items():
+        before = previous.get(name)
+        if not before or 'median' not in stats or 'median' not in before:
+            continue
+        if before['median'] > 0 and stats['median'] > before['median'] * (1 + threshold):
+            regressions.append((name, before['median'], stats['median']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the trending email pipeline')
+    parser.add_argument('--output', help='write results JSON here (default: stdout)')
+    parser.add_argument('--compare', help='previous results JSON to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed median slowdown (default 0.25)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--recipients', type=int, default=50)
+    parser.add_argument('--quick', action='store_true', help='one repetition, fewer recipients')
+    args = parser.parse_args(argv)
+
+    repeat = 1 if args.quick else args.repeat
+    recipients = min(args.recipients, 10) if args.quick else args.recipients
+    results = {}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ.setdefault(cache_paths.CACHE_DIR_ENV, str(Path(workdir) / 'cache'))
+        archive_dir = bench_archive(results, workdir, repeat)
+        with trending_archive.TrendingArchive(archive_dir) as archive:
+            history = [trending_archive.to_plain(day) for _, day in archive.range()]
+        bench_payload(results, workdir, history, repeat)
+        bench_render(results, history, repeat)
+        bench_delivery(results, history, recipients, repeat)
+
+    document = {
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'days': len(trending_archive.daily_files(DAILY_DIR)),
+        'results': results,
+    }
+    output = json.dumps(document, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + '\n', encoding='utf-8')
+    else:
+        print(output)
+
+    if args.compare:
+        previous = json.loads(Path(args.compare).read_text(encoding='utf-8'))['results']
+        regressions = compare(results, previous, args.threshold)
+        for name, before, after in regressions:
+            print(f'REGRESSION {name}: {before:.4f}s -> {after:.4f}s', file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,23 @@
+import importlib
+import sys
+from pathlib import Path
+
+ACTIONS_DIR = Path(__file__).resolve().parents[1] / ".github" / "actions"
+
+
+def load_actions_module(name):
+    if str(ACTIONS_DIR) not in sys.path:
+        sys.path.insert(0, str(ACTIONS_DIR))
+    return importlib.import_module(name)
+
+
+def make_repo(title, stars=1000, today=1, language="Go", description=""):
+    """A repo as it appears in the trending payload; int counts are formatted like GitHub's."""
+    return {
+        "title": title,
+        "description": description,
+        "language": language,
+        "stars": f"{stars:,}" if isinstance(stars, int) else stars,
+        "todayStars": f"{today:,} star{'' if today == 1 else 's'} today" if isinstance(today, int) else today,
+        "link": f"/{title}",
+    }
@@ -0,0 +1,116 @@
+"""In-process SMTP stand-in for offline delivery tests.
+
+Speaks just enough SMTP (EHLO/HELO, AUTH, MAIL, RCPT, DATA, RSET, NOOP, QUIT)
+for ``smtplib``, records every accepted message and can be told to reject the
+next few messages with a given reply code, or every login.
+"""
+import socketserver
+import threading
+import time
+from email import message_from_bytes, policy
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode("ascii"))
+
+    def handle(self):
+        sink = self.server.sink
+        with sink.lock:
+            sink.connections += 1
+        self.reply("220 smtp-sink ready")
+        mail_from, rcpts = None, []
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            line = raw.decode("utf-8", "replace").rstrip("\r\n")
+            verb = line.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.wfile.write(b"250-smtp-sink\r\n250-AUTH PLAIN\r\n250 8BITMIME\r\n")
+            elif verb == "HELO":
+                self.reply("250 smtp-sink")
+            elif verb == "AUTH":
+                with sink.lock:
+                    sink.logins += 1
+                if sink.reject_logins:
+                    self.reply("535 5.7.8 Authentication credentials invalid")
+                else:
+                    self.reply("235 2.7.0 Authentication successful")
+            elif verb == "MAIL":
+                mail_from, rcpts = line[10:].strip(), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                rcpts.append(line[8:].strip().strip("<>"))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if chunk in (b".\r\n", b".\n", b""):
+                        break
+                    lines.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                if sink.delay:
+                    time.sleep(sink.delay)
+                failure = sink.take_failure()
+                if failure:
+                    self.reply(failure)
+                else:
+                    sink.record(mail_from, rcpts, b"".join(lines))
+                    self.reply("250 OK queued")
+            elif verb == "RSET":
+                mail_from, rcpts = None, []
+                self.reply("250 OK")
+            elif verb == "NOOP":
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+    def __init__(self, delay=0.0, reject_logins=False):
+        self.delay = delay
+        self.reject_logins = reject_logins
+        self.lock = threading.Lock()
+        self.messages = []
+        self.connections = 0
+        self.logins = 0
+        self._failures = []
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.sink = self
+        self.host, self.port = self._server.server_address
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def fail_next(self, count, reply="451 4.3.0 Try again later"):
+        with self.lock:
+            self._failures.extend([reply] * count)
+
+    def take_failure(self):
+        with self.lock:
+            return self._failures.pop(0) if self._failures else None
+
+    def record(self, mail_from, rcpts, data):
+        message = message_from_bytes(data, policy=policy.default)
+        with self.lock:
+            self.messages.append({"from": mail_from, "to": rcpts, "message": message})
+
+    def recipients(self):
+        with self.lock:
+            return [rcpt for item in self.messages for rcpt in item["to"]]
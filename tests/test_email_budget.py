@@ -0,0 +1,95 @@
+import unittest
+
+from helpers import load_actions_module
+
+
+def render_rows(out, items):
+    out.append('<div style="color:#111;padding:4px;">')
+    for item in items:
+        out.append(f'<p style="margin:0;padding:2px 4px;color:#333;">{item}</p>')
+    out.append('</div>')
+
+
+def render_header(out):
+    out.append('<html><body>\n<h1>Title</h1>\n')
+
+
+def render_footer(out):
+    out.append('</body></html>')
+
+
+def make_plan(count):
+    return [
+        ("header", None, render_header),
+        ("github-all", [f"repo {i}" for i in range(count)], render_rows),
+        ("hackernews", [f"story {i}" for i in range(count)], render_rows),
+        ("indie", [f"indie {i}" for i in range(count)], render_rows),
+        ("footer", None, render_footer),
+    ]
+
+
+class EmailBudgetTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_actions_module("email_budget")
+
+    def test_compact_sections_collapses_repeated_styles_and_whitespace(self):
+        sections = [("header", "<html><body>\n<h1>T</h1>\n"), ("rows", "".join(
+            f'<p style="margin:0;padding:2px 4px;color:#333;">{i}</p>' for i in range(5)
+        ) + '<p style="color:red;">once</p>')]
+
+        css, compacted = self.module.compact_sections(sections)
+        html = self.module.assemble(css, compacted)
+
+        self.assertEqual(css, ".a{margin:0;padding:2px 4px;color:#333;}")
+        self.assertTrue(html.startswith("<html><head><style>.a{"))
+        self.assertEqual(html.count('class="a"'), 5)
+        self.assertIn('<p style="color:red;">once</p>', html)
+        self.assertNotIn("\n", html)
+
+    def test_fit_sections_keeps_everything_when_under_budget(self):
+        html, report = self.module.fit_sections(make_plan(5), budget=100_000)
+
+        self.assertTrue(report["fits"])
+        self.assertEqual(report["bytes"], self.module.byte_size(html))
+        self.assertEqual([section["dropped"] for section in report["sections"]], [0, 0, 0, 0, 0])
+
+    def test_fit_sections_trims_lowest_priority_sections_first(self):
+        _, untrimmed = self.module.fit_sections(make_plan(10), budget=100_000, stylesheet=False)
+        budget = untrimmed["bytes"] - 200
+
+        html, report = self.module.fit_sections(make_plan(10), budget=budget, stylesheet=False)
+        sections = {section["name"]: section for section in report["sections"]}
+
+        self.assertTrue(report["fits"])
+        self.assertLessEqual(self.module.byte_size(html), budget)
+        self.assertGreater(sections["indie"]["dropped"], 0)
+        self.assertEqual(sections["hackernews"]["dropped"], 0)
+        self.assertEqual(sections["github-all"]["dropped"], 0)
+
+    def test_fit_sections_drops_sections_when_trimming_is_not_enough(self):
+        html, report = self.module.fit_sections(make_plan(10), budget=400, stylesheet=False)
+
+        self.assertIn("indie", report["omitted"])
+        self.assertNotIn("indie 0", html)
+        self.assertIn("Email size:", self.module.format_budget_report(report))
+
+    def test_fit_sections_keeps_min_items_when_untrimmable_sections_exceed_budget(self):
+        report_section = ("remote-jobs", None, lambda out: out.append("<p>" + "job " * 500 + "</p>"))
+        plan = make_plan(10)
+        plan.insert(-1, report_section)
+
+        html, report = self.module.fit_sections(plan, budget=1000, stylesheet=False)
+        sections = {section["name"]: section for section in report["sections"]}
+
+        self.assertFalse(report["fits"])
+        self.assertFalse(report["reachable"])
+        self.assertGreater(report["floor_bytes"], 1000)
+        self.assertEqual(report["omitted"], [])
+        self.assertEqual([sections[name]["items"] for name in ("github-all", "hackernews", "indie")], [3, 3, 3])
+        self.assertIn("indie 2", html)
+        self.assertIn("Budget unreachable", self.module.format_budget_report(report))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import smtplib
+import unittest
+
+from helpers import load_actions_module
+from smtp_sink import SMTPSink
+
+
+class EmailDeliveryTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_actions_module("email_delivery")
+
+    def factory(self, sink):
+        return lambda: self.module.SMTPConnection(sink.host, sink.port, "bot@example.com", "secret")
+
+    def test_parse_recipients_splits_and_dedupes(self):
+        self.assertEqual(
+            self.module.parse_recipients("a@x.com, b@x.com;a@x.com\nc@x.com"),
+            ["a@x.com", "b@x.com", "c@x.com"],
+        )
+        self.assertEqual(self.module.parse_recipients(""), [])
+
+    def test_deliver_batch_refuses_an_empty_recipient_list(self):
+        for recipients in ("", "  ", " , ;\n"):
+            with self.assertRaises(ValueError):
+                self.module.deliver_batch(recipients, "Digest", "<p>hi</p>", lambda: None)
+
+    def test_deliver_batch_reuses_pooled_connections(self):
+        recipients = [f"reader{i}@example.com" for i in range(12)]
+        with SMTPSink(delay=0.01) as sink:
+            results = self.module.deliver_batch(
+                recipients, "Digest", "<p>hello</p>", self.factory(sink), workers=3,
+            )
+
+        self.assertEqual([result["status"] for result in results], ["sent"] * 12)
+        self.assertEqual(sorted(sink.recipients()), sorted(recipients))
+        self.assertLessEqual(sink.connections, 3)
+        self.assertEqual(sink.logins, sink.connections)
+        message = sink.messages[0]["message"]
+        self.assertEqual(message["Subject"], "Digest")
+        self.assertIn("<p>hello</p>", message.get_body(("html",)).get_content())
+
+    def test_deliver_batch_renders_per_recipient_bodies(self):
+        with SMTPSink() as sink:
+            results = self.module.deliver_batch(
+                ["a@example.com", "b@example.com"], "Digest", lambda recipient: f"<p>for {recipient}</p>", self.factory(sink),
+            )
+
+        self.assertEqual([result["status"] for result in results], ["sent", "sent"])
+        bodies = {message["message"]["To"]: message["message"].get_body(("html",)).get_content() for message in sink.messages}
+        self.assertIn("<p>for b@example.com</p>", bodies["b@example.com"])
+
+    def test_deliver_batch_retries_transient_failures(self):
+        delays = []
+        with SMTPSink() as sink:
+            sink.fail_next(2)
+            results = self.module.deliver_batch(
+                ["a@example.com"], "Digest", "<p>hi</p>", self.factory(sink),
+                retries=3, backoff=0.5, sleep=delays.append,
+            )
+
+        self.assertEqual(results[0]["status"], "sent")
+        self.assertEqual(results[0]["attempts"], 3)
+        self.assertEqual(delays, [0.5, 1.0])
+        self.assertEqual(sink.recipients(), ["a@example.com"])
+
+    def test_deliver_batch_does_not_retry_permanent_failures(self):
+        with SMTPSink() as sink:
+            sink.fail_next(1, "550 5.1.1 Mailbox unavailable")
+            results = self.module.deliver_batch(
+                ["a@example.com", "b@example.com"], "Digest", "<p>hi</p>", self.factory(sink),
+                workers=1, sleep=lambda seconds: None,
+            )
+
+        self.assertEqual([result["status"] for result in results], ["failed", "sent"])
+        self.assertEqual(results[0]["attempts"], 1)
+        self.assertIn("Delivered 1/2", self.module.summarize_results(results))
+        # The rejection was for one recipient; the same connection sends the next message.
+        self.assertEqual(sink.connections, 1)
+
+    def test_deliver_batch_aborts_after_one_rejected_login(self):
+        recipients = [f"reader{i}@example.com" for i in range(6)]
+        with SMTPSink(reject_logins=True) as sink:
+            with self.assertRaises(smtplib.SMTPAuthenticationError):
+                self.module.deliver_batch(recipients, "Digest", "<p>hi</p>", self.factory(sink), workers=3)
+
+        self.assertEqual(sink.logins, 1)
+        self.assertEqual(sink.messages, [])
+
+    def test_pool_drops_only_disconnected_connections(self):
+        class FakeConnection:
+            closed = False
+
+            def close(self):
+                self.closed = True
+
+        pool = self.module.SMTPPool(FakeConnection, size=1)
+        with pool.connection():
+            pass
+        for error in (smtplib.SMTPDataError(554, b"rejected"), smtplib.SMTPServerDisconnected(), ConnectionResetError()):
+            with self.subTest(error=type(error).__name__):
+                created = pool.created
+                with self.assertRaises(type(error)):
+                    with pool.connection() as conn:
+                        raise error
+                with pool.connection() as again:
+                    pass
+                dropped = not isinstance(error, smtplib.SMTPDataError)
+                self.assertEqual(conn.closed, dropped)
+                self.assertEqual(again is conn, not dropped)
+                self.assertEqual(pool.created, created + dropped)
+
+    def test_is_transient_error_classifies_smtp_replies(self):
+        self.assertTrue(self.module.is_transient_error(smtplib.SMTPDataError(451, b"later")))
+        self.assertFalse(self.module.is_transient_error(smtplib.SMTPDataError(554, b"rejected")))
+        self.assertTrue(self.module.is_transient_error(smtplib.SMTPServerDisconnected()))
+        self.assertFalse(self.module.is_transient_error(smtplib.SMTPAuthenticationError(535, b"bad")))
+        self.assertTrue(self.module.is_transient_error(ConnectionResetError()))
+
+
+if __name__ == "__main__":
+    unittest.main()
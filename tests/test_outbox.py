@@ -0,0 +1,138 @@
+import json
+import smtplib
+import tempfile
+import unittest
+from pathlib import Path
+
+from helpers import load_actions_module
+from smtp_sink import SMTPSink
+
+
+class OutboxTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_actions_module("outbox")
+        cls.delivery = load_actions_module("email_delivery")
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def factory(self, sink):
+        return lambda: self.delivery.SMTPConnection(sink.host, sink.port, "bot@example.com", "secret")
+
+    def spool(self, recipients, batch="2026-08-22:Digest"):
+        outbox = self.module.Outbox(self.root)
+        for recipient in recipients:
+            outbox.enqueue(recipient, "Digest", lambda to: f"<p>for {to}</p>", batch)
+        return outbox
+
+    def test_drain_delivers_once_across_restarts(self):
+        recipients = [f"reader{i}@example.com" for i in range(5)]
+        outbox = self.spool(recipients)
+        self.assertEqual(len(self.spool(recipients)), 5)
+
+        with SMTPSink() as sink:
+            results = self.module.drain(outbox, self.factory(sink), workers=2)
+            # A restarted run enqueues the same batch again and drains.
+            again = self.module.drain(self.spool(recipients), self.factory(sink))
+
+        self.assertEqual([result["status"] for result in results], ["sent"] * 5)
+        self.assertEqual(again, [])
+        self.assertEqual(sorted(sink.recipients()), recipients)
+        message = sink.messages[0]["message"]
+        self.assertIn(f"<p>for {message['To']}</p>", message.get_body(("html",)).get_content())
+        summary = self.module.Outbox(self.root).summary()
+        self.assertEqual(summary["states"], {"sent": 5})
+        self.assertIn("p95", summary["latency"])
+
+    def test_interrupted_messages_are_not_resent_until_requeued(self):
+        outbox = self.spool(["a@example.com", "b@example.com"])
+        first, second = outbox.pending()
+        outbox.mark(first, self.module.SENDING, attempts=1)
+        with open(outbox.journal_path, "a", encoding="utf-8") as f:
+            f.write('{"id": "torn')
+
+        restarted = self.module.Outbox(self.root)
+        with SMTPSink() as sink:
+            results = self.module.drain(restarted, self.factory(sink))
+            self.assertEqual(sink.recipients(), ["b@example.com"])
+            self.assertEqual(restarted.state(first), "failed")
+            self.assertEqual(restarted.entry(first)["error"], self.module.INTERRUPTED_ERROR)
+
+            self.assertEqual(restarted.requeue(), [first])
+            self.module.drain(restarted, self.factory(sink))
+
+        self.assertEqual([result["id"] for result in results], [second])
+        self.assertEqual(sink.recipients(), ["b@example.com", "a@example.com"])
+
+    def test_failures_are_deferred_or_failed_by_reply_code(self):
+        outbox = self.spool(["a@example.com", "b@example.com"])
+        with SMTPSink() as sink:
+            sink.fail_next(1)
+            sink.fail_next(1, "550 5.1.1 No such user")
+            results = self.module.drain(outbox, self.factory(sink), workers=1, retries=0)
+            self.assertEqual([result["status"] for result in results], ["deferred", "failed"])
+            self.assertIn("550", results[1]["error"])
+
+            retried = self.module.drain(outbox, self.factory(sink))
+
+        self.assertEqual([(result["recipient"], result["status"]) for result in retried], [("a@example.com", "sent")])
+        self.assertEqual(outbox.summary()["states"], {"sent": 1, "failed": 1})
+
+    def test_rejected_login_aborts_and_keeps_messages_pending(self):
+        outbox = self.spool(["a@example.com", "b@example.com", "c@example.com"])
+        with SMTPSink(reject_logins=True) as sink:
+            with self.assertRaises(smtplib.SMTPAuthenticationError):
+                self.module.drain(outbox, self.factory(sink), workers=2)
+
+        self.assertEqual(sink.logins, 1)
+        self.assertEqual(len(self.module.Outbox(self.root).pending()), 3)
+
+    def test_daily_quota_defers_the_rest(self):
+        outbox = self.spool([f"r{i}@example.com" for i in range(3)])
+        with SMTPSink() as sink:
+            results = self.module.drain(outbox, self.factory(sink), daily_quota=2)
+            later = self.module.drain(outbox, self.factory(sink), daily_quota=2)
+
+        self.assertEqual([result["status"] for result in results], ["sent", "sent", "deferred"])
+        self.assertIn("quota", results[2]["error"])
+        self.assertEqual([result["status"] for result in later], ["deferred"])
+        self.assertEqual(len(sink.recipients()), 2)
+
+    def test_rate_limiter_spaces_out_messages(self):
+        now = [0.0]
+        waits = []
+
+        def sleep(seconds):
+            waits.append(seconds)
+            now[0] += seconds
+
+        limiter = self.module.RateLimiter(2.0, burst=2, clock=lambda: now[0], sleep=sleep)
+        for _ in range(4):
+            limiter.acquire()
+
+        self.assertEqual(waits, [0.5, 0.5])
+
+    def test_compact_forgets_old_sent_messages(self):
+        now = [1000.0]
+        outbox = self.module.Outbox(self.root, clock=lambda: now[0])
+        sent = outbox.enqueue("a@example.com", "Digest", "<p>a</p>", "b1")
+        queued = outbox.enqueue("b@example.com", "Digest", "<p>b</p>", "b1")
+        outbox.mark(sent, self.module.SENT, attempts=1, seconds=0.1)
+        now[0] += 8 * 24 * 3600
+
+        self.assertEqual(outbox.compact(), [sent])
+        reloaded = self.module.Outbox(self.root)
+        self.assertEqual(reloaded.pending(), [queued])
+        self.assertNotIn(sent, reloaded)
+        self.assertFalse((outbox.messages_dir / f"{sent}.json").exists())
+        lines = outbox.journal_path.read_text(encoding="utf-8").splitlines()
+        self.assertEqual([json.loads(line)["id"] for line in lines], [queued])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import base64
+import gzip
+import io
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from helpers import load_actions_module
+
+
+PAYLOAD = {
+    "githubTrending": {"go": [{"title": "owner/仓库", "description": "🌊 " * 5000, "stars": "1,234"}]},
+    "hackerNewsStories": [],
+}
+RAW = json.dumps(PAYLOAD).encode("utf-8")
+
+
+class PayloadIOTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_actions_module("payload_io")
+
+    def test_load_payload_accepts_legacy_base64_argv(self):
+        self.assertEqual(self.module.load_payload(base64.urlsafe_b64encode(RAW).decode("ascii")), PAYLOAD)
+
+    def test_load_payload_reads_every_encoding_from_stdin_and_files(self):
+        encodings = {
+            "json": RAW,
+            "base64": base64.urlsafe_b64encode(RAW),
+            "wrapped base64": base64.encodebytes(RAW),
+            "gzip json": gzip.compress(RAW),
+            "base64 of gzip": base64.b64encode(gzip.compress(RAW)),
+            "gzip of base64": gzip.compress(base64.urlsafe_b64encode(RAW)),
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for name, encoded in encodings.items():
+                with self.subTest(name):
+                    stdin = io.BufferedReader(io.BytesIO(encoded))
+                    self.assertEqual(self.module.load_payload("-", stdin=stdin), PAYLOAD)
+
+                    path = Path(tmpdir) / "payload"
+                    path.write_bytes(encoded)
+                    self.assertEqual(self.module.load_payload(f"@{path}"), PAYLOAD)
+
+    def test_base64_reader_decodes_across_small_chunks(self):
+        encoded = base64.urlsafe_b64encode(RAW[:1001])
+        reader = self.module.Base64Reader(io.BytesIO(encoded), chunk_size=7)
+
+        self.assertEqual(reader.read(), RAW[:1001])
+
+    def test_invalid_base64_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            self.module.load_payload("not*base64!")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import json
+import pstats
+import tempfile
+import unittest
+from pathlib import Path
+
+from helpers import load_actions_module
+
+
+class PipelineMetricsTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_actions_module("pipeline_metrics")
+
+    def test_timed_records_stage_with_bytes_and_extra(self):
+        metrics = self.module.PipelineMetrics()
+
+        with self.module.timed(metrics, "payload.decode", source="argv") as stage:
+            stage.bytes = 42
+        with self.module.timed(metrics, "section.header"):
+            pass
+
+        stages = metrics.to_dict()["stages"]
+        self.assertEqual([stage["name"] for stage in stages], ["payload.decode", "section.header"])
+        self.assertEqual(stages[0]["bytes"], 42)
+        self.assertEqual(stages[0]["source"], "argv")
+        self.assertNotIn("bytes", stages[1])
+        self.assertEqual(metrics.totals("section.")["bytes"], 0)
+
+    def test_timed_without_metrics_still_runs_block(self):
+        with self.module.timed(None, "render") as stage:
+            stage.bytes = 1
+        self.assertIsNotNone(stage.seconds)
+
+    def test_stage_is_recorded_when_block_raises(self):
+        metrics = self.module.PipelineMetrics()
+        with self.assertRaises(RuntimeError):
+            with self.module.timed(metrics, "smtp.send"):
+                raise RuntimeError("boom")
+        self.assertEqual(metrics.stages[0].name, "smtp.send")
+
+    def test_write_and_profile_to_files(self):
+        metrics = self.module.PipelineMetrics()
+        with tempfile.TemporaryDirectory() as tmp:
+            metrics_path = Path(tmp) / "out" / "metrics.json"
+            profile_path = Path(tmp) / "out" / "run.prof"
+            with self.module.profiled(profile_path):
+                with self.module.timed(metrics, "render"):
+                    sum(range(1000))
+            metrics.write(metrics_path)
+
+            document = json.loads(metrics_path.read_text(encoding="utf-8"))
+            self.assertEqual(document["stages"][0]["name"], "render")
+            self.assertGreater(pstats.Stats(str(profile_path)).total_calls, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from helpers import load_actions_module, make_repo
+
+
+class RankMovementTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.archive_module = load_actions_module("trending_archive")
+        cls.module = load_actions_module("rank_movement")
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmpdir.name)
+        self.archive = self.archive_module.TrendingArchive(self.root)
+        self.archive.append_day("2026-08-01", {
+            "": "All",
+            "go": [make_repo("a/one", today=10), make_repo("b/two", today=20), make_repo("c/gone", today=5)],
+            "zig": [make_repo("z/old", today=1, language="Zig")],
+        })
+        self.archive.append_day("2026-08-03", {
+            "": "All",
+            "go": [make_repo("b/two", today=50), make_repo("d/new", today=30), make_repo("a/one", today=4)],
+            "rust": [make_repo("r/fresh", today=9, language="Rust")],
+        })
+
+    def tearDown(self):
+        self.archive.close()
+        self.tmpdir.cleanup()
+
+    def test_diff_days_reports_moves_new_entries_exits_and_acceleration(self):
+        document = self.module.diff_days(self.archive, "2026-08-01", "2026-08-03")
+        moves = document["buckets"]["go"]["moves"]
+
+        self.assertEqual(list(moves), ["b/two", "d/new", "a/one"])
+        self.assertEqual(self.module.movement(moves["b/two"]), {"status": "up", "delta": 1, "acceleration": 30})
+        self.assertEqual(self.module.movement(moves["d/new"]), {"status": "new", "delta": None, "acceleration": None})
+        self.assertEqual(self.module.movement(moves["a/one"]), {"status": "down", "delta": -2, "acceleration": -6})
+        self.assertEqual(document["buckets"]["go"]["dropped"], [["c/gone", 3]])
+        self.assertEqual(document["buckets"]["zig"], {"moves": {}, "dropped": [["z/old", 1]]})
+        self.assertEqual(self.module.movement(document["buckets"]["rust"]["moves"]["r/fresh"])["status"], "new")
+
+    def test_diff_payload_compares_an_unarchived_day_with_the_latest_archived_one(self):
+        gh = {
+            "": [make_repo("A / One", today=7), make_repo("e/brand-new", today="")],
+            "go": [make_repo("a/one", today="")],
+        }
+        self.assertEqual(self.module.previous_day(self.archive, "2026-08-04"), "2026-08-03")
+        self.assertEqual(self.module.previous_day(self.archive, "2026-08-03"), "2026-08-01")
+        self.assertIsNone(self.module.previous_day(self.archive, "2026-08-01"))
+
+        document = self.module.diff_payload(self.archive, gh, "2026-08-03", "2026-08-04")
+        go = document["buckets"]["go"]
+
+        self.assertEqual(document["revisions"][1], None)
+        self.assertEqual(self.module.movement(go["moves"]["a/one"]), {"status": "up", "delta": 2, "acceleration": None})
+        self.assertEqual(go["dropped"], [["b/two", 1], ["d/new", 2]])
+        self.assertEqual(self.module.movement(document["buckets"]["all"]["moves"]["e/brand-new"])["status"], "new")
+        self.assertEqual(document["buckets"]["rust"]["dropped"], [["r/fresh", 1]])
+
+    def test_movements_are_cached_per_date_pair_until_a_day_is_rearchived(self):
+        movements = self.module.RankMovements(self.root)
+        self.assertEqual(movements.update(self.archive), ["2026-08-03"])
+        self.assertEqual(movements.update(self.archive), [])
+        path = self.root / "movements" / "2026-08-01_2026-08-03.json"
+        self.assertTrue(path.exists())
+        self.assertIsNone(movements.get(self.archive, "2026-08-01"))
+
+        self.archive.append_day("2026-08-03", {"go": [make_repo("a/one", today=12)]})
+        document = self.module.RankMovements(self.root).get(self.archive, "2026-08-03")
+
+        self.assertEqual(list(document["buckets"]["go"]["moves"]), ["a/one"])
+        self.assertEqual(self.module.movement(document["buckets"]["go"]["moves"]["a/one"])["acceleration"], 2)
+
+    def test_annotate_repos_marks_payload_repos_by_bucket(self):
+        document = self.module.RankMovements(self.root).get(self.archive, "2026-08-03")
+        payload = {"githubTrending": {
+            "": "All",
+            "Go": [make_repo("B/Two", today=50), make_repo("x/unknown", today=1)],
+            "zig": [],
+        }}
+
+        annotated = self.module.annotate_repos(payload, document)
+
+        go = annotated["githubTrending"]["Go"]
+        self.assertEqual(go[0]["rankMovement"]["status"], "up")
+        self.assertNotIn("rankMovement", go[1])
+        self.assertEqual(annotated["githubDroppedOff"], {"Go": ["c/gone"], "zig": ["z/old"]})
+        self.assertNotIn("rankMovement", payload["githubTrending"]["Go"][0])
+
+
+if __name__ == "__main__":
+    unittest.main()
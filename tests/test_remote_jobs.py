@@ -0,0 +1,150 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from helpers import load_actions_module
+
+
+class RemoteJobsManifestTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_actions_module("remote_jobs")
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.reports_dir = Path(self.tmpdir.name) / "remote-jobs"
+        self.reports_dir.mkdir()
+        env = mock.patch.dict(os.environ, {"TRENDING_CACHE_DIR": str(Path(self.tmpdir.name) / "cache")})
+        env.start()
+        self.addCleanup(env.stop)
+        self.module._manifests.clear()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_report(self, name):
+        path = self.reports_dir / name
+        path.write_text("主题：test\n", encoding="utf-8")
+        return path
+
+    def test_manifest_lookups(self):
+        for day in ["2026-05-09", "2026-05-13", "2026-05-11"]:
+            self.write_report(f"daily_remote_jobs_{day}.md")
+        self.write_report("daily_remote_jobs_notes.md")
+
+        manifest = self.module.load_manifest(self.reports_dir)
+
+        self.assertEqual(len(manifest), 3)
+        self.assertEqual(manifest.latest().name, "daily_remote_jobs_2026-05-13.md")
+        self.assertEqual(manifest.latest_before("2026-05-12").name, "daily_remote_jobs_2026-05-11.md")
+        self.assertEqual(manifest.latest_before("2026-05-11", inclusive=False).name, "daily_remote_jobs_2026-05-09.md")
+        self.assertIsNone(manifest.latest_before("2026-05-01"))
+        self.assertEqual(manifest.get("2026-05-11").name, "daily_remote_jobs_2026-05-11.md")
+        self.assertIsNone(manifest.get("2026-05-10"))
+        self.assertEqual([day for day, _ in manifest.between("2026-05-10", "2026-05-13")], ["2026-05-11", "2026-05-13"])
+
+    def test_manifest_is_reused_until_directory_changes(self):
+        self.write_report("daily_remote_jobs_2026-05-09.md")
+        first = self.module.load_manifest(self.reports_dir)
+
+        self.assertIs(self.module.load_manifest(self.reports_dir), first)
+
+        self.module._manifests.clear()
+        with mock.patch.object(self.module, "_scan", side_effect=AssertionError("rescanned")):
+            from_disk = self.module.load_manifest(self.reports_dir)
+        self.assertEqual(from_disk.dates, ["2026-05-09"])
+
+        self.write_report("daily_remote_jobs_2026-05-10.md")
+        stat = self.reports_dir.stat()
+        os.utime(self.reports_dir, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        self.assertEqual(self.module.load_manifest(self.reports_dir).dates, ["2026-05-09", "2026-05-10"])
+
+    def test_missing_directory_has_no_manifest(self):
+        self.assertIsNone(self.module.load_manifest(Path(self.tmpdir.name) / "missing"))
+
+
+REPORT = """主题：每日远程岗位推荐 - 2026-05-13
+
+今天找到 2 个值得投递的岗位。
+
+## 国内高优先级可直接投
+
+1. S | Full-Stack AI Engineer | Tripilot | 电鸭 | 远程全职
+- 远程范围：国内远程
+- 申请链接：https://eleduck.com/posts/82f2d4
+
+## 海外高匹配补充岗位
+
+2. B | Tech Lead | Zensurance | RemoteOK
+- 英语要求：需要较强英文沟通
+- 申请链接：https://remoteok.com/remote-jobs/1131509
+
+## 今日推荐投递顺序
+
+1) Tripilot Full-Stack AI Engineer
+"""
+
+
+class RemoteJobsParserTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_actions_module("remote_jobs")
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        env = mock.patch.dict(os.environ, {"TRENDING_CACHE_DIR": str(Path(self.tmpdir.name) / "cache")})
+        env.start()
+        self.addCleanup(env.stop)
+        self.module._manifests.clear()
+
+    def test_parse_report_extracts_job_records(self):
+        parsed = self.module.parse_report(REPORT)
+
+        self.assertEqual(parsed["title"], "每日远程岗位推荐 - 2026-05-13")
+        first, second = parsed["jobs"]
+        self.assertEqual(
+            (first["tier"], first["title"], first["company"], first["source"], first["mode"]),
+            ("S", "Full-Stack AI Engineer", "Tripilot", "电鸭", "远程全职"),
+        )
+        self.assertEqual(first["section"], "国内高优先级可直接投")
+        self.assertEqual(first["fields"]["远程范围"], "国内远程")
+        self.assertEqual(first["links"], ["https://eleduck.com/posts/82f2d4"])
+        self.assertEqual(second["tier"], "B")
+        self.assertEqual(second["mode"], "")
+        self.assertEqual(
+            [block[0] for block in parsed["blocks"]],
+            ["text", "heading", "job", "list", "heading", "job", "list", "heading", "text"],
+        )
+
+    def test_load_parsed_report_is_cached_by_content_hash(self):
+        path = Path(self.tmpdir.name) / "daily_remote_jobs_2026-05-13.md"
+        path.write_text(REPORT, encoding="utf-8")
+
+        first = self.module.load_parsed_report(path)
+        with mock.patch.object(self.module, "parse_report", side_effect=AssertionError("reparsed")):
+            cached = self.module.load_parsed_report(path)
+
+        self.assertEqual(cached, first)
+
+    def test_cross_report_dedupe_and_tier_filter(self):
+        reports_dir = Path(self.tmpdir.name) / "remote-jobs"
+        reports_dir.mkdir()
+        (reports_dir / "daily_remote_jobs_2026-05-13.md").write_text(REPORT, encoding="utf-8")
+        (reports_dir / "daily_remote_jobs_2026-05-14.md").write_text(
+            REPORT.split("## 海外高匹配补充岗位")[0], encoding="utf-8",
+        )
+
+        postings = self.module.dedupe_jobs(self.module.iter_report_jobs(reports_dir))
+
+        self.assertEqual(len(postings), 2)
+        tripilot = next(entry for entry in postings if entry["job"]["company"] == "Tripilot")
+        self.assertEqual(tripilot["dates"], ["2026-05-13", "2026-05-14"])
+        jobs = [entry["job"] for entry in postings]
+        self.assertEqual([job["company"] for job in self.module.filter_by_tier(jobs, ["s"])], ["Tripilot"])
+
+
+if __name__ == "__main__":
+    unittest.main()
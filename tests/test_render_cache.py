@@ -0,0 +1,66 @@
+import itertools
+import unittest
+from functools import partial
+
+from helpers import load_actions_module
+
+
+class SectionCacheTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_actions_module("render_cache")
+
+    def setUp(self):
+        self.renders = 0
+        counter = itertools.count()
+        self.uid = lambda: f"id{next(counter)}"
+
+    def marker(self):
+        return self.module.uid_placeholder() or "live"
+
+    def render_header(self, out):
+        self.renders += 1
+        out.append(f"<h1 id='{self.marker()}'>")
+
+    def render_list(self, out, items, color="red"):
+        self.renders += 1
+        out.append(f"<ul class='{color}' id='{self.marker()}'>")
+        out.extend(f"<li>{item}</li>" for item in items)
+        out.append("</ul>")
+
+    def test_assembles_emails_from_shared_fragments_with_fresh_ids(self):
+        cache = self.module.SectionCache()
+        stories = ["a", "b", "c"]
+        plan = [("header", None, self.render_header), ("stories", stories, self.render_list)]
+
+        first = cache.assemble(plan, self.uid, item_limit=2)
+        second = cache.assemble(plan, self.uid, item_limit=2)
+
+        self.assertEqual(first, "<h1 id='id0'><ul class='red' id='id1'><li>a</li><li>b</li></ul>")
+        self.assertEqual(second, "<h1 id='id2'><ul class='red' id='id3'><li>a</li><li>b</li></ul>")
+        self.assertEqual(self.renders, 2)
+        self.assertEqual(cache.stats(), {"entries": 2, "hits": 2, "misses": 2})
+
+    def test_key_covers_content_options_and_limits(self):
+        cache = self.module.SectionCache()
+        blue = partial(self.render_list, color="blue")
+
+        cache.assemble([("s", ["a", "b"], self.render_list)], self.uid, item_limit=5)
+        cache.assemble([("s", ["a", "b"], self.render_list)], self.uid, item_limit=5)  # equal copy: hit
+        cache.assemble([("s", ["a", "x"], self.render_list)], self.uid, item_limit=5)
+        cache.assemble([("s", ["a", "b"], blue)], self.uid, item_limit=5)
+        cache.assemble([("s", ["a", "b"], self.render_list)], self.uid, item_limit=1)
+        html = cache.assemble([("s", ["a", "b"], self.render_list)], self.uid, item_limit=5, section_limits={"s": 0})
+
+        self.assertEqual(html, "")
+        self.assertEqual(self.renders, 4)
+
+    def test_lru_bound(self):
+        cache = self.module.SectionCache(max_entries=2)
+        for items in (["a"], ["b"], ["c"]):
+            cache.fragment("s", items, self.render_list, 10)
+        self.assertEqual(len(cache), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
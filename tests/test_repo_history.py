@@ -0,0 +1,89 @@
+import io
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from helpers import load_actions_module, make_repo
+
+
+class RepoHistoryTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.archive_module = load_actions_module("trending_archive")
+        cls.module = load_actions_module("repo_history")
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_lookup_returns_appearances_across_languages_in_date_order(self):
+        with self.archive_module.TrendingArchive(self.root) as archive:
+            archive.append_day("2026-08-01", {"": "All", "go": [make_repo("a/one", 100, 5), make_repo("b/two", 50, 2)]})
+            archive.append_day("2026-08-02", {"": [make_repo("b/two", 60, 10)], "go": [make_repo("b/two", 60, 10)]})
+            history = self.module.RepoHistory(self.root)
+            self.assertEqual(history.update(archive), ["2026-08-01", "2026-08-02"])
+
+        appearances = self.module.RepoHistory(self.root).lookup("B/Two")
+
+        self.assertEqual(
+            [(item.date, item.language, item.rank, item.stars, item.today_stars) for item in appearances],
+            [
+                ("2026-08-01", "go", 2, 50, 2),
+                ("2026-08-02", "", 1, 60, 10),
+                ("2026-08-02", "go", 1, 60, 10),
+            ],
+        )
+        self.assertEqual(self.module.RepoHistory(self.root).lookup("missing/repo"), [])
+
+    def test_update_is_incremental_and_rebuilds_replaced_days(self):
+        with self.archive_module.TrendingArchive(self.root) as archive:
+            archive.append_day("2026-08-01", {"go": [make_repo("a/one", 100, 5)]})
+            self.module.RepoHistory(self.root).update(archive)
+
+            archive.append_day("2026-08-02", {"go": [make_repo("a/one", 110, 10)]})
+            self.assertEqual(self.module.RepoHistory(self.root).update(archive), ["2026-08-02"])
+            self.assertEqual(self.module.RepoHistory(self.root).update(archive), [])
+
+            archive.append_day("2026-08-02", {"go": [make_repo("c/three", 10, 1), make_repo("a/one", 120, 20)]})
+            self.module.RepoHistory(self.root).update(archive)
+
+        history = self.module.RepoHistory(self.root)
+        self.assertEqual([item.stars for item in history.lookup("a/one")], [100, 120])
+        self.assertEqual(history.lookup("a/one")[-1].rank, 2)
+        self.assertEqual(history.count, 3)
+
+    def test_show_prints_a_dash_for_missing_counts(self):
+        with self.archive_module.TrendingArchive(self.root) as archive:
+            archive.append_day("2026-08-01", {"go": [make_repo("a/one", 1200, 5)]})
+            archive.append_day("2026-08-02", {"go": [make_repo("a/one", "", "")]})
+            self.module.RepoHistory(self.root).update(archive)
+
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.module.main(["--archive", str(self.root), "show", "a/one"])
+
+        lines = out.getvalue().splitlines()
+        self.assertIn("⭐1,200  +5", lines[0])
+        self.assertIn("⭐–  –", lines[1])
+
+    def test_find_streaks_groups_consecutive_days(self):
+        Appearance = self.module.Appearance
+        appearances = [
+            Appearance(day, "go", 1, 0, 0)
+            for day in ["2026-08-01", "2026-08-02", "2026-08-02", "2026-08-03", "2026-08-05"]
+        ]
+
+        streaks = self.module.find_streaks(appearances)
+
+        self.assertEqual(
+            [tuple(streak) for streak in streaks],
+            [("2026-08-01", "2026-08-03", 3), ("2026-08-05", "2026-08-05", 1)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from helpers import load_actions_module, make_repo
+
+
+class RepoSearchTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.archive_module = load_actions_module("trending_archive")
+        cls.module = load_actions_module("repo_search")
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def titles(self, query, **kwargs):
+        return [result["title"] for result in self.module.RepoSearchIndex(self.root).search(query, **kwargs)]
+
+    def test_tokenize_handles_latin_cjk_and_emoji(self):
+        tokens = self.module.tokenize("owner/Vector-DB：开源智能体 🦀 Café")
+
+        self.assertEqual(tokens[:3], ["owner", "vector", "db"])
+        self.assertIn("智能", tokens)
+        self.assertIn("体", tokens)
+        self.assertIn("🦀", tokens)
+        self.assertIn("café", tokens)
+        self.assertEqual(self.module.tokenize("智能体", query=True), ["智能", "能体"])
+
+    def test_search_supports_and_prefix_phrase_and_since(self):
+        with self.archive_module.TrendingArchive(self.root) as archive:
+            archive.append_day("2026-08-01", {"go": [
+                make_repo("a/vec", description="An open-source vector database"),
+                make_repo("b/agent", language="Python", description="Agentic workflows for your database"),
+            ]})
+            archive.append_day("2026-08-02", {"rust": [
+                make_repo("c/claw", language="Rust", description="🦀 多智能体 runtime"),
+            ]})
+            self.assertEqual(self.module.RepoSearchIndex(self.root).update(archive), ["2026-08-01", "2026-08-02"])
+
+        self.assertEqual(self.titles("database"), ["b/agent", "a/vec"])
+        self.assertEqual(self.titles('"vector database"'), ["a/vec"])
+        self.assertEqual(self.titles("database agent*"), ["b/agent"])
+        self.assertEqual(self.titles("智能体"), ["c/claw"])
+        self.assertEqual(self.titles("🦀 rust"), ["c/claw"])
+        self.assertEqual(self.titles("database", since="2026-08-02"), [])
+        self.assertEqual(self.titles("missing"), [])
+
+    def test_update_is_incremental_and_reindexes_changed_descriptions(self):
+        with self.archive_module.TrendingArchive(self.root) as archive:
+            archive.append_day("2026-08-01", {"go": [make_repo("a/tool", description="A fast linter")]})
+            self.module.RepoSearchIndex(self.root).update(archive)
+            archive.append_day("2026-08-02", {"go": [make_repo("a/tool", description="A fast formatter")]})
+            self.assertEqual(self.module.RepoSearchIndex(self.root).update(archive), ["2026-08-02"])
+            self.assertEqual(self.module.RepoSearchIndex(self.root).update(archive), [])
+
+        self.assertEqual(self.titles("formatter"), ["a/tool"])
+        self.assertEqual(self.titles("linter"), [])
+        index = self.module.RepoSearchIndex(self.root)
+        self.assertEqual(len(index), 1)
+        self.assertEqual(index.search("fast")[0]["firstSeen"], "2026-08-01")
+
+    def test_results_link_to_the_archived_repo_url(self):
+        with self.archive_module.TrendingArchive(self.root) as archive:
+            archive.append_day("2026-08-01", {"go": [dict(make_repo("owner / tool", description="A fast linter"), link="/owner/tool")]})
+            self.module.RepoSearchIndex(self.root).update(archive)
+
+        result = self.module.RepoSearchIndex(self.root).search("linter")[0]
+        self.assertEqual((result["title"], result["link"]), ("owner / tool", "/owner/tool"))
+
+    def test_watchlist_matches_group_results_by_keyword(self):
+        with self.archive_module.TrendingArchive(self.root) as archive:
+            archive.append_day("2026-08-01", {"go": [make_repo("a/vec", description="vector database"), make_repo("b/cli", description="terminal app")]})
+            self.module.RepoSearchIndex(self.root).update(archive)
+
+        keywords = self.module.parse_watchlist("vector, terminal;vector\nnothing")
+        matches = self.module.watchlist_matches(self.module.RepoSearchIndex(self.root), keywords)
+
+        self.assertEqual(keywords, ["vector", "terminal", "nothing"])
+        self.assertEqual([(m["keyword"], m["title"]) for m in matches], [("vector", "a/vec"), ("terminal", "b/cli")])
+
+    def test_payload_repos_are_searchable_before_they_are_archived(self):
+        with self.archive_module.TrendingArchive(self.root) as archive:
+            archive.append_day("2026-08-01", {"go": [make_repo("a/vec", description="vector database")]})
+            index = self.module.RepoSearchIndex(self.root)
+            index.update(archive)
+            index.add_payload("2026-08-02", {"go": [make_repo("b/vec", description="vector search")], "python": "not a list"})
+
+            self.assertEqual([r["title"] for r in index.search("vector", since="2026-08-02")], ["b/vec"])
+            # The payload day is not marked indexed, so archiving it later still indexes it.
+            archive.append_day("2026-08-02", {"go": [make_repo("b/vec", description="vector search")]})
+            self.assertEqual(self.module.RepoSearchIndex(self.root).update(archive), ["2026-08-02"])
+
+
+if __name__ == "__main__":
+    unittest.main()
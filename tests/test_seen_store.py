@@ -0,0 +1,83 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from helpers import load_actions_module
+
+
+def repo(title):
+    return {"title": title, "description": "", "language": "Go", "stars": "1", "todayStars": "1 star today", "link": f"/{title}"}
+
+
+class SeenStoreTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_actions_module("seen_store")
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / "seen-items.bin"
+
+    def test_seen_respects_window_and_excludes_today(self):
+        store = self.module.SeenStore(self.path, window_days=7)
+        key = self.module.item_hash("hn", "https://x/1")
+        store.mark([key], "2026-05-10")
+
+        self.assertTrue(store.seen(key, "2026-05-11"))
+        self.assertTrue(store.seen(key, "2026-05-17"))
+        self.assertFalse(store.seen(key, "2026-05-18"))
+        self.assertFalse(store.seen(key, "2026-05-10"))
+
+    def test_save_evicts_old_entries_and_round_trips(self):
+        store = self.module.SeenStore(self.path, window_days=7)
+        store.mark(range(1000), "2026-01-01")
+        store.mark([5, 2 ** 64 - 1], "2026-05-10")
+        store.save("2026-05-11")
+
+        reloaded = self.module.SeenStore(self.path, window_days=7)
+        self.assertEqual(len(reloaded), 2)
+        self.assertTrue(reloaded.seen(2 ** 64 - 1, "2026-05-11"))
+        self.assertEqual(self.path.stat().st_size, 10 + 2 * 12)
+
+    def test_hide_frees_item_slots_for_fresh_items(self):
+        store = self.module.SeenStore(self.path)
+        data = {
+            "githubTrending": {"all": [repo("a/old"), repo("a/new")], "go": [repo("a/old")]},
+            "hackerNewsStories": [{"title": f"S{i}", "link": f"https://x/{i}"} for i in range(4)],
+        }
+        store.mark_delivered([("github-all", [repo("a/old")]), ("hackernews", data["hackerNewsStories"][:2])], "2026-05-10")
+
+        filtered = self.module.apply_seen_filter(data, store, "hide", "2026-05-11")
+
+        self.assertEqual([r["title"] for r in filtered["githubTrending"]["all"]], ["a/new"])
+        self.assertNotIn("go", filtered["githubTrending"])
+        self.assertEqual([s["title"] for s in filtered["hackerNewsStories"]], ["S2", "S3"])
+        self.assertEqual(len(data["hackerNewsStories"]), 4)
+
+    def test_flag_marks_seen_items_without_dropping_them(self):
+        store = self.module.SeenStore(self.path)
+        models = [{"modelId": "org/a", "link": "l"}, {"modelId": "org/b", "link": "l"}]
+        store.mark_delivered([("huggingface", models[:1])], "2026-05-10")
+
+        filtered = self.module.apply_seen_filter({"huggingFaceModels": models}, store, "flag", "2026-05-11")
+
+        self.assertEqual([m.get("seenBefore", False) for m in filtered["huggingFaceModels"]], [True, False])
+        self.assertNotIn("seenBefore", models[0])
+
+    def test_seed_uses_daily_snapshots_before_today(self):
+        daily_dir = Path(self.tmp.name) / "daily"
+        daily_dir.mkdir()
+        for day, title in (("2026-05-01", "a/too-old"), ("2026-05-09", "a/yesterday"), ("2026-05-10", "a/today")):
+            (daily_dir / f"github-trending-repos-{day}.json").write_text(json.dumps({"go": [repo(title)]}))
+        store = self.module.SeenStore(self.path, window_days=7)
+
+        self.assertEqual(store.seed(daily_dir, "2026-05-10"), 1)
+        self.assertTrue(store.seen(self.module.repo_hash(repo("a/yesterday")), "2026-05-10"))
+        self.assertFalse(store.seen(self.module.repo_hash(repo("a/today")), "2026-05-10"))
+        self.assertEqual(len(store), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
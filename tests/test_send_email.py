@@ -1,3 +1,4 @@
+import importlib
 import importlib.util
 import os
 import sys
@@ -5,10 +6,15 @@ import tempfile
 import types
 import unittest
 from pathlib import Path
+from unittest import mock
+
+from helpers import ACTIONS_DIR, make_repo
 
 
 def load_send_email_module():
-    module_path = Path(__file__).resolve().parents[1] / ".github" / "actions" / "send_email.py"
+    module_path = ACTIONS_DIR / "send_email.py"
+    if str(ACTIONS_DIR) not in sys.path:
+        sys.path.insert(0, str(ACTIONS_DIR))
     spec = importlib.util.spec_from_file_location("send_email_module", module_path)
     module = importlib.util.module_from_spec(spec)
     sys.modules.setdefault("yagmail", types.SimpleNamespace(SMTP=object))
@@ -22,6 +28,14 @@ class SendEmailRemoteJobsTests(unittest.TestCase):
     def setUpClass(cls):
         cls.module = load_send_email_module()
 
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        env = mock.patch.dict(os.environ, {"TRENDING_CACHE_DIR": str(Path(self.tmpdir.name) / "cache")})
+        env.start()
+        self.addCleanup(env.stop)
+        importlib.import_module("remote_jobs")._manifests.clear()
+
     def test_load_remote_jobs_report_reads_existing_markdown(self):
         report_body = """主题：每日远程岗位推荐 - 2026-05-08
 
@@ -156,6 +170,299 @@ class SendEmailRemoteJobsTests(unittest.TestCase):
         self.assertIn("已自动使用最近可用报告", html)
         self.assertIn("daily_remote_jobs_2026-05-13.md", html)
 
+    def test_write_email_streams_same_sections_as_format_email(self):
+        data = {
+            "githubTrending": {"": "All", "go": [{
+                "title": "a/b", "description": "d", "language": "Go",
+                "stars": "1", "todayStars": "1 star today", "link": "/a/b",
+            }]},
+            "hackerNewsStories": [{"title": "S", "link": "https://x", "score": 1, "by": "u"}],
+        }
+        original_uid = self.module.uid
+        self.module.uid = lambda: "fixed"
+        try:
+            chunks = []
+            self.module.write_email(data, None, chunks.append)
+            names = [name for name, _ in self.module.iter_email_sections(data)]
+            html = self.module.format_email(data)
+        finally:
+            self.module.uid = original_uid
+
+        self.assertEqual("".join(chunks), html)
+        self.assertEqual(names, ["header", "github-all", "github-go", "hackernews", "footer"])
+
+    def test_format_email_respects_item_limit(self):
+        stories = [{"title": f"Story {i}", "link": f"https://x/{i}", "score": i, "by": "u"} for i in range(30)]
+
+        html = self.module.format_email({"hackerNewsStories": stories}, item_limit=25)
+
+        self.assertIn("Story 24", html)
+        self.assertNotIn("Story 25", html)
+
+    def test_delivered_sections_match_rendered_items(self):
+        stories = [{"title": f"Story {i}", "link": f"https://x/{i}", "score": i, "by": "u", "seenBefore": i == 0} for i in range(5)]
+        data = {"hackerNewsStories": stories}
+
+        html = self.module.format_email(data, item_limit=3)
+        sections = dict(self.module.delivered_sections(data, item_limit=3))
+
+        self.assertEqual(html.count(">seen</span>"), 1)
+        self.assertEqual([story["title"] for story in sections["hackernews"]], ["Story 0", "Story 1", "Story 2"])
+
+    def test_format_email_cached_matches_format_email_across_audiences(self):
+        render_cache = sys.modules["render_cache"]
+        repos = [{"title": f"a/r{i}", "description": "d", "language": "Go", "stars": "1", "todayStars": "1", "link": f"/a/r{i}"} for i in range(3)]
+        stories = [{"title": f"Story {i}", "link": f"https://x/{i}", "score": i, "by": "u"} for i in range(3)]
+        audiences = [
+            {"githubTrending": {"all": repos, "go": repos}, "hackerNewsStories": stories},
+            {"githubTrending": {"all": repos}},
+            {"hackerNewsStories": list(stories)},
+        ]
+        cache = render_cache.SectionCache()
+        original_uid = self.module.uid
+        try:
+            self.module.uid = lambda: "fixed"
+            for data in audiences:
+                self.assertEqual(self.module.format_email_cached(data, cache=render_cache.SectionCache()), self.module.format_email(data))
+        finally:
+            self.module.uid = original_uid
+
+        emails = [self.module.format_email_cached(data, cache=cache) for data in audiences * 2]
+
+        # header, footer, github-all, github-go and hackernews are each rendered once.
+        self.assertEqual(cache.stats()["misses"], 5)
+        self.assertNotIn(render_cache.UID_PLACEHOLDER, "".join(emails))
+        self.assertNotEqual(emails[0], emails[3])
+
+    def test_validate_payload_reports_fields_renderers_need(self):
+        data = {
+            "githubTrending": {"": "All", "go": [{"title": "a/b", "link": "/a/b", "stars": "1"}]},
+            "hackerNewsStories": [{"title": "S", "link": "https://x", "score": 1, "by": "u"}],
+            "aiPapers": "oops",
+        }
+
+        self.assertEqual(
+            self.module.validate_payload(data),
+            ["githubTrending['go'][0]: missing todayStars", "aiPapers is not a list"],
+        )
+        self.assertEqual(self.module.validate_payload({"hackerNewsStories": data["hackerNewsStories"]}), [])
+
+    def test_cli_render_writes_html_and_legacy_arguments_mean_send(self):
+        import base64
+        import json
+
+        payload = base64.b64encode(json.dumps({
+            "hackerNewsStories": [{"title": "Story", "link": "https://x", "score": 1, "by": "u"}],
+        }).encode()).decode()
+        sent = []
+        original_send = self.module.send_email
+        self.module.send_email = lambda *args: sent.append(args)
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                output = Path(tmp) / "preview.html"
+                self.assertEqual(self.module.main(["render", payload, "-o", str(output)]), 0)
+                self.assertIn("Story", output.read_text(encoding="utf-8"))
+            self.assertEqual(sent, [])
+
+            self.assertEqual(self.module.main(["user", "pass", "reader@example.com", "Subject", payload, "false"]), 0)
+        finally:
+            self.module.send_email = original_send
+
+        self.assertEqual(sent[0][:4], ("user", "pass", "reader@example.com", "Subject"))
+        self.assertIn("Story", sent[0][4])
+
+    def test_cli_send_fails_without_recipients(self):
+        import base64
+        import io
+        import json
+        from contextlib import redirect_stderr
+
+        payload = base64.b64encode(json.dumps({"githubTrending": {"all": []}}).encode()).decode()
+        sent = []
+        original_send = self.module.send_email
+        self.module.send_email = lambda *args: sent.append(args)
+        try:
+            with redirect_stderr(io.StringIO()) as stderr:
+                self.assertEqual(self.module.main(["send", "user", "pass", "  ", "Subject", payload]), 1)
+        finally:
+            self.module.send_email = original_send
+
+        self.assertEqual(sent, [])
+        self.assertIn("No recipients", stderr.getvalue())
+
+    def test_cli_send_through_outbox_counts_only_this_runs_messages(self):
+        import base64
+        import io
+        import json
+        from contextlib import redirect_stdout
+
+        outbox_module = importlib.import_module("outbox")
+        sent = []
+
+        class FakeSMTP:
+            def __init__(self, *args):
+                pass
+
+            def send(self, to, **kwargs):
+                if to == "old@example.com":
+                    raise RuntimeError("550 mailbox unavailable")
+                sent.append(to)
+
+            def close(self):
+                pass
+
+        payload = base64.b64encode(json.dumps({"githubTrending": {"all": []}}).encode()).decode()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            outbox_module.Outbox(tmpdir).enqueue("old@example.com", "Old", "<p>old</p>", "2026-08-01:Old")
+            env = {"EMAIL_OUTBOX": tmpdir, "EMAIL_DAILY_QUOTA": "2"}
+            with mock.patch.dict(os.environ, env), mock.patch.dict(sys.modules, {"yagmail": types.SimpleNamespace(SMTP=FakeSMTP)}):
+                with redirect_stdout(io.StringIO()) as stdout:
+                    status = self.module.main(["send", "user", "pass", "a@example.com, b@example.com", "Subject", payload])
+            states = outbox_module.Outbox(tmpdir).summary()["states"]
+
+        # The older message failed and b@ is held back by the quota: neither fails this run.
+        self.assertEqual(status, 0)
+        self.assertEqual(sent, ["a@example.com"])
+        self.assertEqual(states, {"failed": 1, "sent": 1, "deferred": 1})
+        self.assertIn("Delivered 1/2", stdout.getvalue())
+
+    def test_personalize_digest_renders_each_recipients_selection(self):
+        subscriber_rules = importlib.import_module("subscriber_rules")
+        repos = [
+            {"title": f"a/r{i}", "description": "agent" if i else "db", "language": "Go", "stars": str(100 * i), "todayStars": "1", "link": f"/a/r{i}"}
+            for i in range(4)
+        ]
+        data = {"githubTrending": {"all": repos, "go": repos, "rust": repos[:1], "zig": repos[:2]}}
+        rules = subscriber_rules.compile_subscribers({"a@x.com": "lang:zig stars>=200", "b@x.com": "+db"})
+
+        body, delivered, content_size = self.module.personalize_digest(data, None, ["a@x.com", "b@x.com", "c@x.com"], rules)
+        first, second, default = body("a@x.com"), body("b@x.com"), body("c@x.com")
+
+        self.assertIn("a/r3", first)
+        self.assertNotIn("a/r1", first)
+        self.assertNotIn("📦 Zig", first)
+        self.assertIn("a/r0", second)
+        self.assertNotIn("a/r2", second)
+        self.assertIn("📦 Rust", default)
+        self.assertIn("📦 Zig", default)
+        self.assertEqual(len([name for name, _ in delivered if name == "github-all"]), 3)
+        self.assertEqual(content_size, max(len(html.encode("utf-8")) for html in (first, second, default)))
+
+    def test_personalize_digest_fits_each_selection_to_the_byte_budget(self):
+        subscriber_rules = importlib.import_module("subscriber_rules")
+        repos = [make_repo(f"a/r{i}", 100 * i, description="agent framework " * 20) for i in range(10)]
+        data = {"githubTrending": {"all": repos, "go": repos}}
+        rules = subscriber_rules.compile_subscribers({"a@x.com": "stars>=500", "b@x.com": "lang:go"})
+
+        with mock.patch.dict(os.environ, {"EMAIL_BYTE_BUDGET": "4000"}):
+            body, delivered, content_size = self.module.personalize_digest(data, None, ["a@x.com", "b@x.com"], rules)
+        sizes = [len(body(recipient).encode("utf-8")) for recipient in ("a@x.com", "b@x.com")]
+
+        self.assertTrue(all(size <= 4000 for size in sizes))
+        self.assertEqual(content_size, max(sizes))
+        delivered_titles = {title for _, items in delivered for title in (item["title"] for item in items)}
+        self.assertTrue(all(title in body("a@x.com") + body("b@x.com") for title in delivered_titles))
+        self.assertLess(sum(len(items) for _, items in delivered), 30)
+
+    def test_format_email_shows_rank_movement_and_dropped_off_repos(self):
+        def repo(title, **extra):
+            return {"title": title, "description": "", "language": "Go", "stars": "1", "todayStars": "1", "link": f"/{title}", **extra}
+
+        data = {
+            "githubTrending": {
+                "all": [repo("a/up", rankMovement={"status": "up", "delta": 3, "acceleration": 120})],
+                "go": [
+                    repo("b/new", rankMovement={"status": "new", "delta": None, "acceleration": None}),
+                    repo("c/down", rankMovement={"status": "down", "delta": -2, "acceleration": -5}),
+                    repo("d/same", rankMovement={"status": "same", "delta": 0, "acceleration": 7}),
+                ],
+            },
+            "githubDroppedOff": {"go": ["e/gone", "f/gone"]},
+        }
+
+        html = self.module.format_email(data)
+
+        self.assertIn("↑3 ⚡+120</span>", html)
+        self.assertIn(">new</span>", html)
+        self.assertIn("↓2</span>", html)
+        self.assertNotIn("⚡+7", html)
+        self.assertIn("Dropped off: e/gone, f/gone", html)
+
+    def test_format_email_shows_star_sparklines(self):
+        def repo(title, **extra):
+            return {"title": title, "description": "", "language": "Go", "stars": "1", "todayStars": "1", "link": f"/{title}", **extra}
+
+        data = {
+            "githubTrending": {
+                "all": [repo("a/svg", sparkline={"svg": "data:image/svg+xml,%3Csvg/%3E", "width": 80, "height": 16})],
+                "go": [repo("b/text", sparkline={"text": "▁▅█", "width": 80, "height": 16}), repo("c/none")],
+            },
+        }
+
+        html = self.module.format_email(data)
+
+        self.assertIn('<img src="data:image/svg+xml,%3Csvg/%3E" width="80" height="16"', html)
+        self.assertIn(">▁▅█</span>⭐1", html)
+        self.assertEqual(html.count("⭐1 | +1"), 3)
+
+    def test_format_email_renders_watchlist_matches_by_keyword(self):
+        matches = [
+            {"keyword": "vector <db>", "title": "a/vec", "description": "vector db", "language": "Go", "link": "/a/vec", "lastSeen": "2026-08-01"},
+            {"keyword": "agent", "title": "b/agent", "description": "", "language": "", "link": "/b/agent", "lastSeen": "2026-08-02"},
+        ]
+
+        names = [name for name, _ in self.module.iter_email_sections({"watchlistMatches": matches})]
+        html = self.module.format_email({"watchlistMatches": matches})
+
+        self.assertEqual(names, ["header", "watchlist", "footer"])
+        self.assertIn("Watchlist Matches", html)
+        self.assertIn("vector &lt;db&gt;</h4>", html)
+        self.assertIn('href="https://github.com/b/agent"', html)
+
+    def test_archive_lookups_do_not_write_the_archive(self):
+        trending_archive = importlib.import_module("trending_archive")
+        original_cwd = Path.cwd()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            os.chdir(tmpdir)
+            try:
+                with trending_archive.TrendingArchive() as archive:
+                    archive.append_day("2026-08-01", {"go": [make_repo("a/one", 100, 5, description="vector db")]})
+                    archive.append_day("2026-08-02", {"go": [make_repo("b/two"), make_repo("a/one", 150, 50, description="vector db")]})
+                trending_archive.write_daily_file(trending_archive.DAILY_DIR, "2026-08-03", {"go": [make_repo("c/three")]})
+                before = {path: path.stat().st_mtime_ns for path in Path(trending_archive.ARCHIVE_DIR).rglob("*")}
+
+                env = {"EMAIL_WATCHLIST": "vector", "EMAIL_RANK_MOVEMENT": "true", "EMAIL_SPARKLINES": "true", "EMAIL_TRENDING_DATE": "2026-08-03"}
+                data = {"githubTrending": {"go": [make_repo("a/one", 150, 50, description="vector db"), make_repo("c/three", description="vector search")]}}
+                with mock.patch.dict(os.environ, env):
+                    data = self.module.attach_watchlist(data, today=trending_archive.parse_day("2026-08-02"))
+                    data = self.module.attach_rank_movement(data)
+                    data = self.module.attach_sparklines(data)
+
+                after = {path: path.stat().st_mtime_ns for path in Path(trending_archive.ARCHIVE_DIR).rglob("*")}
+            finally:
+                os.chdir(original_cwd)
+
+        self.assertEqual(after, before)
+        # c/three is only in the payload, which is archived after sending.
+        self.assertEqual([match["title"] for match in data["watchlistMatches"]], ["c/three", "a/one"])
+        # The payload of 2026-08-03 is compared with the latest archived day, 2026-08-02.
+        self.assertEqual(data["githubTrending"]["go"][0]["rankMovement"], {"status": "up", "delta": 1, "acceleration": 0})
+        self.assertEqual(data["githubTrending"]["go"][1]["rankMovement"]["status"], "new")
+        self.assertEqual(data["githubDroppedOff"], {"go": ["b/two"]})
+        self.assertIn("sparkline", data["githubTrending"]["go"][0])
+
+    def test_format_email_records_section_metrics(self):
+        metrics_module = sys.modules["pipeline_metrics"]
+        metrics = metrics_module.PipelineMetrics()
+        stories = [{"title": f"Story {i}", "link": f"https://x/{i}", "score": i, "by": "u"} for i in range(3)]
+
+        html = self.module.format_email({"hackerNewsStories": stories}, metrics=metrics)
+
+        stages = metrics.to_dict()["stages"]
+        self.assertEqual([stage["name"] for stage in stages], ["section.header", "section.hackernews", "section.footer"])
+        self.assertEqual(sum(stage["bytes"] for stage in stages), len(html.encode("utf-8")))
+        self.assertTrue(all(stage["renders"] == 1 and stage["seconds"] >= 0 for stage in stages))
+
 
 if __name__ == "__main__":
     unittest.main()
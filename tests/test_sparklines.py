@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from helpers import load_actions_module, make_repo
+
+
+class SparklineTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.archive_module = load_actions_module("trending_archive")
+        cls.module = load_actions_module("sparklines")
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmpdir.name)
+        self.archive = self.archive_module.TrendingArchive(self.root)
+        self.archive.append_day("2026-08-01", {"go": [make_repo("a/one", 100), make_repo("b/flat", 5)]})
+        self.archive.append_day("2026-08-02", {
+            "": [make_repo("a/one", 150)],
+            "go": [make_repo("a/one", 150), make_repo("b/flat", 5)],
+        })
+        self.archive.append_day("2026-08-04", {"go": [make_repo("a/one", 400), make_repo("c/once", 7)]})
+
+    def tearDown(self):
+        self.archive.close()
+        self.tmpdir.cleanup()
+
+    def test_collect_series_spans_the_window_in_one_pass(self):
+        series = self.module.collect_series(self.archive, "2026-08-04", days=5)
+
+        self.assertEqual(series["a/one"], [None, 100, 150, None, 400])
+        self.assertEqual(series["b/flat"], [None, 5, 5, None, None])
+        self.assertEqual(series["c/once"], [None, None, None, None, 7])
+        self.assertEqual(self.module.collect_series(self.archive, "2026-08-02", days=1), {
+            "a/one": [150], "b/flat": [5],
+        })
+
+    def test_render_sparkline_respects_the_byte_budget(self):
+        series = [1000 + (i * 37) % 101 for i in range(30)]
+
+        full = self.module.render_sparkline(series, sparkline_format="svg")
+        reduced = self.module.render_sparkline(series, max_bytes=300, sparkline_format="svg")
+        text = self.module.render_sparkline(series, max_bytes=100, sparkline_format="svg")
+
+        self.assertTrue(full["svg"].startswith("data:image/svg+xml,%3Csvg "))
+        self.assertLessEqual(len(full["svg"]), self.module.DEFAULT_MAX_BYTES)
+        self.assertLessEqual(len(reduced["svg"]), 300)
+        self.assertLess(reduced["svg"].count(","), full["svg"].count(","))
+        self.assertEqual(len(text["text"]), 30)
+        self.assertIsNone(self.module.render_sparkline([None, 5, None]))
+        self.assertEqual(self.module.render_sparkline([1, None, 3]), {"text": "▁█"})
+
+    def test_cache_stores_images_by_content_until_a_day_is_rearchived(self):
+        cache = self.module.SparklineCache(self.root, days=5)
+        self.assertEqual(cache.update(self.archive), "2026-08-04")
+        self.assertIsNone(cache.update(self.archive))
+        document = cache.get(self.archive, "2026-08-04")
+
+        self.assertTrue((self.root / "sparklines" / "2026-08-04.text-5d-80x16-512b.json").exists())
+        self.assertEqual(set(document["repos"]), {"a/one", "b/flat"})
+        self.assertEqual(len(document["images"]), 2)
+
+        self.archive.append_day("2026-08-04", {"go": [make_repo("b/flat", 5)]})
+        document = self.module.SparklineCache(self.root, days=5).get(self.archive, "2026-08-04")
+        self.assertEqual(set(document["repos"]), {"a/one", "b/flat"})
+        self.assertEqual(document["images"][document["repos"]["a/one"]], self.module.render_sparkline([None, 100, 150, None, None]))
+
+    def test_documents_with_other_options_do_not_overwrite_each_other(self):
+        self.module.SparklineCache(self.root, days=5).update(self.archive)
+        with mock.patch.dict(os.environ, {"EMAIL_SPARKLINE_FORMAT": "svg", "EMAIL_SPARKLINE_BYTES": "300"}):
+            svg_cache = self.module.SparklineCache.from_env(self.root)
+        svg = svg_cache.get(self.archive, "2026-08-04")
+        text = self.module.SparklineCache(self.root, days=5).get(self.archive, "2026-08-04")
+
+        self.assertEqual(sorted(path.name for path in (self.root / "sparklines").iterdir()), [
+            "2026-08-04.svg-30d-80x16-300b.json", "2026-08-04.text-5d-80x16-512b.json",
+        ])
+        self.assertIn("svg", svg["images"][svg["repos"]["a/one"]])
+        self.assertIn("text", text["images"][text["repos"]["a/one"]])
+        with self.assertRaises(ValueError):
+            self.module.SparklineCache(self.root, sparkline_format="png")
+
+    def test_annotate_repos_looks_up_payload_repos(self):
+        document = self.module.SparklineCache(self.root, days=5, sparkline_format="svg").get(self.archive, "2026-08-04")
+        payload = {"githubTrending": {"": "All", "go": [make_repo("a / one", 400), make_repo("z/unknown", 1)]}}
+
+        annotated = self.module.annotate_repos(payload, document)
+        one, unknown = annotated["githubTrending"]["go"]
+
+        self.assertEqual(one["sparkline"]["width"], 80)
+        self.assertIn("svg", one["sparkline"])
+        self.assertNotIn("sparkline", unknown)
+        self.assertEqual(annotated["githubTrending"][""], "All")
+        self.assertNotIn("sparkline", payload["githubTrending"]["go"][0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+
+from helpers import load_actions_module, make_repo
+
+
+def make_payload():
+    go = [
+        make_repo("a/agent", 12000, 300, description="LLM agent framework"),
+        make_repo("b/coin", 800, 90, description="crypto wallet"),
+        make_repo("c/vec", 5000, 20, description="vector database"),
+    ]
+    rust = [make_repo("d/claw", 2500, 120, "Rust", "Agentic 多智能体 runtime")]
+    return {
+        "githubTrending": {"all": go + rust, "go": go, "rust": rust, "zig": []},
+        "huggingFaceModels": [
+            {"modelId": "org/small", "link": "https://hf.co/small", "downloads": 900, "likes": 1},
+            {"modelId": "org/big", "link": "https://hf.co/big", "downloads": 2_000_000, "likes": 50},
+        ],
+        "hackerNewsStories": [{"title": "Crypto winter", "link": "https://x/1", "score": 10, "by": "u"}],
+    }
+
+
+class SubscriberRulesTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_actions_module("subscriber_rules")
+
+    def titles(self, repos):
+        return [repo["title"] for repo in repos]
+
+    def test_compile_rule_parses_clauses_and_rejects_unknown_ones(self):
+        rule = self.module.compile_rule('lang:Rust,go stars>=1,000 today>50 +"vector database" +agent* -crypto hf.downloads>=10000 only:github,hf limit:5')
+
+        self.assertEqual(rule.languages, ("rust", "go"))
+        self.assertEqual(rule.sections, frozenset({"github", "hf"}))
+        self.assertEqual(rule.conditions, (("github", "stars", ">=", 1000), ("github", "today", ">", 50), ("hf", "downloads", ">=", 10000)))
+        self.assertEqual(rule.include, ((("token", "vector"), ("token", "database")), (("prefix", "agent"),)))
+        self.assertEqual(rule.exclude, ((("token", "crypto"),),))
+        self.assertEqual(rule.limit, 5)
+        self.assertEqual(self.module.compile_rule(""), self.module.EMPTY_RULE)
+        for text in ("forks>=1", "hf.stars>=1", "only:tv", "sometimes", "limit:abc", "limit:-1"):
+            with self.assertRaises(ValueError):
+                self.module.compile_rule(text)
+
+    def test_select_applies_thresholds_keywords_and_languages(self):
+        index = self.module.DayIndex(make_payload())
+
+        selection = index.select("stars>=2000 today>=100 lang:rust,go,zig")
+        self.assertEqual(self.titles(selection["githubTrending"]["all"]), ["a/agent", "d/claw"])
+        self.assertEqual(selection["githubLanguages"], ["rust", "go"])
+        self.assertEqual(self.titles(selection["githubTrending"]["go"]), ["a/agent"])
+        self.assertNotIn("zig", selection["githubTrending"])
+
+        selection = index.select("+agent* -crypto hf.downloads>=10000")
+        self.assertEqual(self.titles(selection["githubTrending"]["all"]), ["a/agent", "d/claw"])
+        self.assertEqual([model["modelId"] for model in selection["huggingFaceModels"]], [])
+        self.assertEqual(selection["hackerNewsStories"], [])
+
+        selection = index.select("hf.downloads>=10000 only:hf limit:1")
+        self.assertEqual(list(selection), ["huggingFaceModels"])
+        self.assertEqual([model["modelId"] for model in selection["huggingFaceModels"]], ["org/big"])
+
+        selection = index.select("+智能体 stars<3000 stars>2500")
+        self.assertEqual(self.titles(selection["githubTrending"]["all"]), [])
+        self.assertEqual(self.titles(index.select("+智能体 stars=2500")["githubTrending"]["all"]), ["d/claw"])
+
+    def test_numeric_fields_are_read_from_parsed_records(self):
+        payload = dict(
+            make_payload(),
+            devToArticles=[
+                {"title": "Loved", "url": "https://dev.to/1", "user": {"name": "A"}, "publicReactionsCount": 40},
+                {"title": "Quiet", "url": "https://dev.to/2", "user": {"name": "B"}, "publicReactionsCount": 3},
+            ],
+            indieRevenue=[{"name": "Tool", "mrr": "1500"}, {"name": "Side project", "mrr": "20"}],
+            watchlistMatches=[{"keyword": "agent", "title": "a/agent"}],
+        )
+
+        selection = self.module.DayIndex(payload).select("devto.reactions>=10 indie.mrr>=1000")
+
+        self.assertEqual([article["title"] for article in selection["devToArticles"]], ["Loved"])
+        self.assertEqual([item["name"] for item in selection["indieRevenue"]], ["Tool"])
+        self.assertIs(selection["watchlistMatches"], payload["watchlistMatches"])
+
+    def test_equal_selections_share_item_lists(self):
+        payload = make_payload()
+        index = self.module.DayIndex(payload, item_limit=10)
+
+        loose = index.select("stars>=1")
+        default = index.select("")
+        narrow = index.select("today>=100")
+        same_as_narrow = index.select("today>=100 lang:go,rust")
+
+        self.assertIs(default["hackerNewsStories"], payload["hackerNewsStories"])
+        self.assertIs(loose["githubTrending"]["all"], default["githubTrending"]["all"])
+        self.assertIs(narrow["githubTrending"]["all"], same_as_narrow["githubTrending"]["all"])
+        self.assertEqual(index.signature(self.module.compile_rule("stars>=1")), index.signature(self.module.EMPTY_RULE))
+        self.assertNotEqual(index.signature(self.module.compile_rule("today>=100")), index.signature(self.module.EMPTY_RULE))
+
+    def test_parse_subscribers_reads_rule_lines(self):
+        text = "# readers\na@x.com: lang:rust stars>=1000\n\nb@x.com:\na@x.com: +llm\n"
+
+        subscribers = self.module.parse_subscribers(text)
+        rules = self.module.compile_subscribers(subscribers)
+
+        self.assertEqual(subscribers, {"a@x.com": "+llm", "b@x.com": ""})
+        self.assertEqual(rules["b@x.com"], self.module.EMPTY_RULE)
+        with self.assertRaises(ValueError):
+            self.module.parse_subscribers("no rule here")
+        with self.assertRaisesRegex(ValueError, "c@x.com"):
+            self.module.compile_subscribers({"c@x.com": "bogus"})
+        with self.assertRaisesRegex(ValueError, "c@x.com: Invalid limit in rule: 'limit:abc'"):
+            self.module.compile_subscribers({"a@x.com": "limit:5", "c@x.com": "lang:go limit:abc"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from helpers import load_actions_module, make_repo
+
+
+class TrendingArchiveTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_actions_module("trending_archive")
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_daily(self, day, payload):
+        daily_dir = self.root / "github-trending-repos"
+        daily_dir.mkdir(exist_ok=True)
+        path = daily_dir / f"github-trending-repos-{day}.json"
+        path.write_text(json.dumps(payload), encoding="utf-8")
+        return daily_dir
+
+    def test_parse_count_handles_github_formats(self):
+        self.assertEqual(self.module.parse_count("68,788"), 68788)
+        self.assertEqual(self.module.parse_count("140 stars today"), 140)
+        self.assertEqual(self.module.parse_count("1 star today"), 1)
+        self.assertIsNone(self.module.parse_count(""))
+        self.assertIsNone(self.module.parse_count("n/a"))
+
+    def test_round_trips_snapshot_including_legacy_all_label(self):
+        snapshot = {
+            "": "All",
+            "typescript": [make_repo("a/one", 1234, 12), make_repo("b/two", stars="n/a", today="1 star today")],
+            "go": [make_repo("c/three", description=None)],
+        }
+        archive_dir = self.root / "archive"
+        with self.module.TrendingArchive(archive_dir) as archive:
+            archive.append_day("2026-08-01", snapshot)
+
+        with self.module.TrendingArchive(archive_dir) as archive:
+            self.assertEqual(archive.day("2026-08-01"), snapshot)
+            self.assertIsNone(archive.day("2026-08-02"))
+            columns = archive.columns("2026-08-01")["typescript"]
+            self.assertEqual(list(columns.stars), [1234, -1])
+            self.assertEqual(list(columns.today_stars), [12, 1])
+
+    def test_missing_counts_round_trip_as_missing(self):
+        repo = make_repo("a/one")
+        del repo["stars"], repo["todayStars"]
+        archive_dir = self.root / "archive"
+        with self.module.TrendingArchive(archive_dir) as archive:
+            archive.append_day("2026-08-01", {"go": [repo, make_repo("b/two", stars="", today="")]})
+            rows = self.module.to_plain(archive.day("2026-08-01")["go"])
+
+        self.assertEqual((rows[0]["stars"], rows[0]["todayStars"]), (None, None))
+        self.assertEqual((rows[1]["stars"], rows[1]["todayStars"]), ("", ""))
+
+    def test_day_rows_decode_lazily_and_copy_to_plain_json(self):
+        archive_dir = self.root / "archive"
+        with self.module.TrendingArchive(archive_dir) as archive:
+            archive.append_day("2026-08-01", {"go": [make_repo("a/one", 5, 2), make_repo("b/two")]})
+
+        with self.module.TrendingArchive(archive_dir) as archive:
+            rows = archive.day("2026-08-01")["go"]
+            self.assertEqual(rows[-1]["title"], "b/two")
+            # Only the bucket key and the one title read were decoded.
+            self.assertEqual(sorted(archive.strings._decoded.values()), ["b/two", "go"])
+            self.assertEqual([row["stars"] for row in rows[:1]], ["5"])
+            plain = self.module.to_plain(archive.day("2026-08-01"))
+
+        self.assertEqual(json.loads(json.dumps(plain)), {"go": [make_repo("a/one", 5, 2), make_repo("b/two")]})
+
+    def test_string_offsets_are_persisted_and_unindexed_strings_recovered(self):
+        archive_dir = self.root / "archive"
+        with self.module.TrendingArchive(archive_dir) as archive:
+            archive.append_day("2026-08-01", {"go": [make_repo("a/one")]})
+            count = len(archive.strings)
+        index_path = archive_dir / "strings.idx"
+        self.assertEqual(index_path.stat().st_size, count * 8)
+
+        # An archive written before the offsets file existed is scanned once, then indexed.
+        index_path.unlink()
+        with self.module.TrendingArchive(archive_dir) as archive:
+            self.assertEqual(archive.day("2026-08-01")["go"][0]["title"], "a/one")
+            archive.append_day("2026-08-02", {"go": [make_repo("b/two")]})
+            count = len(archive.strings)
+        self.assertEqual(index_path.stat().st_size, count * 8)
+
+        # A torn offsets file only loses the tail, which is rescanned.
+        index_path.write_bytes(index_path.read_bytes()[:-12])
+        with self.module.TrendingArchive(archive_dir) as archive:
+            self.assertEqual(len(archive.strings), count)
+            self.assertEqual(archive.day("2026-08-02")["go"][0]["title"], "b/two")
+
+    def test_range_returns_days_in_order_and_replacement_wins(self):
+        archive_dir = self.root / "archive"
+        with self.module.TrendingArchive(archive_dir) as archive:
+            archive.append_day("2026-08-03", {"go": [make_repo("c/three")]})
+            archive.append_day("2026-08-01", {"go": [make_repo("a/one")]})
+            archive.append_day("2026-08-02", {"go": [make_repo("b/two")]})
+            archive.append_day("2026-08-02", {"go": [make_repo("b/two-updated")]})
+            self.assertFalse(archive.append_day("2026-08-01", {"go": []}, replace=False))
+
+        with self.module.TrendingArchive(archive_dir) as archive:
+            self.assertEqual(archive.dates(), ["2026-08-01", "2026-08-02", "2026-08-03"])
+            days = list(archive.range("2026-08-02", "2026-08-03"))
+            self.assertEqual(days[0][1]["go"][0]["title"], "b/two-updated")
+
+        self.assertEqual([day for day, _ in days], ["2026-08-02", "2026-08-03"])
+        with self.assertRaises(ValueError):
+            days[1][1]["go"][0]["title"]
+
+    def test_sync_daily_files_imports_only_missing_days(self):
+        self.write_daily("2026-08-01", {"": "All", "go": [make_repo("a/one")]})
+        daily_dir = self.write_daily("2026-08-02", {"": "All", "go": [make_repo("a/one"), make_repo("b/two")]})
+        archive_dir = self.root / "archive"
+
+        self.assertEqual(self.module.migrate(daily_dir, archive_dir), ["2026-08-01", "2026-08-02"])
+        self.write_daily("2026-08-03", {"go": [make_repo("c/three")]})
+        self.assertEqual(self.module.migrate(daily_dir, archive_dir), ["2026-08-03"])
+
+        with self.module.TrendingArchive(archive_dir) as archive:
+            self.assertEqual(len(archive), 3)
+            self.assertEqual(archive.day("2026-08-02")["go"][1]["title"], "b/two")
+            # Shared repo strings are interned once.
+            titles = [archive.strings.get(i) for i in range(len(archive.strings))]
+            self.assertEqual(titles.count("a/one"), 1)
+
+    def test_write_daily_file_is_atomic_deduplicated_and_gzip_aware(self):
+        daily_dir = self.root / "github-trending-repos"
+        snapshot = {"all": [make_repo("a/one")], "go": [make_repo("b/two")]}
+
+        plain = self.module.write_daily_file(daily_dir, "2026-08-01", snapshot)
+        self.assertEqual(plain.name, "github-trending-repos-2026-08-01.json")
+        self.assertIsNone(self.module.write_daily_file(daily_dir, "2026-08-01", snapshot))
+
+        compressed = self.module.write_daily_file(daily_dir, "2026-08-01", snapshot, compress=True)
+        self.assertEqual(compressed.read_bytes()[:2], b"\x1f\x8b")
+        self.assertFalse(plain.exists())
+        self.assertIsNone(self.module.write_daily_file(daily_dir, "2026-08-01", snapshot, compress=True))
+        self.module.write_daily_file(daily_dir, "2026-08-02", {"go": [make_repo("c/three")]})
+
+        self.assertEqual([path.name for path in daily_dir.iterdir() if path.name.endswith(".tmp")], [])
+        files = self.module.daily_files(daily_dir)
+        self.assertEqual([(day, path.suffix) for day, path in files], [("2026-08-01", ".gz"), ("2026-08-02", ".json")])
+        self.assertEqual(self.module.load_daily_file(files[0][1]), snapshot)
+        self.assertEqual(self.module.migrate(daily_dir, self.root / "archive"), ["2026-08-01", "2026-08-02"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from helpers import load_actions_module
+
+
+REPO = {
+    "title": "n8n-io/n8n",
+    "description": "Workflow automation",
+    "language": "TypeScript",
+    "stars": "201,585",
+    "todayStars": "193 stars today",
+    "link": "/n8n-io/n8n",
+}
+
+
+class TrendingModelsTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_actions_module("trending_models")
+
+    def test_load_trending_data_parses_numbers_once(self):
+        data = {
+            "githubTrending": {"": "All", "typescript": [REPO]},
+            "huggingFaceModels": [{"modelId": "org/model", "link": "https://hf.co/org/model", "downloads": 1200, "likes": 7}],
+            "hackerNewsStories": [{"title": "Story", "link": "https://news.ycombinator.com/item?id=1", "score": 99, "by": "pg"}],
+            "devToArticles": [{"title": "Post", "url": "https://dev.to/p", "user": {"name": "Ann"}, "publicReactionsCount": 5}],
+            "aiPapers": [{"title": "Paper", "url": "https://hf.co/papers/1", "authors": ["A", "B", "C"], "likes": 3}],
+            "indieRevenue": [{"rank": 1, "name": "Tool", "mrr": "1500", "arr": 18000, "founders": ["F"]}],
+        }
+
+        day = self.module.load_trending_data(data)
+
+        self.assertEqual(day.languages, ["typescript"])
+        self.assertEqual(day.all_repos[0].stars, 201585)
+        self.assertEqual(day.all_repos[0].today_stars, 193)
+        self.assertEqual(day.all_repos[0].to_dict(), REPO)
+        self.assertEqual(day.hf_models[0].downloads, 1200)
+        self.assertEqual(day.hn_stories[0].descendants, 0)
+        self.assertEqual(day.devto_articles[0].user_name, "Ann")
+        self.assertEqual(day.papers[0].authors, ("A", "B", "C"))
+        self.assertEqual(day.indie_revenue[0].mrr, 1500.0)
+
+    def test_records_use_slots(self):
+        repo = self.module.Repo.from_dict(REPO)
+
+        self.assertFalse(hasattr(repo, "__dict__"))
+        with self.assertRaises(AttributeError):
+            repo.extra = 1
+        self.assertEqual(len({repo, self.module.Repo.from_dict(dict(REPO))}), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
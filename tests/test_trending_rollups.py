@@ -0,0 +1,74 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from helpers import load_actions_module, make_repo
+
+
+class TrendingRollupsTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.archive_module = load_actions_module("trending_archive")
+        cls.module = load_actions_module("trending_rollups")
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_period_keys_and_bounds(self):
+        self.assertEqual(self.module.period_key("week", "2026-01-01"), "2026-W01")
+        self.assertEqual(self.module.period_key("week", "2024-12-30"), "2025-W01")
+        self.assertEqual(self.module.period_key("month", "2026-12-31"), "2026-12")
+        start, end = self.module.period_bounds("month", "2026-12")
+        self.assertEqual((start.isoformat(), end.isoformat()), ("2026-12-01", "2026-12-31"))
+        start, end = self.module.period_bounds("week", "2025-W01")
+        self.assertEqual((start.isoformat(), end.isoformat()), ("2024-12-30", "2025-01-05"))
+
+    def test_rollup_aggregates_days_ranks_star_gain_and_leaders(self):
+        with self.archive_module.TrendingArchive(self.root) as archive:
+            archive.append_day("2026-08-03", {
+                "": [make_repo("a/one", 100, 5), make_repo("p/snake", 10, 1, "Python")],
+                "go": [make_repo("b/two", 50, 2), make_repo("a/one", 100, 5)],
+            })
+            archive.append_day("2026-08-04", {"go": [make_repo("a/one", 130, 30)]})
+            self.module.TrendingRollups(self.root).update(archive)
+
+        rollup = self.module.TrendingRollups(self.root).get("week", "2026-W32")
+        one = rollup["repos"][0]
+
+        self.assertEqual(rollup["days"], ["2026-08-03", "2026-08-04"])
+        self.assertEqual(one["repo"], "a/one")
+        self.assertEqual((one["days"], one["best_rank"], one["star_gain"]), (2, 1, 35))
+        self.assertEqual(one["buckets"], ["all", "go"])
+        self.assertEqual(rollup["leaders"], {"go": ["a/one", "b/two"], "python": ["p/snake"]})
+        self.assertEqual(self.module.TrendingRollups(self.root).latest("month")["key"], "2026-08")
+
+    def test_update_rebuilds_only_periods_touched_by_new_or_replaced_days(self):
+        with self.archive_module.TrendingArchive(self.root) as archive:
+            archive.append_day("2026-07-31", {"go": [make_repo("a/one", 100, 5)]})
+            archive.append_day("2026-08-03", {"go": [make_repo("a/one", 110, 10)]})
+            rollups = self.module.TrendingRollups(self.root)
+            self.assertEqual(len(rollups.update(archive, workers=2)), 4)
+            self.assertEqual(self.module.TrendingRollups(self.root).update(archive), [])
+
+            archive.append_day("2026-08-04", {"go": [make_repo("c/three", 10, 1)]})
+            self.assertEqual(
+                self.module.TrendingRollups(self.root).update(archive),
+                [("week", "2026-W32"), ("month", "2026-08")],
+            )
+
+            archive.append_day("2026-07-31", {"go": [make_repo("d/four", 10, 1)]})
+            self.assertEqual(
+                self.module.TrendingRollups(self.root).update(archive),
+                [("week", "2026-W31"), ("month", "2026-07")],
+            )
+
+        july = self.module.TrendingRollups(self.root).get("month", "2026-07")
+        self.assertEqual([entry["repo"] for entry in july["repos"]], ["d/four"])
+
+
+if __name__ == "__main__":
+    unittest.main()